@@ -317,6 +317,34 @@ def status():
         click.echo("Zookeeper: Error checking status")
 
 
+@main.command()
+@click.option("--tick-dir", default=None, help="Recorded tick files (default: recording_options.recorder_consumer_dir)")
+@click.option("--output-dir", default=None, help="Where to write samples (default: recording_options.precise_sampler_dir)")
+@click.option("--interval", "-i", "intervals", multiple=True, help="Sampling interval, repeatable (default: sampling_intervals)")
+@click.option("--exchange", default=None)
+@click.option("--data-type", default=None)
+@click.option("--symbol", "symbols", multiple=True)
+@click.option("--start", default=None, help="First boundary, e.g. 2025-01-16")
+@click.option("--end", default=None, help="End of the range (exclusive)")
+@click.option("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+def resample(tick_dir, output_dir, intervals, exchange, data_type, symbols, start, end, workers):
+    """Recompute sample files from recorded ticks"""
+    from crypto_stream.market_data.processing.samplers.resampler import \
+        resample as run_resample
+
+    run_resample(
+        tick_dir,
+        output_dir,
+        list(intervals) or None,
+        exchange,
+        data_type,
+        set(symbols) or None,
+        start,
+        end,
+        workers,
+    )
+
+
 def check_docker():
     """Check if Docker is running"""
     try:
@@ -1,15 +1,409 @@
 # config.py
+import dataclasses
+import logging
+import os
+import threading
+import typing
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
 
 import yaml
 
 CONFIG_FILE = Path(__file__).parent / "config.yaml"
 KAFKA_BROKER = "localhost:9092"
 
+logger = logging.getLogger(__name__)
+
+
+class ConfigError(ValueError):
+    """Raised when config.yaml does not match the expected schema"""
+
+
+@dataclass(frozen=True)
+class StreamOption:
+    exchange: str
+    symbols: List[str] = field(default_factory=list)
+    dataTypes: List[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class StreamerOptions:
+    tardis_ws_url: str = "ws://localhost:8001/ws-stream-normalized"
+    # Websocket connections per process; stream_options are split across them
+    num_connections: int = 1
+    num_processes: int = 1
+    reconnect_min_delay: float = 0.5
+    reconnect_max_delay: float = 30
+    rate_report_interval: float = 60
+
+
+@dataclass(frozen=True)
+class TickHandlerOptions:
+    queue_size: int = 10000
+    num_workers: int = 4
+    # "block" waits for queue space, "drop_newest"/"drop_oldest" discard ticks instead
+    overflow_policy: str = "drop_oldest"
+
+    def __post_init__(self):
+        if self.overflow_policy not in ("block", "drop_newest", "drop_oldest"):
+            raise ConfigError(f"Unknown overflow_policy {self.overflow_policy!r}")
+
+
+@dataclass(frozen=True)
+class RedisTickCacheOptions:
+    redis_expiry: int = 600
+    # Buffer ticks in process and push them per key in one pipeline
+    write_behind: bool = True
+    write_behind_max_ticks: int = 1000
+    write_behind_max_delay: float = 0.5
+    # "lists" (hourly lists), "streams" (one Redis Stream per symbol, Redis >= 7)
+    # or "memory" (in-process rings, single node only, see memory_tick_cache_options)
+    backend: str = "lists"
+    # Max ticks popped per key per drain round trip
+    drain_chunk_size: int = 10000
+    stream_maxlen: int = 1000000
+    stream_read_count: int = 10000
+    # Consumer name within the stream groups; defaults to "<hostname>:<topic>"
+    stream_consumer_name: str = ""
+
+
+@dataclass(frozen=True)
+class SampledRedisOptions:
+    # Expiry of the sampler state snapshot
+    redis_expiry: int = 100
+
+
+@dataclass(frozen=True)
+class RedisConnectionOptions:
+    host: str = "localhost"
+    port: int = 6379
+    db: int = 0
+    # Size of the per-process pool shared by tick cache, sampler and monitor
+    max_connections: int = 32
+    socket_timeout: float = 5
+
+
+@dataclass(frozen=True)
+class RedisOptions:
+    connection: RedisConnectionOptions = field(default_factory=RedisConnectionOptions)
+    redis_tick_cache: RedisTickCacheOptions = field(default_factory=RedisTickCacheOptions)
+    sampled_data_manager: SampledRedisOptions = field(default_factory=SampledRedisOptions)
+
+
+@dataclass(frozen=True)
+class MemoryTickCacheOptions:
+    # Records preallocated per symbol
+    ring_capacity: int = 65536
+    # Records per symbol kept aside while the writer falls behind; the oldest are dropped beyond it
+    max_spilled: int = 1048576
+
+
+@dataclass(frozen=True)
+class DiskWriterOptions:
+    flush_interval: float = 10
+    # "jsonl" (one JSON line per tick), "parquet" (storage/disk/parquet_writer.py, needs pyarrow)
+    # or "binary" (memory mapped tick logs, storage/disk/tick_log.py)
+    format: str = "jsonl"
+    parquet_compression: str = "zstd"
+    # Seconds between merges of finished hourly parquet parts; 0 disables compaction
+    compaction_interval: float = 600
+    # Append handles kept open by the writer thread, and how long an unused one stays open
+    max_open_files: int = 256
+    idle_file_timeout: float = 300
+    # Threads writing and syncing different files of a commit cycle at once
+    flush_workers: int = 4
+    # Records per sparse index entry of a binary tick log
+    tick_log_index_stride: int = 1024
+
+    def __post_init__(self):
+        if self.format not in ("jsonl", "parquet", "binary"):
+            raise ConfigError(f"Unknown disk writer format {self.format!r}")
+        if self.tick_log_index_stride < 1:
+            raise ConfigError("tick_log_index_stride must be at least 1")
+
+
+@dataclass(frozen=True)
+class DurabilityOptions:
+    # How tick and sample appends reach the disk (storage/disk/group_commit.py).
+    # Writes are grouped until commit_interval seconds or commit_bytes have
+    # passed, then each file of the group is synced once. "none" never syncs,
+    # "batch" acknowledges appends after their group's sync, "interval" after
+    # the write (so up to one group can be lost on a crash)
+    policy: str = "batch"
+    commit_interval: float = 1.0
+    commit_bytes: int = 16 * 1024 * 1024
+
+    def __post_init__(self):
+        if self.policy not in ("none", "batch", "interval"):
+            raise ConfigError(f"Unknown durability policy {self.policy!r}")
+        if self.commit_interval <= 0 or self.commit_bytes <= 0:
+            raise ConfigError("commit_interval and commit_bytes must be positive")
+
+
+@dataclass(frozen=True)
+class ProducerOptions:
+    linger_ms: int = 5
+    batch_size: int = 1048576
+    compression_type: str = "lz4"
+    # Messages handed to librdkafka but not yet acknowledged; produce() waits above this
+    max_in_flight: int = 100000
+    flush_timeout: float = 10
+
+
+@dataclass(frozen=True)
+class ConsumerOptions:
+    # Messages fetched per Consumer.consume() call and the max wait for a batch
+    batch_size: int = 500
+    batch_timeout: float = 0.05
+
+
+@dataclass(frozen=True)
+class KafkaOptions:
+    kafka_broker: str = KAFKA_BROKER
+    producer: ProducerOptions = field(default_factory=ProducerOptions)
+    consumer: ConsumerOptions = field(default_factory=ConsumerOptions)
+
+
+@dataclass(frozen=True)
+class RecordingOptions:
+    recorder_consumer_dir: str = "."
+    precise_sampler_dir: str = "."
+
+
+@dataclass(frozen=True)
+class SampledDataManagerOptions:
+    max_tick_age: float = 100
+    number_of_minute_samples_to_keep: int = 2880
+    # Seconds between snapshots of the in-process last tick state to Redis, 0 = off
+    state_snapshot_interval: float = 60
+    # Pandas offsets sampled at once; each must be a multiple of the smallest
+    sampling_intervals: List[str] = field(default_factory=lambda: ["1min"])
+    # "timer" samples on wall-clock boundaries, "tick" when a tick after the boundary arrives (replays)
+    sampling_trigger: str = "timer"
+    # Seconds the timer waits after a boundary for late ticks (the watermark)
+    allowed_lateness: float = 0.25
+    # Skipped boundaries back-filled per interval after a stall
+    max_backfill_boundaries: int = 1000
+    # Also publish OHLC / time weighted mid and spread bars for each interval
+    quote_bars: bool = True
+
+    def __post_init__(self):
+        if self.sampling_trigger not in ("timer", "tick"):
+            raise ConfigError(f"Unknown sampling_trigger {self.sampling_trigger!r}")
+        if not self.sampling_intervals:
+            raise ConfigError("sampling_intervals must not be empty")
+
+
+@dataclass(frozen=True)
+class CodecOptions:
+    # "json" keeps the text format; "binary" packs quote ticks (utils.tick_codec) into
+    # smaller but slower to encode/decode records, an opt-in for bandwidth bound
+    # deployments. Readers accept both
+    format: str = "json"
+
+    def __post_init__(self):
+        if self.format not in ("json", "binary"):
+            raise ConfigError(f"Unknown codec format {self.format!r}")
+
+
+@dataclass(frozen=True)
+class Config:
+    """Typed view of config.yaml; field names mirror the yaml keys"""
+
+    stream_options: List[StreamOption] = field(default_factory=list)
+    streamer_options: StreamerOptions = field(default_factory=StreamerOptions)
+    tick_handler_options: TickHandlerOptions = field(default_factory=TickHandlerOptions)
+    redis_options: RedisOptions = field(default_factory=RedisOptions)
+    memory_tick_cache_options: MemoryTickCacheOptions = field(default_factory=MemoryTickCacheOptions)
+    disk_writer_options: DiskWriterOptions = field(default_factory=DiskWriterOptions)
+    durability_options: DurabilityOptions = field(default_factory=DurabilityOptions)
+    kafka_options: KafkaOptions = field(default_factory=KafkaOptions)
+    recording_options: RecordingOptions = field(default_factory=RecordingOptions)
+    sampled_data_manager_options: SampledDataManagerOptions = field(
+        default_factory=SampledDataManagerOptions
+    )
+    codec_options: CodecOptions = field(default_factory=CodecOptions)
+    # Untyped yaml content, kept for the dict based get_*_options helpers
+    raw: Dict[str, Any] = field(default_factory=dict, compare=False, repr=False)
+
+
+def _build(tp, value, path):
+    """Convert a yaml value into ``tp``, validating scalars along the way"""
+    origin = typing.get_origin(tp)
+    if origin is typing.Union:
+        args = [a for a in typing.get_args(tp) if a is not type(None)]
+        if value is None:
+            return None
+        return _build(args[0], value, path)
+    if origin in (list, List):
+        if value is None:
+            return []
+        if not isinstance(value, list):
+            raise ConfigError(f"{path}: expected a list, got {type(value).__name__}")
+        (item_tp,) = typing.get_args(tp) or (Any,)
+        return [_build(item_tp, v, f"{path}[{i}]") for i, v in enumerate(value)]
+    if origin in (dict, Dict):
+        if not isinstance(value, dict):
+            raise ConfigError(f"{path}: expected a mapping, got {type(value).__name__}")
+        return dict(value)
+    if dataclasses.is_dataclass(tp):
+        if value is None:
+            value = {}
+        if not isinstance(value, dict):
+            raise ConfigError(f"{path}: expected a mapping, got {type(value).__name__}")
+        hints = typing.get_type_hints(tp)
+        known = {f.name for f in dataclasses.fields(tp)}
+        for key in value:
+            if key not in known:
+                logger.warning(f"Unknown config key {path}.{key} ignored")
+        kwargs = {
+            f.name: _build(hints[f.name], value[f.name], f"{path}.{f.name}")
+            for f in dataclasses.fields(tp)
+            if f.name in value and f.name != "raw"
+        }
+        try:
+            return tp(**kwargs)
+        except TypeError as e:
+            raise ConfigError(f"{path}: {e}") from e
+    if tp is Any:
+        return value
+    if tp in (int, float) and isinstance(value, bool):
+        # bool is an int subclass, but "true" is never meant as a number
+        raise ConfigError(f"{path}: expected {tp.__name__}, got {value!r}")
+    if tp is float and isinstance(value, int):
+        return float(value)
+    if tp in (int, float, str, bool) and not isinstance(value, tp):
+        raise ConfigError(f"{path}: expected {tp.__name__}, got {value!r}")
+    return value
+
+
+def parse_config(data):
+    """Build a validated Config from the parsed yaml mapping"""
+    data = data or {}
+    config = _build(Config, data, "config")
+    object.__setattr__(config, "raw", data)
+    return config
+
+
+class ConfigManager:
+    """
+    Loads config.yaml once and keeps a shared Config instance.
+
+    A background thread polls the file mtime and swaps in a new Config when
+    the file changes; subscribers are called with (old, new) after a reload.
+
+    Values read through get_config() where they are used take effect on the
+    next use: redis_tick_cache expiry, stream and drain sizes and
+    write-behind delay; disk_writer_options.flush_interval; kafka consumer
+    batch size and timeout; codec_options.format; the sampler's max_tick_age,
+    backfill, snapshot and retention settings. durability_options and
+    streamer_options reconnect delays and rate_report_interval are applied
+    by subscribers (GroupCommitWriter, KafkaStreamer). Everything else is
+    read once at startup (connections, topics, stream_options, sampling
+    intervals and trigger, cache backends, worker and pool sizes, Kafka
+    client settings) and needs a restart.
+    """
+
+    def __init__(self, path=CONFIG_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._config = None
+        self._mtime = None
+        self._subscribers: List[Callable[[Config, Config], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def get(self) -> Config:
+        config = self._config
+        if config is None:
+            with self._lock:
+                if self._config is None:
+                    self._load()
+                config = self._config
+        return config
+
+    def _load(self):
+        # Recorded before parsing, so a broken file is reported once, not on every poll
+        self._mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path, "r") as file:
+            data = yaml.safe_load(file)
+        self._config = parse_config(data)
+
+    def reload(self):
+        """Re-read the file and notify subscribers if it parsed cleanly"""
+        with self._lock:
+            old = self._config
+            try:
+                self._load()
+            except Exception as e:
+                logger.error(f"Config reload failed, keeping previous config: {e}")
+                return False
+            new = self._config
+        if old is not None and old != new:
+            logger.info(f"Config reloaded from {self.path}")
+            for callback in list(self._subscribers):
+                try:
+                    callback(old, new)
+                except Exception as e:
+                    logger.error(f"Config subscriber {callback!r} failed: {e}")
+        return True
+
+    def check_for_updates(self):
+        """Reload if the file mtime changed since the last load"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        return self.reload()
+
+    def subscribe(self, callback):
+        """Register ``callback(old, new)``; returns an unsubscribe function"""
+        self._subscribers.append(callback)
+        return lambda: self.unsubscribe(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def start_watching(self, interval=1.0):
+        """Start the mtime polling thread (idempotent)"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self.get()
+        self._stop.clear()
+
+        def _watch():
+            while not self._stop.wait(interval):
+                self.check_for_updates()
+
+        self._watcher = threading.Thread(target=_watch, name="config-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+
+
+config_manager = ConfigManager()
+
+
+def get_config() -> Config:
+    """Shared typed config; cheap enough to call per tick"""
+    return config_manager.get()
+
+
+def subscribe(callback):
+    return config_manager.subscribe(callback)
+
+
+def start_config_watcher(interval=1.0):
+    config_manager.start_watching(interval)
+
 
 def load_config():
-    with open(CONFIG_FILE, "r") as file:
-        return yaml.safe_load(file)
+    return get_config().raw
 
 
 def get_stream_options():
@@ -1,12 +1,12 @@
 from confluent_kafka import Consumer
 
-from crypto_stream.configs.config import KAFKA_BROKER
+from crypto_stream.configs.config import get_config
 
 
 def create_kafka_consumer():
     return Consumer(
         {
-            "bootstrap.servers": KAFKA_BROKER,
+            "bootstrap.servers": get_config().kafka_options.kafka_broker,
             "group.id": "crypto-consumer-group",
             "auto.offset.reset": "earliest",
         }
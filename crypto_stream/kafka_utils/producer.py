@@ -1,19 +1,131 @@
+import asyncio
+import atexit
+import logging
+import threading
+
 from confluent_kafka import Producer
 
-from crypto_stream.configs.config import KAFKA_BROKER
+from crypto_stream.configs.config import get_config
+
+logger = logging.getLogger(__name__)
 
 
-def create_kafka_producer():
-    return Producer({"bootstrap.servers": KAFKA_BROKER})
+def create_kafka_producer(overrides=None):
+    kafka_options = get_config().kafka_options
+    producer_options = kafka_options.producer
+    conf = {
+        "bootstrap.servers": kafka_options.kafka_broker,
+        "linger.ms": producer_options.linger_ms,
+        "batch.size": producer_options.batch_size,
+        "compression.type": producer_options.compression_type,
+    }
+    conf.update(overrides or {})
+    return Producer(conf)
 
 
-producer = create_kafka_producer()
+producer = None
 
 
 # Function to send data to Kafka
 def send_to_kafka(topic, key, value):
+    """
+    Queue a message on the shared producer. Messages are batched by the
+    client and delivered in the background; whatever is still queued is
+    flushed at interpreter exit.
+    """
+    global producer
     try:
-        producer.produce(topic, key=key, value=value)
-        producer.flush()
+        if producer is None:
+            producer = create_kafka_producer()
+            atexit.register(producer.flush, get_config().kafka_options.producer.flush_timeout)
+        while True:
+            try:
+                producer.produce(topic, key=key, value=value)
+                break
+            except BufferError:
+                # Local queue full; serve delivery reports until there is room
+                producer.poll(0.1)
+        producer.poll(0)
     except Exception as e:
         print(f"Error sending data to Kafka: {e}")
+
+
+class AsyncKafkaProducer:
+    """
+    Non-blocking wrapper around confluent_kafka.Producer for asyncio code.
+
+    produce() only hands the message to librdkafka's local queue; batching,
+    linger and compression happen in the client. Delivery reports are served
+    by a background poll thread. At most ``max_in_flight`` messages may be
+    unacknowledged at once, beyond that produce() waits, which pushes
+    backpressure up to whoever is awaiting it (the websocket reader).
+    """
+
+    def __init__(self, options=None, on_delivery=None):
+        self._options = options or get_config().kafka_options.producer
+        self._producer = create_kafka_producer()
+        self._on_delivery = on_delivery
+        self._in_flight = None
+        self._loop = None
+        self._poll_thread = None
+        self._running = False
+        self.delivered_count = 0
+        self.failed_count = 0
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._in_flight = asyncio.Semaphore(self._options.max_in_flight)
+        self._running = True
+        self._poll_thread = threading.Thread(
+            target=self._poll_loop, name="kafka-producer-poll", daemon=True
+        )
+        self._poll_thread.start()
+
+    def _poll_loop(self):
+        while self._running:
+            self._producer.poll(0.1)
+
+    def _delivery_report(self, err, msg):
+        # Called from the poll thread (or flush); hand the release back to the loop
+        if err is not None:
+            self.failed_count += 1
+            logger.error(f"Kafka delivery failed for {msg.topic()}: {err}")
+        else:
+            self.delivered_count += 1
+        if self._on_delivery is not None:
+            try:
+                self._on_delivery(err, msg)
+            except Exception as e:
+                logger.error(f"Delivery callback error: {e}")
+        self._loop.call_soon_threadsafe(self._in_flight.release)
+
+    async def produce(self, topic, key, value):
+        """Queue a message, waiting only when the in-flight limit is reached"""
+        await self._in_flight.acquire()
+        try:
+            while True:
+                try:
+                    self._producer.produce(
+                        topic, key=key, value=value, on_delivery=self._delivery_report
+                    )
+                    return
+                except BufferError:
+                    # librdkafka's local queue is full; let the poll thread drain it
+                    await asyncio.sleep(0.01)
+        except BaseException:
+            # Not queued (a Kafka error, or cancelled while waiting): no delivery report will release it
+            self._in_flight.release()
+            raise
+
+    async def close(self):
+        """Flush outstanding messages and stop the poll thread"""
+        if not self._running:
+            return
+        remaining = await asyncio.to_thread(self._producer.flush, self._options.flush_timeout)
+        self._running = False
+        await asyncio.to_thread(self._poll_thread.join)
+        if remaining:
+            logger.warning(f"{remaining} Kafka messages not delivered before shutdown")
+        logger.info(
+            f"Kafka producer closed: delivered={self.delivered_count}, failed={self.failed_count}"
+        )
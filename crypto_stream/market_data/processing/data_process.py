@@ -1,6 +1,138 @@
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass
+
+from crypto_stream.configs.config import get_config
+
+logger = logging.getLogger(__name__)
+
+
 async def process_quote_data(data):
     pass
     # Example: Print the symbol and price from the message
     # print(f"Symbol: {data.get('symbol')}, Bid: {data.get('bids')}, Ask: {data.get('asks')}, timestamp: {data.get('Timestamp')}, \
     #      local_timestamp: {data.get('localTimestamp')}")
     # You can add more processing logic here depending on your needs
+
+
+@dataclass
+class HandlerStats:
+    calls: int = 0
+    errors: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+    @property
+    def avg_time(self):
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+class TickHandlerRegistry:
+    """
+    Fans ticks out to registered handlers through a bounded queue.
+
+    A fixed number of worker tasks consume the queue and call every handler
+    for each tick, so a slow handler delays ticks rather than spawning
+    unbounded tasks. When the queue is full, ``overflow_policy`` decides
+    whether submit() waits ("block") or a tick is dropped ("drop_newest",
+    "drop_oldest").
+    """
+
+    def __init__(self, options=None):
+        self._options = options
+        self._handlers = {}
+        self.stats = {}
+        self.dropped_count = 0
+        self._queue = None
+        self._workers = []
+
+    def register(self, name, handler):
+        """Register a sync or async ``handler(data)`` under ``name``"""
+        self._handlers[name] = (handler, inspect.iscoroutinefunction(handler))
+        self.stats.setdefault(name, HandlerStats())
+
+    def unregister(self, name):
+        self._handlers.pop(name, None)
+
+    def handler(self, name):
+        """Decorator form of register()"""
+
+        def decorator(func):
+            self.register(name, func)
+            return func
+
+        return decorator
+
+    async def start(self):
+        if self._options is None:
+            self._options = get_config().tick_handler_options
+        self._queue = asyncio.Queue(maxsize=self._options.queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self._options.num_workers)
+        ]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, data):
+        """Queue a tick for the handlers according to the overflow policy"""
+        if not self._handlers or self._queue is None:
+            return
+        policy = self._options.overflow_policy
+        if policy == "block":
+            await self._queue.put(data)
+            return
+        try:
+            self._queue.put_nowait(data)
+        except asyncio.QueueFull:
+            self.dropped_count += 1
+            if policy == "drop_oldest":
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._queue.put_nowait(data)
+
+    async def _worker(self):
+        while True:
+            data = await self._queue.get()
+            try:
+                for name, (handler, is_async) in list(self._handlers.items()):
+                    stats = self.stats[name]
+                    start = time.perf_counter()
+                    try:
+                        if is_async:
+                            await handler(data)
+                        else:
+                            handler(data)
+                    except Exception as e:
+                        stats.errors += 1
+                        logger.error(f"Tick handler {name} failed: {e}")
+                    elapsed = time.perf_counter() - start
+                    stats.calls += 1
+                    stats.total_time += elapsed
+                    if elapsed > stats.max_time:
+                        stats.max_time = elapsed
+            finally:
+                self._queue.task_done()
+
+    def log_stats(self):
+        if not self._handlers:
+            return
+        logger.info(
+            f"Tick handlers: queued={self._queue.qsize() if self._queue else 0}, "
+            f"dropped={self.dropped_count}"
+        )
+        for name, stats in self.stats.items():
+            logger.info(
+                f"  {name}: calls={stats.calls}, errors={stats.errors}, "
+                f"avg={stats.avg_time * 1e3:.3f}ms, max={stats.max_time * 1e3:.3f}ms"
+            )
+
+
+# Shared registry used by the streamer; attach analytics with
+# @tick_handlers.handler("name") or tick_handlers.register(name, func)
+tick_handlers = TickHandlerRegistry()
@@ -31,7 +31,7 @@ class RecorderConsumer:
             tick_data = format_quote_data(raw_data)
             #spreads = calculate_quote_spreads(tick_data)
             storage_data = prepare_storage_quote_data(tick_data)
-            self.cache.add_tick(tick_data, storage_data)
+            await self.cache.add_tick(tick_data, storage_data)
         except Exception as e:
             logger.error(f"Error processing message: {e}", exc_info=True)
 
@@ -1,6 +1,5 @@
 import asyncio
 import json
-import os
 from asyncio import to_thread
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
@@ -8,36 +7,75 @@ from pathlib import Path
 import pandas as pd
 import redis
 
-from crypto_stream.configs.config import (get_recording_options,
-                                          get_redis_options,
-                                          get_sampled_data_manager_options)
+from crypto_stream.configs.config import get_config
 from crypto_stream.kafka_utils.consumer import create_kafka_consumer
 from crypto_stream.monitoring.monitors import RedisMonitor, SamplingMonitor
+from crypto_stream.storage.disk.sample_writer import SampleFileWriter
 from crypto_stream.storage.disk.writer import DiskWriter
+from crypto_stream.storage.memory.ring_buffer_cache import MemoryTickCache
+from crypto_stream.storage.redis.connection import get_redis_client
+from crypto_stream.storage.redis.key_index import RedisKeyIndex
+from crypto_stream.storage.redis.stream_cache import RedisStreamTickCache
 from crypto_stream.storage.redis.tick_cache import RedisTickCache
 from crypto_stream.utils.data_utils import (
     calculate_quote_spreads, format_quote_data,
     prepare_storage_quote_sampling_data)
-from crypto_stream.utils.str_utils import parse_topic
+from crypto_stream.utils.str_utils import RECORD_KINDS, interval_suffix, parse_topic, sample_file_name
+from crypto_stream.utils.tick_codec import decode_tick, encode_tick
+
+from .quote_bars import QuoteBarAggregator
 
 
 class SampledDataManager:
-    def __init__(self, topic, redis_client):
+    def __init__(self, topic, redis_client, tick_source=None):
         self.redis = redis_client
-        self.last_sampled_minute = None
+        # Cache that can answer last-tick lookups itself (stream and memory
+        # backends); otherwise the in-process last tick state below is used
+        self.tick_source = tick_source
         self.monitor = SamplingMonitor()
-        self.redis_monitor = RedisMonitor(redis_client)
+        options = get_config().sampled_data_manager_options
+        # Interval name ("1s", "1min", ...) -> Timedelta, sampled on every boundary
+        self.intervals = {name: pd.Timedelta(name) for name in options.sampling_intervals}
+        self.resolution = min(self.intervals.values())
+        for name, interval in self.intervals.items():
+            if interval % self.resolution:
+                raise ValueError(f"Sampling interval {name} is not a multiple of {self.resolution}")
+        self.sampling_trigger = options.sampling_trigger
+        self.allowed_lateness = pd.Timedelta(seconds=options.allowed_lateness)
+        # Interval name -> last boundary sampled
+        self.last_sampled = {}
+        self.next_boundary = None
+        self._scheduler_task = None
+        # (exchange, data_type, symbol) -> [[bucket_ns, tick], ...], newest bucket first:
+        # the last tick seen in each ``resolution`` bucket. Buckets are kept back to the
+        # oldest boundary not sampled yet, and at least enough to look behind the allowed
+        # lateness (see _trim_state).
+        self.last_ticks = {}
+        self.state_depth = int(self.allowed_lateness / self.resolution) + 2
+        # Incremental quote bars for the same intervals, published with the samples
+        self.bars = QuoteBarAggregator(self.intervals, options.max_backfill_boundaries) if options.quote_bars else None
+        # Registries of sample and bar keys, instead of KEYS scans
+        self.sampled_index = RedisKeyIndex(redis_client, "sampled")
+        self.bars_index = RedisKeyIndex(redis_client, "bars")
+        self.record_indexes = {"sampled": self.sampled_index, "bars": self.bars_index}
+        self.sample_writer = SampleFileWriter()
+        self.redis_monitor = RedisMonitor(
+            redis_client, {"sampled_keys": self.sampled_index, "bar_keys": self.bars_index}
+        )
         self.last_health_check = datetime.now(timezone.utc)
+        self.last_snapshot = datetime.now(timezone.utc)
         self.topic = topic
         self.exchange, self.data_type = parse_topic(topic)
-        self._sampled_redis_options = get_sampled_data_manager_options()
+
+    async def initialize(self):
+        """Check the Redis connection and recover the sample key index"""
         # Test Redis connection
         try:
             print("\nTesting Redis connection...")
-            self.redis.ping()
+            await self.redis.ping()
             print("Successfully connected to Redis")
 
-            print("Current keys in Redis:", self.redis.keys("*"))
+            print("Current key count in Redis:", await self.redis.dbsize())
 
             # Clear any existing keys for clean start
             # self.redis.flushdb()  # Commented out to preserve existing data
@@ -45,10 +83,10 @@ class SampledDataManager:
 
             # Test writing and reading a key
             test_key = "test:connection"
-            self.redis.set(test_key, "test_value")
-            test_value = self.redis.get(test_key)
+            await self.redis.set(test_key, "test_value")
+            test_value = await self.redis.get(test_key)
             print(f"Test key value: {test_value}")
-            self.redis.delete(test_key)
+            await self.redis.delete(test_key)
 
         except redis.ConnectionError as e:
             print(f"Failed to connect to Redis: {e}")
@@ -57,32 +95,32 @@ class SampledDataManager:
             print(f"Error testing Redis: {e}")
             raise
 
+        await self.sampled_index.rebuild("sampled:*", self._parse_sample_key)
+        if self.bars is not None:
+            await self.bars_index.rebuild("bars:*", self._parse_sample_key)
+        if self.tick_source is None:
+            await self.restore_state()
+        if self.sampling_trigger == "timer":
+            self._scheduler_task = asyncio.create_task(self.run_scheduler())
+
         print("SampledDataManager initialized")
 
-    def get_tick_buffer_key(self, exchange, data_type, symbol, timestamp):
-        """
-        Key for storing recent ticks for each symbol
-        Args:
-            exchange: Exchange name
-            data_type: Type of data
-            symbol: Trading symbol
-            timestamp: Optional timestamp to get key for specific hour
-        """
-        if timestamp is None:
-            timestamp = datetime.now(timezone.utc)
-        elif isinstance(timestamp, pd.Timestamp):
-            timestamp = timestamp.to_pydatetime()
-            if timestamp.tzinfo is None:
-                timestamp = timestamp.replace(tzinfo=timezone.utc)
+    def _parse_sample_key(self, key):
+        """(exchange, data_type, score) of a sampled:* or bars:* key, for index recovery"""
+        parts = key.split(":")
+        if len(parts) < 4:
+            return None
+        return parts[1], parts[2], 0
 
-        minute_key = timestamp.strftime("%Y-%m-%d:%H:%M")
-        return f"crypto_ticks_sample:{exchange}:{data_type}:{symbol}:{minute_key}"
+    def interval_suffix(self, interval):
+        return interval_suffix(interval)
 
-    def get_sample_key(self, exchange, data_type, symbol):
+    def get_sample_key(self, exchange, data_type, symbol, interval="1min", kind="sampled"):
         """Key for storing sampled data"""
-        return f"sampled:{exchange}:{data_type}:{symbol}"
+        prefix = RECORD_KINDS[kind][0]
+        return f"{prefix}:{exchange}:{data_type}:{symbol}{self.interval_suffix(interval)}"
 
-    def add_to_buffer(self, exchange, data_type, symbol, tick_data, storage_data):
+    async def add_to_buffer(self, exchange, data_type, symbol, tick_data, storage_data):
         """Store ticks in a list"""
         try:
             self.monitor.timing_tracker.start("add_to_buffer")
@@ -97,49 +135,30 @@ class SampledDataManager:
                 asyncio.create_task(self.redis_monitor.check_health())
                 self.last_health_check = now
 
-            buffer_key = self.get_tick_buffer_key(
-                exchange, data_type, symbol, tick_timestamp
-            )
-
-            # Store in Redis list
-            self.redis.lpush(buffer_key, json.dumps(storage_data))
-
-            # Keep only last N items (e.g., last 1000 ticks)
-            self.redis.ltrim(
-                buffer_key,
-                0,
-                get_redis_options()["sampled_data_manager"]["redis_max_len"],
-            )
+            # Backends with a tick_source already hold the tick
+            if self.tick_source is None:
+                resolution_ns = self.resolution.value
+                bucket = tick_timestamp.value // resolution_ns * resolution_ns
+                self.update_last_tick((exchange, data_type, symbol), bucket, storage_data)
+                snapshot_interval = get_config().sampled_data_manager_options.state_snapshot_interval
+                if snapshot_interval and (now - self.last_snapshot).total_seconds() >= snapshot_interval:
+                    asyncio.create_task(self.snapshot_state())
+                    self.last_snapshot = now
+
+            if self.bars is not None:
+                self.bars.add(
+                    (exchange, data_type, symbol),
+                    tick_timestamp.value,
+                    storage_data["bid_price"],
+                    storage_data["ask_price"],
+                )
 
-            # Set expiry
-            self.redis.expire(
-                buffer_key, get_redis_options()["sampled_data_manager"]["redis_expiry"]
-            )
-
-            # Get the current minute of the tick
-            current_minute = tick_timestamp.floor("min")
-
-            # print(f"Current tick minute: {current_minute}")
-            # print(f"Last sampled minute: {self.last_sampled_minute}")
-
-            if self.last_sampled_minute is None:
-                print("First tick - initializing sampling")
-                self.create_samples_for_minute(current_minute)
-                self.last_sampled_minute = current_minute
-            elif current_minute > self.last_sampled_minute:
-                print('#############################')
-                print(f"New minute detected - sampling needed")
-                print(f'exchange: {exchange}')
-                print(f"trigger time: {tick_timestamp}", pd.Timestamp.now(tz = 'UTC'))
-                print(f"Current minute: {current_minute}")
-                print(f"Last sampled: {self.last_sampled_minute}")
-                print('#############################')
-                self.create_samples_for_minute(current_minute)
-                #print('create_samples_for_minute done', pd.Timestamp.now(tz = 'UTC'))
-                self.last_sampled_minute = current_minute
-            else:
-                pass
-                # print("No sampling needed for this tick")
+            # In tick mode boundaries are sampled once a tick at or after them arrives
+            # (useful for replays); the timer mode scheduler ignores tick times
+            if self.sampling_trigger == "tick" and (
+                self.next_boundary is None or tick_timestamp >= self.next_boundary
+            ):
+                await self.sample_due_boundaries(tick_timestamp)
 
             self.monitor.timing_tracker.end("add_to_buffer")
         except Exception as e:
@@ -148,41 +167,96 @@ class SampledDataManager:
             trace = traceback.format_exc()
             self.monitor.track_error("buffer_add", symbol, str(e))
 
-    def get_all_symbols(self, minute):
-        """Get all active symbols from buffer keys"""
+    def update_last_tick(self, symbol_key, bucket, tick):
+        """Record ``tick`` as the latest one of its bucket (start time in ns)"""
+        state = self.last_ticks.get(symbol_key)
+        if state is None:
+            self.last_ticks[symbol_key] = [[bucket, tick]]
+            return
+        for i, entry in enumerate(state):
+            if bucket == entry[0]:
+                entry[1] = tick
+                return
+            if bucket > entry[0]:
+                state.insert(i, [bucket, tick])
+                break
+        else:
+            # Late tick older than every bucket kept
+            state.append([bucket, tick])
+        self._trim_state(state)
+
+    def _trim_state(self, state):
+        """
+        Drop buckets no boundary still to be sampled can use: keep those at or
+        after the oldest last sampled boundary, plus the newest one before it
+        to forward fill from, and never fewer than state_depth.
+        """
+        if len(state) <= self.state_depth:
+            return
+        keep = self.state_depth
+        if self.last_sampled:
+            keep_from = min(self.last_sampled.values()).value
+            needed = 0
+            while needed < len(state) and state[needed][0] >= keep_from:
+                needed += 1
+            keep = max(keep, needed + 1)
+        del state[keep:]
+
+    def last_tick_before(self, symbol_key, boundary):
+        """Latest tick from a bucket before ``boundary``, or None"""
+        boundary_ns = boundary.value
+        for bucket, tick in self.last_ticks.get(symbol_key, ()):
+            if bucket < boundary_ns:
+                return tick
+        return None
+
+    def get_state_key(self):
+        return f"sampler_state:{self.exchange}:{self.data_type}"
+
+    async def snapshot_state(self):
+        """Save the newest tick of each symbol so a restarted sampler can resume"""
+        try:
+            state_key = self.get_state_key()
+            mapping = {
+                symbol: encode_tick(state[0][1])
+                for (exchange, data_type, symbol), state in self.last_ticks.items()
+            }
+            if not mapping:
+                return
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(state_key, mapping=mapping)
+            pipe.expire(state_key, get_config().redis_options.sampled_data_manager.redis_expiry)
+            await pipe.execute()
+        except Exception as e:
+            print(f"Error saving sampler state: {e}")
+
+    async def restore_state(self):
+        """Load the last snapshot, if it has not expired"""
+        snapshot = await self.redis.hgetall(self.get_state_key())
+        for symbol, value in snapshot.items():
+            if isinstance(symbol, bytes):
+                symbol = symbol.decode()
+            tick = decode_tick(value, self.exchange, self.data_type, symbol)
+            bucket = pd.Timestamp(tick["timestamp"]).floor(self.resolution).value
+            self.update_last_tick((self.exchange, self.data_type, symbol), bucket, tick)
+        if snapshot:
+            print(f"Restored sampler state for {len(snapshot)} symbols")
+
+    async def get_all_symbols(self, minute):
+        """Get all symbols with a tick recent enough to be sampled at ``minute``"""
         try:
-            # Get current and previous hour to handle boundary cases
-            current_minute = minute.strftime("%Y-%m-%d:%H:%M")
-            prev_minute = (minute - timedelta(minutes=1)).strftime("%Y-%m-%d:%H:%M")
-
-            # Get all keys for both hours
-            all_keys = set()
-            for m in [current_minute, prev_minute]:
-                pattern = f"crypto_ticks_sample:*:{m}"
-                keys = self.redis.keys(pattern)
-                all_keys.update(keys)
-
-            print("all keys:", self.redis.keys("crypto_ticks_sample*"))
-
-            print(f"Found keys: {all_keys}")
-
-            symbols = set()
-            for key in all_keys:
-                if isinstance(key, bytes):
-                    key = key.decode("utf-8")
-                print(f"Processing key: {key}")
-
-                parts = key.split(":")
-                if len(parts) >= 4:  # crypto_ticks:exchange:type:symbol:date:hour
-                    exchange = parts[1]
-                    data_type = parts[2]
-                    symbol = parts[3]
-                    if exchange == self.exchange and data_type == self.data_type:
-                        symbols.add((exchange, data_type, symbol))
-                        print(f"Added symbol: ({exchange}, {data_type}, {symbol})")
-
-            print(f"Found {len(symbols)} active symbols")
-            print(f"Symbols: {symbols}")
+            if self.tick_source is not None:
+                return await self.tick_source.get_symbols(self.exchange, self.data_type)
+
+            # Quiet symbols are forward filled until their last tick is max_tick_age old
+            max_tick_age = pd.Timedelta(seconds=get_config().sampled_data_manager_options.max_tick_age)
+            oldest_ns = (minute - max_tick_age - self.resolution).value
+            symbols = {
+                symbol_key
+                for symbol_key, state in self.last_ticks.items()
+                if symbol_key[:2] == (self.exchange, self.data_type) and state[0][0] >= oldest_ns
+            }
+
             return symbols
 
         except Exception as e:
@@ -192,7 +266,7 @@ class SampledDataManager:
             print(traceback.format_exc())
             return set()
 
-    def get_last_tick_before_minute(self, exchange, data_type, symbol, minute):
+    async def get_last_tick_before_minute(self, exchange, data_type, symbol, minute):
         """Get the most recent tick before the given minute, checking previous hour if needed"""
         try:
             if not isinstance(minute, pd.Timestamp):
@@ -200,24 +274,14 @@ class SampledDataManager:
             if minute.tzinfo is None:
                 minute = minute.tz_localize("UTC")
 
-            print(f"\nGetting last tick for {symbol} before {minute}")
-
-            # Get keys for current and previous minute
-            prev_minute = minute - pd.Timedelta(minutes=1)
-            prev_key = self.get_tick_buffer_key(
-                exchange, data_type, symbol, prev_minute
-            )
-
-            print(f"Checking previous hour key: {prev_key}")
-
-            # Get ticks from the prev_minute hour
-            all_ticks = []
-            # for key in [current_key, prev_key]:
-            last_tick = self.redis.lindex(prev_key, 0)
+            if self.tick_source is not None:
+                last_tick = await self.tick_source.get_last_tick_before(
+                    exchange, data_type, symbol, minute
+                )
+            else:
+                last_tick = self.last_tick_before((exchange, data_type, symbol), minute)
             if last_tick is None:
-                print(f"No ticks found for {symbol}")
                 return None
-            last_tick = json.loads(last_tick)
             last_tick_time = pd.Timestamp(last_tick["timestamp"])
             # print(f"Found {len(all_ticks)} total ticks")
             # Filter out the latest available tick before the minute
@@ -225,7 +289,8 @@ class SampledDataManager:
             # Check time difference
             time_diff = minute - last_tick_time
 
-            if time_diff.total_seconds() > self._sampled_redis_options["max_tick_age"]:
+            max_tick_age = get_config().sampled_data_manager_options.max_tick_age
+            if time_diff.total_seconds() > max_tick_age:
                 print(f"Warning: Tick too old for {symbol}")
                 return None
             if time_diff.total_seconds() < 0:
@@ -242,101 +307,178 @@ class SampledDataManager:
             print(traceback.format_exc())
             return None
 
-    def save_sample_to_disk(self, exchange, data_type, symbol, sampled_data):
-        """Save sampled data to disk"""
-        try:
-            sample_date = pd.Timestamp(sampled_data["sampling_timestamp"]).strftime(
-                "%Y-%m-%d"
-            )
-            base_path = (
-                Path(get_recording_options()["precise_sampler_dir"])
-                / "sampled"
-                / exchange
-                / data_type
-                / symbol
-            )
-            base_path.mkdir(parents=True, exist_ok=True)
-
-            file_path = base_path / f"{sample_date}_sampled.jsonl"
-
-            print(
-                f"\nSaving sample to disk: {symbol} tick timestamp {sampled_data['timestamp']}, sample time: {sampled_data['sampling_timestamp']}"
-            )
-
-            with open(file_path, "a") as f:
-                json_str = json.dumps(sampled_data)
-                f.write(json_str + "\n")
-                f.flush()
-                os.fsync(f.fileno())
+    def get_sample_file_path(self, exchange, data_type, symbol, sampled_data, interval="1min", kind="sampled"):
+        """Daily jsonl file a sample (or bar) is appended to"""
+        base_path = Path(get_config().recording_options.precise_sampler_dir) / RECORD_KINDS[kind][2]
+        return (
+            base_path / exchange / data_type / symbol
+            / sample_file_name(sampled_data["sampling_timestamp"][:10], interval, kind)
+        )
 
+    def save_sample_to_disk(self, exchange, data_type, symbol, sampled_data, interval="1min", kind="sampled"):
+        """Queue sampled data for the background file writer"""
+        try:
+            path = self.get_sample_file_path(exchange, data_type, symbol, sampled_data, interval, kind)
+            self.sample_writer.write(path, sampled_data)
         except Exception as e:
             print(f"Error saving to disk: {e}")
             import traceback
 
             print(traceback.format_exc())
 
-    def get_latest_minute_sample_channel_name(self, exchange, data_type, symbol):
+    def get_latest_minute_sample_channel_name(self, exchange, data_type, symbol, interval="1min", kind="sampled"):
         """Get Redis pub/sub channel name for sample updates"""
-        return f"latest_samples:{exchange}:{data_type}:{symbol}"
+        return f"{RECORD_KINDS[kind][1]}:{exchange}:{data_type}:{symbol}{self.interval_suffix(interval)}"
 
-    def publish_sample(self, exchange, data_type, symbol, sampled_data):
-        """Publish sample updates to various channels"""
-        try:
-            message = {
-                'data': sampled_data,
-                'publish_time': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
-            }
-            message_json = json.dumps(message)
-            
-            # Publish to symbol-specific channel
-            symbol_channel = self.get_latest_minute_sample_channel_name(exchange, data_type, symbol)
-            self.redis.publish(symbol_channel, message_json)
-            
-            # Publish to exchange-wide channel
-            exchange_channel = f"latest_samples:{exchange}:{data_type}"
-            self.redis.publish(exchange_channel, message_json)
-            
-        except Exception as e:
-            print(f"Error publishing sample: {e}")
-            import traceback
-            print(traceback.format_exc())
+    def publish_sample(self, pipe, exchange, data_type, symbol, sampled_data, interval="1min", kind="sampled", publish_time=None):
+        """Add the sample update publishes to ``pipe``"""
+        message = {
+            'data': sampled_data,
+            'publish_time': publish_time or datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        }
+        message_json = json.dumps(message)
+
+        # Publish to symbol-specific channel
+        symbol_channel = self.get_latest_minute_sample_channel_name(exchange, data_type, symbol, interval, kind)
+        pipe.publish(symbol_channel, message_json)
+
+        # Publish to exchange-wide channel
+        exchange_channel = f"{RECORD_KINDS[kind][1]}:{exchange}:{data_type}{self.interval_suffix(interval)}"
+        pipe.publish(exchange_channel, message_json)
+
+    async def save_samples(self, records):
+        """
+        Save samples (and bars) to Redis and disk.
+
+        ``records`` is a list of (exchange, data_type, symbol, sampled_data,
+        minute, interval, kind). All Redis commands go out in one pipeline
+        and the disk writes are queued for the background writer, so the
+        cost at a boundary is one round trip whatever the symbol count.
+        The publishes are queued after every write: subscribers (SampleQuery)
+        reload the window when notified, so it must already hold the sample.
+        """
+        if not records:
+            return
+        samples_to_keep = get_config().sampled_data_manager_options.number_of_minute_samples_to_keep
+        publish_time = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        pipe = self.redis.pipeline(transaction=False)
+        for exchange, data_type, symbol, sampled_data, minute, interval, kind in records:
+            sample_key = self.get_sample_key(exchange, data_type, symbol, interval, kind)
+            pipe.set(sample_key, json.dumps(sampled_data))
 
-    def save_sample(self, exchange, data_type, symbol, sampled_data, minute):
-        """Save the sample to Redis and disk"""
-        try:
-            print(f"\nSaving sample for {symbol} at {minute}")
-            
-            # Save to Redis
-            sample_key = self.get_sample_key(exchange, data_type, symbol)
-            self.redis.set(sample_key, json.dumps(sampled_data))
-            
-            # Publish updates
-            self.publish_sample(exchange, data_type, symbol, sampled_data)
-            
             # Save window
             window_key = f"{sample_key}:window"
-            self.redis.rpush(window_key, json.dumps(sampled_data))
-            self.redis.ltrim(window_key, 
-                            -self._sampled_redis_options["number_of_minute_samples_to_keep"],
-                            -1)
-            
+            minute_score = int(minute.timestamp())
+            # Latest sample and pub/sub stay JSON for external readers, the window is packed
+            pipe.rpush(window_key, encode_tick(sampled_data))
+            pipe.ltrim(window_key, -samples_to_keep, -1)
+            index = self.record_indexes[kind]
+            index.add(pipe, exchange, data_type, sample_key, minute_score)
+            index.add(pipe, exchange, data_type, window_key, minute_score)
+
             # Save to disk
-            self.save_sample_to_disk(exchange, data_type, symbol, sampled_data)
-            
+            self.save_sample_to_disk(exchange, data_type, symbol, sampled_data, interval, kind)
+
+        # Publish updates
+        for exchange, data_type, symbol, sampled_data, minute, interval, kind in records:
+            self.publish_sample(pipe, exchange, data_type, symbol, sampled_data, interval, kind, publish_time)
+
+        try:
+            await pipe.execute()
         except Exception as e:
-            print(f"Error saving sample: {e}")
+            print(f"Error saving {len(records)} samples to Redis: {e}")
             import traceback
             print(traceback.format_exc())
 
-    def create_samples_for_minute(self, minute):
+    async def save_sample(self, exchange, data_type, symbol, sampled_data, minute, interval="1min", kind="sampled"):
+        """Save one sample (or bar, with kind="bars") to Redis and disk"""
+        await self.save_samples([(exchange, data_type, symbol, sampled_data, minute, interval, kind)])
+
+    async def sample_due_boundaries(self, now):
+        """
+        Sample every boundary at or before ``now`` that each interval has not
+        sampled yet, so boundaries skipped by a stalled loop or a gap in the
+        ticks are back-filled with the last tick before them.
+        """
+        max_backfill = get_config().sampled_data_manager_options.max_backfill_boundaries
+        for name, interval in self.intervals.items():
+            due = now.floor(interval)
+            last = self.last_sampled.get(name)
+            if last is None:
+                last = due - interval
+            boundary = max(last + interval, due - interval * (max_backfill - 1))
+            while boundary <= due:
+                await self.create_samples_for_boundary(boundary, name)
+                boundary += interval
+            self.last_sampled[name] = max(last, due)
+        self.next_boundary = min(self.last_sampled[name] + interval for name, interval in self.intervals.items())
+
+    async def run_scheduler(self):
+        """
+        Sample on wall-clock boundaries, ``allowed_lateness`` after each one.
+
+        Ticks with an event time before a boundary that arrive later than
+        the watermark are not part of that boundary's sample.
+        """
+        now = pd.Timestamp.now(tz="UTC") - self.allowed_lateness
+        for name, interval in self.intervals.items():
+            self.last_sampled.setdefault(name, now.floor(interval))
+        self.next_boundary = min(self.last_sampled[name] + interval for name, interval in self.intervals.items())
+        while True:
+            delay = (self.next_boundary + self.allowed_lateness - pd.Timestamp.now(tz="UTC")).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                await self.sample_due_boundaries(pd.Timestamp.now(tz="UTC") - self.allowed_lateness)
+            except Exception as e:
+                print(f"Error in sampling scheduler: {e}")
+                await asyncio.sleep(self.resolution.total_seconds())
+
+    def collect_bars(self, boundary, interval, records):
+        """Append the ``interval`` bars that end at or before ``boundary`` to ``records``"""
+        max_tick_age = pd.Timedelta(seconds=get_config().sampled_data_manager_options.max_tick_age)
+        finished = self.bars.close_until(interval, boundary.value, (boundary - max_tick_age).value)
+        for (exchange, data_type, symbol), bars in finished.items():
+            for bar in bars:
+                try:
+                    records.append(
+                        (
+                            exchange,
+                            data_type,
+                            symbol,
+                            bar.to_record(exchange, data_type, symbol),
+                            pd.Timestamp(bar.end, tz="UTC"),
+                            interval,
+                            "bars",
+                        )
+                    )
+                except Exception as e:
+                    self.monitor.track_error("bars", symbol, str(e))
+
+    async def stop(self):
+        if self._scheduler_task is not None:
+            self._scheduler_task.cancel()
+            await asyncio.gather(self._scheduler_task, return_exceptions=True)
+            self._scheduler_task = None
+        await self.sample_writer.close()
+
+    async def create_samples_for_minute(self, minute):
+        await self.create_samples_for_boundary(minute, "1min")
+
+    async def create_samples_for_boundary(self, minute, interval):
         try:
             self.monitor.timing_tracker.start("sampling")
-            symbols = self.get_all_symbols(minute)
+            if self.tick_source is not None:
+                # Buffered ticks must reach the stream before looking up the boundary
+                await self.tick_source.flush_pending()
+            symbols = await self.get_all_symbols(minute)
+            # Everything sampled at this boundary, saved together at the end
+            records = []
 
             for exchange, data_type, symbol in symbols:
                 #print(f"\nProcessing symbol: {symbol}", pd.Timestamp.now(tz = 'UTC'))
                 try:
-                    last_tick = self.get_last_tick_before_minute(
+                    last_tick = await self.get_last_tick_before_minute(
                         exchange, data_type, symbol, minute
                     )
                     if last_tick:
@@ -345,11 +487,11 @@ class SampledDataManager:
                             sampled_data = {
                                 **last_tick,
                                 "sampling_timestamp": minute.strftime(
-                                    "%Y-%m-%dT%H:%M:00.000Z"
+                                    "%Y-%m-%dT%H:%M:%S.000Z"
                                 ),
                             }
-                            self.save_sample(
-                                exchange, data_type, symbol, sampled_data, minute
+                            records.append(
+                                (exchange, data_type, symbol, sampled_data, minute, interval, "sampled")
                             )
                             self.monitor.track_sample(symbol, minute)
                         else:
@@ -365,25 +507,38 @@ class SampledDataManager:
                 except Exception as e:
                     self.monitor.track_error("sampling", symbol, str(e))
 
+            if self.bars is not None:
+                self.collect_bars(minute, interval, records)
+            await self.save_samples(records)
+
             self.monitor.timing_tracker.end("sampling")
+            self.monitor.track_boundary_lag(
+                interval, (pd.Timestamp.now(tz="UTC") - minute).total_seconds()
+            )
 
         except Exception as e:
             self.monitor.track_error("sampling_all", "all_symbols", str(e))
             raise
 
 
-class EnhancedRedisTickCache(RedisTickCache):
-    def __init__(self, topic, host="localhost", port=6379, db=0):
-        super().__init__(topic, host, port, db)
-        self.sampled_data = SampledDataManager(topic, self.redis)
+class SamplingTickCacheMixin:
+    """Feeds every tick added to a tick cache into a SampledDataManager"""
 
-    def add_tick(self, tick_data, storage_data):
+    async def initialize(self):
+        await super().initialize()
+        await self.sampled_data.initialize()
+
+    async def close(self):
+        await self.sampled_data.stop()
+        await super().close()
+
+    async def add_tick(self, tick_data, storage_data):
         try:
             # Store raw tick as before
-            super().add_tick(tick_data, storage_data)
+            await super().add_tick(tick_data, storage_data)
 
             # Process for sampling
-            self.sampled_data.add_to_buffer(
+            await self.sampled_data.add_to_buffer(
                 tick_data["market_data"]["exchange"],
                 tick_data["market_data"]["type"],
                 tick_data["market_data"]["symbol"],
@@ -392,3 +547,34 @@ class EnhancedRedisTickCache(RedisTickCache):
             )
         except Exception as e:
             print(f"Error in add_tick: {e}")
+
+
+class EnhancedRedisTickCache(SamplingTickCacheMixin, RedisTickCache):
+    def __init__(self, topic, host=None, port=None, db=None):
+        super().__init__(topic, host, port, db)
+        self.sampled_data = SampledDataManager(topic, self.redis)
+
+
+class EnhancedRedisStreamTickCache(SamplingTickCacheMixin, RedisStreamTickCache):
+    def __init__(self, topic, host=None, port=None, db=None):
+        super().__init__(topic, host, port, db)
+        self.sampled_data = SampledDataManager(topic, self.redis, tick_source=self)
+
+
+class EnhancedMemoryTickCache(SamplingTickCacheMixin, MemoryTickCache):
+    def __init__(self, topic, capacity=None):
+        super().__init__(topic, capacity)
+        # Ticks stay in process; Redis is only used for the finished samples
+        self.sampled_data = SampledDataManager(topic, get_redis_client(), tick_source=self)
+
+
+def create_sampling_tick_cache(topic):
+    """Sampling tick cache for the backend selected in redis_options.redis_tick_cache"""
+    backend = get_config().redis_options.redis_tick_cache.backend
+    if backend == "streams":
+        return EnhancedRedisStreamTickCache(topic)
+    if backend == "lists":
+        return EnhancedRedisTickCache(topic)
+    if backend == "memory":
+        return EnhancedMemoryTickCache(topic)
+    raise ValueError(f"Unknown tick cache backend: {backend}")
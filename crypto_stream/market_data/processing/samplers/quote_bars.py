@@ -0,0 +1,180 @@
+import pandas as pd
+
+
+class QuoteBar:
+    """
+    Running aggregates of one symbol's quotes over [start, end).
+
+    Time weighted averages integrate mid and spread over event time: each
+    value counts until the next tick, and the value carried in from the
+    previous bar counts from ``start`` to the first tick. Open is the quote
+    in force at ``start`` when there is one, so bars without ticks are flat
+    forward fills.
+    """
+
+    __slots__ = (
+        "start", "end", "open", "high", "low", "close", "count",
+        "min_spread", "max_spread", "mid_area", "spread_area", "covered",
+        "last_ns", "last_mid", "last_spread", "last_tick_ns",
+    )
+
+    def __init__(self, start, end, carry=None):
+        self.start = start
+        self.end = end
+        self.count = 0
+        self.mid_area = 0.0
+        self.spread_area = 0.0
+        self.covered = 0
+        self.last_ns = start
+        if carry is None:
+            self.open = self.high = self.low = self.close = None
+            self.min_spread = self.max_spread = None
+            self.last_mid = self.last_spread = self.last_tick_ns = None
+        else:
+            mid, spread, self.last_tick_ns = carry
+            self.open = self.high = self.low = self.close = mid
+            self.min_spread = self.max_spread = spread
+            self.last_mid, self.last_spread = mid, spread
+
+    def _advance(self, ns):
+        if self.last_mid is not None and ns > self.last_ns:
+            elapsed = ns - self.last_ns
+            self.mid_area += self.last_mid * elapsed
+            self.spread_area += self.last_spread * elapsed
+            self.covered += elapsed
+        if ns > self.last_ns:
+            self.last_ns = ns
+
+    def update(self, ns, mid, spread):
+        self._advance(ns)
+        if self.open is None:
+            self.open = self.high = self.low = mid
+            self.min_spread = self.max_spread = spread
+        else:
+            if mid > self.high:
+                self.high = mid
+            if mid < self.low:
+                self.low = mid
+            if spread < self.min_spread:
+                self.min_spread = spread
+            if spread > self.max_spread:
+                self.max_spread = spread
+        self.close = mid
+        self.last_mid, self.last_spread = mid, spread
+        self.last_tick_ns = ns
+        self.count += 1
+
+    def finish(self):
+        """Close the bar at ``end``; returns the (mid, spread, tick time) to carry into the next one"""
+        self._advance(self.end)
+        if self.last_mid is None:
+            return None
+        return self.last_mid, self.last_spread, self.last_tick_ns
+
+    def to_record(self, exchange, data_type, symbol):
+        return {
+            "bar_start": _iso(self.start),
+            "sampling_timestamp": _iso(self.end),
+            "symbol": symbol,
+            "exchange": exchange,
+            "type": data_type,
+            "open_mid": self.open,
+            "high_mid": self.high,
+            "low_mid": self.low,
+            "close_mid": self.close,
+            "twap_mid": self.mid_area / self.covered if self.covered else self.close,
+            "twap_spread": self.spread_area / self.covered if self.covered else self.last_spread,
+            "min_spread": self.min_spread,
+            "max_spread": self.max_spread,
+            "tick_count": self.count,
+        }
+
+
+def _iso(ns):
+    return pd.Timestamp(ns, tz="UTC").strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class QuoteBarAggregator:
+    """
+    Incremental quote bars per (symbol, interval), fed tick by tick.
+
+    A tick in a later bar than the open one closes the open bar (and
+    forward fills any empty bars in between); close_until() does the same
+    when a boundary is sampled, so bars with no ticks still come out.
+    Ticks older than the open bar are ignored, like samples past the
+    watermark.
+    """
+
+    def __init__(self, intervals, max_gap_bars=1000):
+        # Interval name -> bar length in ns
+        self.intervals = {name: pd.Timedelta(interval).value for name, interval in intervals.items()}
+        self.max_gap_bars = max_gap_bars
+        # (symbol_key, interval name) -> open QuoteBar
+        self.open_bars = {}
+        # (symbol_key, interval name) -> finished QuoteBars not yet taken
+        self.finished = {}
+        self.late_ticks = 0
+
+    def add(self, symbol_key, ns, bid_price, ask_price):
+        if bid_price is None or ask_price is None:
+            return
+        mid = (bid_price + ask_price) / 2
+        spread = ask_price - bid_price
+        for name, length in self.intervals.items():
+            start = ns // length * length
+            bar_key = (symbol_key, name)
+            bar = self.open_bars.get(bar_key)
+            if bar is None:
+                bar = self.open_bars[bar_key] = QuoteBar(start, start + length)
+            elif start != bar.start:
+                if start < bar.start:
+                    self.late_ticks += 1
+                    continue
+                bar = self._roll(bar_key, bar, start, length)
+            bar.update(ns, mid, spread)
+
+    def _roll(self, bar_key, bar, start, length):
+        """Finish ``bar`` and the empty bars up to ``start``; returns the new open bar"""
+        finished = self.finished.setdefault(bar_key, [])
+        carry = bar.finish()
+        finished.append(bar)
+        next_start = bar.end
+        if (start - next_start) // length > self.max_gap_bars:
+            next_start = start - self.max_gap_bars * length
+        while next_start < start:
+            empty = QuoteBar(next_start, next_start + length, carry)
+            empty.finish()
+            finished.append(empty)
+            next_start += length
+        bar = self.open_bars[bar_key] = QuoteBar(start, start + length, carry)
+        return bar
+
+    def close_until(self, name, boundary_ns, stale_before_ns=None):
+        """
+        Finish every ``name`` bar ending at or before ``boundary_ns`` and
+        return {symbol_key: [QuoteBar, ...]} in time order.
+
+        Symbols whose last tick is older than ``stale_before_ns`` stop being
+        forward filled.
+        """
+        length = self.intervals[name]
+        result = {}
+        for bar_key, bar in list(self.open_bars.items()):
+            symbol_key, bar_name = bar_key
+            if bar_name != name:
+                continue
+            if bar.end <= boundary_ns:
+                if stale_before_ns is not None and (bar.last_tick_ns is None or bar.last_tick_ns < stale_before_ns):
+                    del self.open_bars[bar_key]
+                    if bar.count:
+                        bar.finish()
+                        self.finished.setdefault(bar_key, []).append(bar)
+                else:
+                    self._roll(bar_key, bar, boundary_ns // length * length, length)
+            finished = self.finished.get(bar_key)
+            if finished:
+                done = [b for b in finished if b.end <= boundary_ns]
+                if done:
+                    self.finished[bar_key] = [b for b in finished if b.end > boundary_ns]
+                    result[symbol_key] = done
+        return result
@@ -0,0 +1,223 @@
+"""
+Offline resampling of recorded tick files.
+
+Reads the DiskWriter output (``<tick_dir>/<exchange>/<type>/<symbol>/<date>.jsonl``)
+and writes the sample files SampledDataManager would have written for the
+same ticks: at every boundary, the last tick strictly before it, unless it
+is more than max_tick_age old. Each tick file is one job in a process
+pool; the boundaries of a day are matched to its ticks with a single
+as-of join. Ticks from the end of the previous day's file carry into the
+first boundaries of the day.
+
+The live sampler keeps the last tick to arrive, so the files are identical
+as long as the recorded ticks were in event time order. Files are replaced
+whole, so do not resample a day the live sampler is still writing. With
+--start/--end only the samples inside the range are replaced; the rest of
+an existing day file is kept.
+
+Tick files with a sidecar index (storage/disk/file_index.py) are read
+only for the requested time range; output files get a fresh index.
+
+    crypto-stream resample --start 2025-01-16 --end 2025-01-17 -i 1s -i 1min
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from crypto_stream.configs.config import get_config
+from crypto_stream.storage.disk.file_index import (
+    format_records,
+    index_file,
+    index_path,
+    load_file_index,
+    read_jsonl_range,
+    write_file_index,
+)
+from crypto_stream.utils.json_utils import loads
+from crypto_stream.utils.str_utils import RECORD_KINDS, sample_file_name
+from crypto_stream.utils.tick_codec import iso_to_ns
+
+_NS_PER_DAY = 86400 * 1_000_000_000
+_TAIL_BLOCK = 1 << 16
+
+
+def _read_ticks(path):
+    """Tick dicts of a recorded file, in file order"""
+    with open(path, "rb") as f:
+        return [loads(line) for line in f if line.strip()]
+
+
+def _read_tail(path, since_ns):
+    """Ticks at the end of ``path``, reading backwards until one is older than ``since_ns``"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0:
+            size = min(_TAIL_BLOCK, position)
+            position -= size
+            f.seek(position)
+            data = f.read(size) + data
+            # The first line may be cut unless the start of the file was reached
+            lines = data.split(b"\n")
+            complete = lines if position == 0 else lines[1:]
+            ticks = [loads(line) for line in complete if line.strip()]
+            if ticks and iso_to_ns(ticks[0]["timestamp"]) < since_ns:
+                return ticks
+        return [loads(line) for line in data.split(b"\n") if line.strip()]
+
+
+def _merge_existing(out_path, samples, first_ns, last_ns):
+    """``samples`` with the rows of ``out_path`` outside [first_ns, last_ns), by sampling time"""
+    if not out_path.exists():
+        return samples
+    kept = [
+        record
+        for record in _read_ticks(out_path)
+        if not first_ns <= iso_to_ns(record["sampling_timestamp"]) < last_ns
+    ]
+    merged = kept + samples
+    merged.sort(key=lambda record: iso_to_ns(record["sampling_timestamp"]))
+    return merged
+
+
+def sample_ticks(ticks, boundaries, max_tick_age):
+    """
+    (boundary index, tick index) pairs: the last tick strictly before each
+    boundary (by event time, file order among equal times) that is at most
+    ``max_tick_age`` seconds old. Boundaries are ns since epoch, ascending.
+    """
+    tick_ns = np.fromiter((iso_to_ns(tick["timestamp"]) for tick in ticks), dtype="i8", count=len(ticks))
+    right = pd.DataFrame({"tick_ns": tick_ns, "tick": np.arange(len(ticks))})
+    right = right.sort_values("tick_ns", kind="stable")
+    left = pd.DataFrame({"boundary_ns": boundaries, "boundary": np.arange(len(boundaries))})
+    joined = pd.merge_asof(
+        left,
+        right,
+        left_on="boundary_ns",
+        right_on="tick_ns",
+        direction="backward",
+        allow_exact_matches=False,
+    )
+    age = (joined["boundary_ns"] - joined["tick_ns"]) / 1e9
+    found = joined["tick"].notna() & (age <= max_tick_age)
+    joined = joined[found]
+    return zip(joined["boundary"].to_numpy(), joined["tick"].to_numpy().astype("i8"))
+
+
+def resample_file(path, intervals, output_dir, max_tick_age, previous_path=None, start=None, end=None):
+    """
+    Write the sample files of one recorded tick file (one symbol and day)
+    for every interval; returns {output path: number of samples}. When
+    ``start``/``end`` cut into the day, existing samples outside them are kept.
+    """
+    path = Path(path)
+    exchange, data_type, symbol = path.parts[-4:-1]
+    day_ns = pd.Timestamp(path.stem, tz="UTC").value
+    first_ns, last_ns = day_ns, day_ns + _NS_PER_DAY
+    if start is not None:
+        first_ns = max(first_ns, pd.Timestamp(start, tz="UTC").value)
+    if end is not None:
+        last_ns = min(last_ns, pd.Timestamp(end, tz="UTC").value)
+
+    # Ticks older than max_tick_age at the first boundary, or at/after the last one, are never sampled
+    since_ns = first_ns - int(max_tick_age * 1e9)
+    if start is None and end is None:
+        ticks = _read_ticks(path)
+    else:
+        ticks = read_jsonl_range(path, since_ns, last_ns)
+    if previous_path is not None and since_ns < day_ns:
+        if load_file_index(previous_path) is not None:
+            ticks = read_jsonl_range(previous_path, since_ns, day_ns) + ticks
+        else:
+            ticks = _read_tail(previous_path, since_ns) + ticks
+    partial = first_ns > day_ns or last_ns < day_ns + _NS_PER_DAY
+
+    out_dir = Path(output_dir) / RECORD_KINDS["sampled"][2] / exchange / data_type / symbol
+    written = {}
+    for interval in intervals:
+        step = pd.Timedelta(interval).value
+        boundaries = np.arange(-(-first_ns // step) * step, last_ns, step, dtype="i8")
+        if not len(boundaries):
+            continue
+        labels = pd.DatetimeIndex(boundaries, tz="UTC").strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        samples = [
+            {**ticks[tick], "sampling_timestamp": labels[boundary]}
+            for boundary, tick in sample_ticks(ticks, boundaries, max_tick_age)
+        ] if ticks else []
+        out_path = out_dir / sample_file_name(path.stem, interval, "sampled")
+        if partial:
+            samples = _merge_existing(out_path, samples, first_ns, last_ns)
+        if not samples:
+            continue
+        data, rows = format_records(samples, "sampling_timestamp")
+        out_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = out_path.with_name(out_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # Drop the old index first, so it never describes the new file
+        index_path(out_path).unlink(missing_ok=True)
+        os.replace(tmp_path, out_path)
+        write_file_index(out_path, index_file(out_path, rows))
+        written[str(out_path)] = len(samples)
+    return written
+
+
+def find_tick_files(tick_dir, exchange=None, data_type=None, symbols=None, start=None, end=None):
+    """[(path, previous day's path or None)] of the recorded tick files to resample"""
+    jobs = []
+    first_date = pd.Timestamp(start).strftime("%Y-%m-%d") if start is not None else None
+    last_date = pd.Timestamp(end).strftime("%Y-%m-%d") if end is not None else None
+    for path in sorted(Path(tick_dir).glob("*/*/*/*.jsonl")):
+        file_exchange, file_type, symbol = path.parts[-4:-1]
+        if exchange and file_exchange != exchange:
+            continue
+        if data_type and file_type != data_type:
+            continue
+        if symbols and symbol not in symbols:
+            continue
+        if first_date and path.stem < first_date or last_date and path.stem > last_date:
+            continue
+        previous = path.with_name((pd.Timestamp(path.stem) - pd.Timedelta(days=1)).strftime("%Y-%m-%d") + ".jsonl")
+        jobs.append((path, previous if previous.exists() else None))
+    return jobs
+
+
+def resample(
+    tick_dir=None,
+    output_dir=None,
+    intervals=None,
+    exchange=None,
+    data_type=None,
+    symbols=None,
+    start=None,
+    end=None,
+    workers=None,
+):
+    """Resample every matching tick file in a process pool; returns {output path: samples}"""
+    config = get_config()
+    tick_dir = tick_dir or config.recording_options.recorder_consumer_dir
+    output_dir = output_dir or config.recording_options.precise_sampler_dir
+    intervals = intervals or config.sampled_data_manager_options.sampling_intervals
+    max_tick_age = config.sampled_data_manager_options.max_tick_age
+
+    jobs = find_tick_files(tick_dir, exchange, data_type, symbols, start, end)
+    print(f"Resampling {len(jobs)} tick files at {', '.join(intervals)}")
+    written = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(resample_file, path, intervals, output_dir, max_tick_age, previous, start, end): path
+            for path, previous in jobs
+        }
+        for future in as_completed(futures):
+            try:
+                written.update(future.result())
+            except Exception as e:
+                print(f"Error resampling {futures[future]}: {e}")
+    print(f"Wrote {sum(written.values())} samples to {len(written)} files")
+    return written
@@ -1,22 +1,22 @@
 import asyncio
-import json
 import logging
 import os
 from asyncio import to_thread
 from datetime import datetime
 from pathlib import Path
 
-from crypto_stream.configs.config import (get_kafka_options,
-                                          get_recording_options)
+from crypto_stream.configs.config import get_config, start_config_watcher
 from crypto_stream.kafka_utils.consumer import create_kafka_consumer
+from crypto_stream.storage.disk.group_commit import close_group_commit_writer
 from crypto_stream.storage.disk.writer import DiskWriter
-from crypto_stream.storage.redis.tick_cache import RedisTickCache
+from crypto_stream.storage.redis.connection import close_connection_pools
 from crypto_stream.utils.data_utils import (
-    calculate_quote_spreads, format_quote_data,
-    prepare_storage_quote_sampling_data)
+    format_quote_data, prepare_storage_quote_sampling_data)
+from crypto_stream.utils.str_utils import parse_topic
+from crypto_stream.utils.tick_codec import (decode_quote_message,
+                                            symbol_from_message_key)
 
-from .samplers.precise_sampler import (EnhancedRedisTickCache,
-                                       SampledDataManager)
+from .samplers.precise_sampler import create_sampling_tick_cache
 
 logger = logging.getLogger(__name__)
 
@@ -29,21 +29,44 @@ class SamplingQuoteRecorderConsumer:
         # self._kafka_topics = [ 'crypto-ticks-binance-quote']
         self._kafka_topics = [topic]
         self._consumer.subscribe(self._kafka_topics)
-        self._cache = EnhancedRedisTickCache(topic)
+        self._cache = create_sampling_tick_cache(topic)
         self._writer = DiskWriter(self._data_dir, topic)
 
+    def decode_value(self, msg):
+        """Normalized frame dict from a JSON or binary (utils.tick_codec) value"""
+        exchange, data_type = parse_topic(msg.topic())
+        symbol = symbol_from_message_key(msg.key(), exchange, data_type)
+        return decode_quote_message(msg.value(), exchange, data_type, symbol)
+
     async def process_message(self, msg):
         """Process a single Kafka message"""
         try:
-            raw_data = json.loads(msg.value().decode("utf-8"))
+            raw_data = self.decode_value(msg)
             tick_data = format_quote_data(raw_data)
             #spreads = calculate_quote_spreads(tick_data)
             storage_data = prepare_storage_quote_sampling_data(tick_data)
-            self._cache.add_tick(tick_data, storage_data)
+            await self._cache.add_tick(tick_data, storage_data)
         except Exception as e:
             print("sampling_recorder_consumer process_message error:", e)
             # logger.error(f"Error processing message: {e}", exc_info=True)
 
+    async def process_batch(self, msgs):
+        """Decode and format a batch of Kafka messages, then cache them together"""
+        ticks = []
+        for msg in msgs:
+            if msg.error():
+                logger.error(f"Consumer error: {msg.error()}")
+                continue
+            try:
+                raw_data = self.decode_value(msg)
+                tick_data = format_quote_data(raw_data)
+                storage_data = prepare_storage_quote_sampling_data(tick_data)
+                ticks.append((tick_data, storage_data))
+            except Exception as e:
+                print("sampling_recorder_consumer process_batch error:", e)
+        if ticks:
+            await self._cache.add_ticks(ticks)
+
     async def run(self):
         """Main consumer loop"""
         try:
@@ -52,21 +75,25 @@ class SamplingQuoteRecorderConsumer:
             # temporary topic
             # Start the flush loop
 
+            await self._cache.initialize()
+
             # there is a race condition between this flush thing and sampling function
             flush_task = asyncio.create_task(self._writer.start_flush_loop(self._cache))
+            compaction_task = asyncio.create_task(self._writer.start_compaction_loop())
             logger.info("Started flush loop")
 
             while True:
                 try:
-                    msg = await to_thread(self._consumer.poll, 0.001)
-                    if msg is None:
-                        continue
-
-                    if msg.error():
-                        logger.error(f"Consumer error: {msg.error()}")
-                        continue
-
-                    await self.process_message(msg)
+                    consumer_options = get_config().kafka_options.consumer
+                    msgs = await to_thread(
+                        self._consumer.consume,
+                        consumer_options.batch_size,
+                        consumer_options.batch_timeout,
+                    )
+                    if msgs:
+                        await self.process_batch(msgs)
+                    else:
+                        await self._cache.flush_pending_if_due()
 
                 except Exception as e:
                     logger.error(f"Error in consumer loop: {e}", exc_info=True)
@@ -76,17 +103,24 @@ class SamplingQuoteRecorderConsumer:
             logger.error(f"Fatal error in consumer: {e}", exc_info=True)
         finally:
             self._writer.running = False
-            self._consumer.close()
+            try:
+                await self._cache.close()
+                await self._cache.flush_pending()
+                await to_thread(close_group_commit_writer)
+            finally:
+                self._consumer.close()
+                await close_connection_pools()
 
 
 def run_sampling(topic):
     """Entry point for the recorder consumer"""
 
+    recording_options = get_config().recording_options
     consumer = SamplingQuoteRecorderConsumer(
-        data_dir=get_recording_options()["recorder_consumer_dir"], topic=topic
+        data_dir=recording_options.recorder_consumer_dir, topic=topic
     )
     log_dir = os.path.join(
-        get_recording_options()["recorder_consumer_dir"],
+        recording_options.recorder_consumer_dir,
         "logs",
         consumer._kafka_topics[0],
     )
@@ -108,6 +142,7 @@ def run_sampling(topic):
     )
 
     print("start main")
+    start_config_watcher()
     try:
         asyncio.run(consumer.run())
     except KeyboardInterrupt:
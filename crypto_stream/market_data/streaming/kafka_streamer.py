@@ -2,13 +2,18 @@
 import asyncio
 import json
 import logging
+import random
 import urllib
+from multiprocessing import Process
 
 import aiohttp
 
-from ...configs.config import get_stream_options, load_config
-from ...kafka_utils.producer import send_to_kafka
-from ..processing.data_process import process_quote_data
+from ...configs.config import (get_config, get_stream_options,
+                               start_config_watcher, subscribe)
+from ...kafka_utils.producer import AsyncKafkaProducer
+from ..processing.data_process import tick_handlers
+from .messages import prepare_message
+from .sharding import shard_stream_options
 
 # Set up logging
 logging.basicConfig(
@@ -17,74 +22,185 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def handle_message(exchange, data_type, symbol, msg):
-    # Parse the original message data
-    data = json.loads(msg.data)
-
-    # Add data_type to the message payload
-    enriched_data = {
-        "type": data_type,  # Add the data_type field
-        "exchange": exchange,  # Also include exchange for consistency
-        "symbol": symbol,  # Include symbol for completeness
-        **data,  # Spread the original data
-    }
-    enriched_data["type"] = data_type
-
-    # Create topic name specific to the exchange
-    topic = f"crypto-ticks-{exchange}-{data_type}"
-
-    # Send enriched data to Kafka
-    send_to_kafka(
-        topic=topic,
-        key=f"{exchange}-{symbol}-{data_type}",  # Unique key for partitioning
-        value=json.dumps(enriched_data),  # Serialize the enriched message
-    )
-
-    # Process enriched data locally if needed
-    asyncio.create_task(process_quote_data(enriched_data))
+async def handle_message(producer, raw, handlers=tick_handlers):
+    """Publish one websocket frame to Kafka, decoding it only once"""
+    prepared = prepare_message(raw)
+    if prepared is None:
+        return
+    topic, key, value, data = prepared
+
+    # Send data to Kafka; waits only when the producer is backlogged
+    await producer.produce(topic=topic, key=key, value=value)
+
+    # Hand the data to local handlers through their bounded queue
+    await handlers.submit(data)
+
+
+class StreamShard:
+    """One websocket connection for a subset of stream_options, reconnecting on its own"""
+
+    def __init__(self, shard_id, stream_options, producer, streamer_options):
+        self.shard_id = shard_id
+        self.stream_options = stream_options
+        self._producer = producer
+        self._streamer_options = streamer_options
+        options = urllib.parse.quote_plus(json.dumps(stream_options))
+        self._URL = f"{streamer_options.tardis_ws_url}?options={options}"
+        self.running = True
+        self.connected = False
+        self.message_count = 0
+        self.reconnect_count = 0
+
+    @property
+    def name(self):
+        exchanges = ",".join(o["exchange"] for o in self.stream_options)
+        return f"shard-{self.shard_id}[{exchanges}]"
+
+    def _backoff(self, attempt):
+        """Full jitter exponential backoff"""
+        cap = min(
+            self._streamer_options.reconnect_max_delay,
+            self._streamer_options.reconnect_min_delay * 2**attempt,
+        )
+        return random.uniform(self._streamer_options.reconnect_min_delay, cap)
+
+    async def run(self, session):
+        attempt = 0
+        while self.running:
+            try:
+                async with session.ws_connect(self._URL, heartbeat=30) as websocket:
+                    self.connected = True
+                    logger.info(f"{self.name} connected")
+                    async for msg in websocket:
+                        if msg.type != aiohttp.WSMsgType.TEXT:
+                            continue
+                        attempt = 0
+                        self.message_count += 1
+                        try:
+                            await handle_message(self._producer, msg.data)
+                        except Exception as e:
+                            print(f"Error processing message: {e}")
+                logger.warning(f"{self.name} websocket closed by server")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"{self.name} connection error: {e}")
+            finally:
+                self.connected = False
+
+            if not self.running:
+                break
+            delay = self._backoff(attempt)
+            attempt += 1
+            self.reconnect_count += 1
+            logger.info(f"{self.name} reconnecting in {delay:.2f}s (attempt {attempt})")
+            await asyncio.sleep(delay)
 
 
 class KafkaStreamer:
-    def __init__(self):
-        self._stream_options = get_stream_options()
-        self._options = urllib.parse.quote_plus(json.dumps(self._stream_options))
-        self._URL = f"ws://localhost:8001/ws-stream-normalized?options={self._options}"
+    def __init__(self, stream_options=None, num_connections=None):
+        self._streamer_options = get_config().streamer_options
+        if stream_options is None:
+            stream_options = get_stream_options()
+        if num_connections is None:
+            num_connections = self._streamer_options.num_connections
+        self._stream_options = stream_options
+        self._producer = AsyncKafkaProducer()
+        self._shards = [
+            StreamShard(i, shard_options, self._producer, self._streamer_options)
+            for i, shard_options in enumerate(
+                shard_stream_options(stream_options, num_connections)
+            )
+        ]
+
+    def _on_config_change(self, old, new):
+        """Apply reloaded streamer_options; the connection layout needs a restart"""
+        if old.streamer_options == new.streamer_options:
+            return
+        options = new.streamer_options
+        for name in ("tardis_ws_url", "num_connections", "num_processes"):
+            if getattr(old.streamer_options, name) != getattr(options, name):
+                logger.warning(f"streamer_options.{name} changed; restart the streamer to apply it")
+        self._streamer_options = options
+        for shard in self._shards:
+            shard._streamer_options = options
 
     async def run(self):
         """
         run the asynchronous function
         """
-        async with aiohttp.ClientSession() as session:
-            async with session.ws_connect(self._URL) as websocket:
-                async for msg in websocket:
-                    # Dynamically extract exchange and symbol from the message or stream options
-                    try:
-                        # Assuming the incoming message has the exchange and symbol in its data
-                        data = json.loads(msg.data)
-                        exchange = data.get("exchange")
-                        symbol = data.get("symbol")
-                        data_type = data["type"]
-                        if data_type == "book_snapshot" and data["depth"] == 1:
-                            data_type = "quote"
-                        elif data_type == "book_snapshot":
-                            level = data["depth"]
-                            data_type = f"book_snapshot_level_{level}"
-                        if exchange and symbol:
-                            # Handle the message for the corresponding exchange and symbol
-                            await handle_message(exchange, data_type, symbol, msg)
-                    except Exception as e:
-                        print(f"Error processing message: {e}")
+        unsubscribe = subscribe(self._on_config_change)
+        await self._producer.start()
+        await tick_handlers.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                tasks = [asyncio.create_task(shard.run(session)) for shard in self._shards]
+                reporter = asyncio.create_task(self._report_rates())
+                try:
+                    await asyncio.gather(*tasks)
+                finally:
+                    for shard in self._shards:
+                        shard.running = False
+                    reporter.cancel()
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, reporter, return_exceptions=True)
+        finally:
+            unsubscribe()
+            await tick_handlers.stop()
+            await self._producer.close()
+
+    async def _report_rates(self):
+        """Log per-shard message rates every rate_report_interval seconds"""
+        last_counts = [0] * len(self._shards)
+        while True:
+            interval = self._streamer_options.rate_report_interval
+            await asyncio.sleep(interval)
+            for i, shard in enumerate(self._shards):
+                rate = (shard.message_count - last_counts[i]) / interval
+                last_counts[i] = shard.message_count
+                logger.info(
+                    f"{shard.name}: {rate:.1f} msg/s, "
+                    f"connected={shard.connected}, reconnects={shard.reconnect_count}"
+                )
+            tick_handlers.log_stats()
+
+
+def run_streamer_process(stream_options, num_connections):
+    """Run one streamer process over a partition of stream_options"""
+    start_config_watcher()
+    streamer = KafkaStreamer(stream_options, num_connections)
+    try:
+        asyncio.run(streamer.run())
+    except KeyboardInterrupt:
+        logger.info("Streamer stopped by user")
+    except Exception as e:
+        logger.error(f"Fatal error: {e}", exc_info=True)
 
 
 def main():
     """Entry point for the streamer"""
-    streamer = KafkaStreamer()
+    start_config_watcher()
+    streamer_options = get_config().streamer_options
+    if streamer_options.num_processes <= 1:
+        run_streamer_process(None, None)
+        return
+
+    partitions = shard_stream_options(get_stream_options(), streamer_options.num_processes)
+    num_connections = max(1, streamer_options.num_connections // len(partitions))
+    processes = [
+        Process(target=run_streamer_process, args=(partition, num_connections))
+        for partition in partitions
+    ]
+    for process in processes:
+        process.start()
     try:
-        asyncio.run(streamer.run())
+        for process in processes:
+            process.join()
     except KeyboardInterrupt:
         logger.info("Streamer stopped by user")
-    except Exception as e:
-        logger.error(f"Fatal error: {e}", exc_info=True)
+        for process in processes:
+            process.terminate()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,62 @@
+from ...utils.json_utils import dumps, loads
+from ...utils.tick_codec import encode_quote_message
+
+
+def resolve_data_type(data):
+    """Map a normalized tardis message to the data type used in topics and keys"""
+    data_type = data["type"]
+    if data_type == "book_snapshot":
+        level = data["depth"]
+        if level == 1:
+            return "quote"
+        return f"book_snapshot_level_{level}"
+    return data_type
+
+
+def rewrite_type(raw, original_type, data_type):
+    """
+    Replace the top level ``"type"`` value in the raw frame text.
+
+    Returns None when the token is not found exactly once (e.g. the frame
+    is pretty printed), in which case the caller must re-serialize.
+    """
+    token = f'"type":"{original_type}"'
+    if raw.count(token) != 1:
+        return None
+    return raw.replace(token, f'"type":"{data_type}"', 1)
+
+
+def prepare_message(raw):
+    """
+    Decode a websocket frame once and build everything needed to publish it.
+
+    The normalized frame already carries exchange, symbol and type, so the
+    Kafka value is the original text, with only the type value patched when
+    it is remapped (book_snapshot depth 1 -> quote). Quotes are packed with
+    the binary tick codec when codec_options.format is "binary". Returns
+    (topic, key, value, data) or None if the frame has no exchange/symbol.
+    ``data`` is the parsed dict with ``type`` already remapped.
+    """
+    data = loads(raw)
+    exchange = data.get("exchange")
+    symbol = data.get("symbol")
+    if not (exchange and symbol):
+        return None
+
+    original_type = data["type"]
+    data_type = resolve_data_type(data)
+    data["type"] = data_type
+
+    value = encode_quote_message(data)
+    if value is None and data_type == original_type:
+        value = raw
+    elif value is None:
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        value = rewrite_type(raw, original_type, data_type)
+        if value is None:
+            value = dumps(data)
+
+    topic = f"crypto-ticks-{exchange}-{data_type}"
+    key = f"{exchange}-{symbol}-{data_type}"
+    return topic, key, value, data
@@ -0,0 +1,35 @@
+def shard_stream_options(stream_options, num_shards):
+    """
+    Split tardis stream_options into ``num_shards`` lists of stream options.
+
+    Exchanges are kept on separate shards where possible so a slow or dropped
+    feed only affects its own connection. With fewer shards than exchanges,
+    whole exchanges are packed onto the least loaded shard; with more, each
+    exchange gets shards in proportion to its symbol count and its symbols
+    are dealt round robin across them. Empty shards are dropped.
+    """
+    options = [o for o in stream_options if o.get("symbols")]
+    if num_shards <= 1 or not options:
+        return [list(options)] if options else []
+
+    if num_shards <= len(options):
+        shards = [[] for _ in range(num_shards)]
+        loads = [0] * num_shards
+        for option in sorted(options, key=lambda o: -len(o["symbols"])):
+            target = loads.index(min(loads))
+            shards[target].append(option)
+            loads[target] += len(option["symbols"])
+        return [shard for shard in shards if shard]
+
+    # Every exchange gets one shard, spare shards go to the largest exchanges
+    allocation = [1] * len(options)
+    for _ in range(num_shards - len(options)):
+        ratios = [len(o["symbols"]) / n for o, n in zip(options, allocation)]
+        allocation[ratios.index(max(ratios))] += 1
+
+    shards = []
+    for option, count in zip(options, allocation):
+        count = min(count, len(option["symbols"]))
+        for i in range(count):
+            shards.append([{**option, "symbols": option["symbols"][i::count]}])
+    return shards
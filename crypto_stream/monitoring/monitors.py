@@ -51,6 +51,8 @@ class SamplingStats:
     errors: int = 0
     skipped_minutes: int = 0
     symbol_stats: Dict[str, SymbolStats] = field(default_factory=dict)
+    # Sampling interval -> largest delay between a boundary and its samples, in seconds
+    max_boundary_lag: Dict[str, float] = field(default_factory=dict)
     last_stats_print: datetime = field(
         default_factory=lambda: datetime.now(timezone.utc)
     )
@@ -101,6 +103,11 @@ class SamplingMonitor(BaseMonitor):
 
         self.logger.warning(f"Skipped sample for {symbol} at {minute}: {reason}")
 
+    def track_boundary_lag(self, interval: str, lag: float):
+        """Track how long after a boundary its samples were done"""
+        if lag > self.stats.max_boundary_lag.get(interval, float("-inf")):
+            self.stats.max_boundary_lag[interval] = lag
+
     def _check_print_stats(self):
         """Print stats if enough time has passed"""
         now = datetime.now(timezone.utc)
@@ -115,6 +122,8 @@ class SamplingMonitor(BaseMonitor):
         self.logger.info(f"Total Samples: {len(self.stats.sampled_minutes)}")
         self.logger.info(f"Total Errors: {self.stats.errors}")
         self.logger.info(f"Skipped Minutes: {self.stats.skipped_minutes}")
+        for interval, lag in self.stats.max_boundary_lag.items():
+            self.logger.info(f"Max {interval} boundary lag: {lag * 1e3:.0f}ms")
 
         self.logger.info("\nPer-Symbol Statistics:")
         for symbol, stats in self.stats.symbol_stats.items():
@@ -127,6 +136,51 @@ class SamplingMonitor(BaseMonitor):
             )
 
 
+@dataclass
+class CommitStats:
+    commits: int = 0
+    writes: int = 0
+    files: int = 0
+    syncs: int = 0
+    bytes_written: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+    last_stats_print: float = field(default_factory=time.monotonic)
+
+
+class DiskCommitMonitor(BaseMonitor):
+    """Commit cycles of the group commit writer (storage/disk/group_commit.py)"""
+
+    def __init__(self, print_interval=60):
+        super().__init__("DiskCommitMonitor")
+        self.stats = CommitStats()
+        self.print_interval = print_interval
+
+    def track_commit(self, writes: int, files: int, syncs: int, bytes_written: int, latency: float):
+        stats = self.stats
+        stats.commits += 1
+        stats.writes += writes
+        stats.files += files
+        stats.syncs += syncs
+        stats.bytes_written += bytes_written
+        stats.total_latency += latency
+        stats.max_latency = max(stats.max_latency, latency)
+        if time.monotonic() - stats.last_stats_print >= self.print_interval:
+            self.print_stats()
+
+    def print_stats(self):
+        """Log the stats since the last print, then reset them"""
+        stats = self.stats
+        if stats.commits:
+            self.logger.info(
+                f"Disk commits: {stats.commits}, writes={stats.writes}, files={stats.files}, "
+                f"syncs={stats.syncs}, bytes={stats.bytes_written}, "
+                f"avg latency={stats.total_latency / stats.commits * 1e3:.1f}ms, "
+                f"max latency={stats.max_latency * 1e3:.1f}ms"
+            )
+        self.stats = CommitStats()
+
+
 class TimingTracker(BaseMonitor):
     def __init__(self):
         super().__init__("TimeTracker")
@@ -143,14 +197,16 @@ class TimingTracker(BaseMonitor):
 
 
 class RedisMonitor(BaseMonitor):
-    def __init__(self, redis_client):
+    def __init__(self, redis_client, key_indexes=None):
         self.redis = redis_client
+        # Label -> RedisKeyIndex used to count keys without a KEYS scan
+        self.key_indexes = key_indexes or {}
         super().__init__("RedisMonitor")
 
     async def check_health(self):
         try:
-            info = self.redis.info()
-            keys_info = self._get_keys_info()
+            info = await self.redis.info()
+            keys_info = await self._get_keys_info()
 
             self.logger.info("\n=== Redis Health ===")
             self.logger.info(f"Memory: {info['used_memory_human']}")
@@ -163,8 +219,8 @@ class RedisMonitor(BaseMonitor):
         except Exception as e:
             self.logger.error(f"Redis health check failed: {e}")
 
-    def _get_keys_info(self):
+    async def _get_keys_info(self):
         return {
-            "tick_buffer_keys": len(self.redis.keys("crypto_ticks_sample:*")),
-            "sampled_keys": len(self.redis.keys("sampled:*")),
+            label: sum((await index.counts()).values())
+            for label, index in self.key_indexes.items()
         }
@@ -0,0 +1,66 @@
+"""
+Microbenchmark of the streamer's per-message path.
+
+Compares the original double-parse + re-serialize handling with
+``prepare_message`` on a typical tardis book_snapshot (depth 1) frame.
+
+    python -m crypto_stream.scripts.bench_message_path
+"""
+import json
+import timeit
+
+from crypto_stream.market_data.streaming.messages import prepare_message
+from crypto_stream.utils import json_utils
+from crypto_stream.utils.tick_codec import is_binary
+
+FRAME = json.dumps(
+    {
+        "type": "book_snapshot",
+        "symbol": "BTCUSDT",
+        "exchange": "binance-futures",
+        "name": "book_snapshot_1_0ms",
+        "depth": 1,
+        "interval": 0,
+        "bids": [{"price": 104321.1, "amount": 3.512}],
+        "asks": [{"price": 104321.2, "amount": 0.871}],
+        "timestamp": "2025-01-16T12:34:56.789Z",
+        "localTimestamp": "2025-01-16T12:34:56.795Z",
+    },
+    separators=(",", ":"),
+)
+
+
+def legacy_message_path(raw):
+    """The KafkaStreamer.run + handle_message logic before the single-parse change"""
+    data = json.loads(raw)
+    exchange = data.get("exchange")
+    symbol = data.get("symbol")
+    data_type = data["type"]
+    if data_type == "book_snapshot" and data["depth"] == 1:
+        data_type = "quote"
+    elif data_type == "book_snapshot":
+        data_type = f"book_snapshot_level_{data['depth']}"
+    data = json.loads(raw)
+    enriched_data = {"type": data_type, "exchange": exchange, "symbol": symbol, **data}
+    enriched_data["type"] = data_type
+    topic = f"crypto-ticks-{exchange}-{data_type}"
+    key = f"{exchange}-{symbol}-{data_type}"
+    return topic, key, json.dumps(enriched_data), enriched_data
+
+
+def main(number=200000):
+    legacy = legacy_message_path(FRAME)
+    fast = prepare_message(FRAME)
+    assert legacy[:2] == fast[:2]
+    assert json.loads(legacy[2]) == fast[3]
+    if not is_binary(fast[2]):
+        assert json.loads(fast[2]) == fast[3]
+
+    print(f"parser: {'orjson' if json_utils.orjson is not None else 'json'}")
+    for name, func in [("legacy", legacy_message_path), ("prepare_message", prepare_message)]:
+        seconds = min(timeit.repeat(lambda: func(FRAME), number=number, repeat=3))
+        print(f"{name:>16}: {seconds / number * 1e6:.2f} us/message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Cost of turning a day of minute samples (one sample window) into columns.
+
+Compares parsing every JSON entry into dicts, as window readers used to,
+with storage.query's decoding of JSON and of binary windows. Redis is not
+needed: the window values are built in memory.
+
+    python -m crypto_stream.scripts.bench_sample_query [window_length]
+"""
+import sys
+import timeit
+
+import pandas as pd
+
+from crypto_stream.storage.query import ticks_to_frame
+from crypto_stream.utils import json_utils
+from crypto_stream.utils.tick_codec import (FORMAT_BINARY, FORMAT_JSON,
+                                            decode_tick_array, encode_tick)
+
+from .bench_tick_codec import STORAGE_TICK
+
+
+def make_window(length, fmt):
+    base = pd.Timestamp("2025-01-16T00:00:00Z")
+    values = []
+    for i in range(length):
+        sample = dict(STORAGE_TICK, sampling_timestamp=(base + pd.Timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%S.000Z"))
+        value = encode_tick(sample, fmt)
+        values.append(value.encode() if isinstance(value, str) else value)
+    return values
+
+
+def main(length):
+    json_window = make_window(length, FORMAT_JSON)
+    binary_window = make_window(length, FORMAT_BINARY)
+    cases = {
+        "json dicts": lambda: pd.DataFrame([json_utils.loads(v) for v in json_window]),
+        "json columns": lambda: ticks_to_frame(decode_tick_array(json_window), index="sampling_ns"),
+        "binary columns": lambda: ticks_to_frame(decode_tick_array(binary_window), index="sampling_ns"),
+        "binary decode only": lambda: decode_tick_array(binary_window),
+    }
+    print(f"window of {length} samples: json {sum(map(len, json_window))} B, binary {sum(map(len, binary_window))} B")
+    for name, case in cases.items():
+        number = 20
+        seconds = min(timeit.repeat(case, number=number, repeat=3)) / number
+        print(f"{name:>20}: {seconds * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2880)
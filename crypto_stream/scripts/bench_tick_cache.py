@@ -0,0 +1,77 @@
+"""
+Ticks per second through the tick cache backends (add_ticks + one drain).
+
+The Redis backends need the server from redis_options.connection; they
+are skipped when it is not reachable.
+
+    python -m crypto_stream.scripts.bench_tick_cache [number_of_ticks]
+"""
+import asyncio
+import sys
+import time
+
+import pandas as pd
+import redis
+
+from crypto_stream.storage.memory.ring_buffer_cache import MemoryTickCache
+from crypto_stream.storage.redis.connection import close_connection_pools
+from crypto_stream.storage.redis.stream_cache import RedisStreamTickCache
+from crypto_stream.storage.redis.tick_cache import RedisTickCache
+from crypto_stream.utils.data_utils import (format_quote_data,
+                                            prepare_storage_quote_sampling_data)
+
+TOPIC = "crypto-ticks-bench-quote"
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "ADAUSDT"]
+
+
+def make_ticks(number):
+    base = pd.Timestamp("2025-01-16T12:00:00Z").value
+    ticks = []
+    for i in range(number):
+        timestamp = pd.Timestamp(base + i * 1_000_000, tz="UTC").strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        tick_data = format_quote_data(
+            {
+                "type": "quote",
+                "symbol": SYMBOLS[i % len(SYMBOLS)],
+                "exchange": "bench",
+                "bids": [{"price": 104321.1, "amount": 3.512}],
+                "asks": [{"price": 104321.2, "amount": 0.871}],
+                "timestamp": timestamp,
+                "localTimestamp": timestamp,
+            }
+        )
+        ticks.append((tick_data, prepare_storage_quote_sampling_data(tick_data)))
+    return ticks
+
+
+async def bench(name, cache, ticks, batch_size=500):
+    try:
+        await cache.initialize()
+    except redis.ConnectionError as e:
+        print(f"{name:>8}: skipped ({e})")
+        return
+    start = time.perf_counter()
+    for i in range(0, len(ticks), batch_size):
+        await cache.add_ticks(ticks[i : i + batch_size])
+    await cache.flush_pending()
+    added = time.perf_counter()
+    drained = 0
+    async for chunk in cache.drain(await cache.get_keys_to_flush("bench", "quote")):
+        drained += sum(len(v) for v in chunk.values())
+    end = time.perf_counter()
+    print(
+        f"{name:>8}: add {len(ticks) / (added - start):,.0f} ticks/s, "
+        f"drain {drained / (end - added):,.0f} ticks/s ({drained} drained)"
+    )
+
+
+async def main(number):
+    ticks = make_ticks(number)
+    await bench("memory", MemoryTickCache(TOPIC, capacity=number), ticks)
+    await bench("lists", RedisTickCache(TOPIC), ticks)
+    await bench("streams", RedisStreamTickCache(TOPIC), ticks)
+    await close_connection_pools()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000))
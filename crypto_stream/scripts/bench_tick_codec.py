@@ -0,0 +1,90 @@
+"""
+Bytes per tick and encode/decode cost of the tick codecs.
+
+Compares JSON and the binary quote record (utils.tick_codec) for a Kafka
+value (normalized quote frame) and a Redis entry (flattened storage tick).
+
+    python -m crypto_stream.scripts.bench_tick_codec
+"""
+import json
+import timeit
+
+from crypto_stream.utils import json_utils
+from crypto_stream.utils.data_utils import (format_quote_data,
+                                            prepare_storage_quote_sampling_data)
+from crypto_stream.utils.tick_codec import (FORMAT_BINARY, FORMAT_JSON,
+                                            decode_quote_message, decode_tick,
+                                            encode_quote_message, encode_tick)
+
+EXCHANGE, DATA_TYPE, SYMBOL = "binance-futures", "quote", "BTCUSDT"
+
+FRAME = {
+    "type": "quote",
+    "symbol": SYMBOL,
+    "exchange": EXCHANGE,
+    "name": "book_snapshot_1_0ms",
+    "depth": 1,
+    "interval": 0,
+    "bids": [{"price": 104321.1, "amount": 3.512}],
+    "asks": [{"price": 104321.2, "amount": 0.871}],
+    "timestamp": "2025-01-16T12:34:56.789Z",
+    "localTimestamp": "2025-01-16T12:34:56.795Z",
+}
+
+STORAGE_TICK = prepare_storage_quote_sampling_data(format_quote_data(FRAME))
+
+
+def kafka_codecs():
+    return {
+        FORMAT_JSON: (
+            lambda: json_utils.dumps_bytes(FRAME),
+            lambda value: decode_quote_message(value, EXCHANGE, DATA_TYPE, SYMBOL),
+        ),
+        FORMAT_BINARY: (
+            lambda: encode_quote_message(FRAME, FORMAT_BINARY),
+            lambda value: decode_quote_message(value, EXCHANGE, DATA_TYPE, SYMBOL),
+        ),
+    }
+
+
+def redis_codecs():
+    return {
+        fmt: (
+            lambda fmt=fmt: encode_tick(STORAGE_TICK, fmt),
+            lambda value: decode_tick(value, EXCHANGE, DATA_TYPE, SYMBOL),
+        )
+        for fmt in (FORMAT_JSON, FORMAT_BINARY)
+    }
+
+
+def run(name, codecs, number):
+    print(name)
+    for fmt, (encode, decode) in codecs.items():
+        value = encode()
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        encode_seconds = min(timeit.repeat(encode, number=number, repeat=3))
+        decode_seconds = min(timeit.repeat(lambda: decode(value), number=number, repeat=3))
+        print(
+            f"{fmt:>8}: {len(value):4d} bytes/tick, "
+            f"encode {encode_seconds / number * 1e6:.2f} us, "
+            f"decode {decode_seconds / number * 1e6:.2f} us"
+        )
+
+
+def main(number=100000):
+    # Round trips must give back what the JSON path produces
+    binary = encode_tick(STORAGE_TICK, FORMAT_BINARY)
+    assert decode_tick(binary, EXCHANGE, DATA_TYPE, SYMBOL) == STORAGE_TICK
+    assert json.dumps(decode_tick(binary, EXCHANGE, DATA_TYPE, SYMBOL)) == json.dumps(STORAGE_TICK)
+    message = decode_quote_message(encode_quote_message(FRAME, FORMAT_BINARY), EXCHANGE, DATA_TYPE, SYMBOL)
+    assert format_quote_data(message)["pricing"] == format_quote_data(FRAME)["pricing"]
+    assert message["timestamp"] == FRAME["timestamp"]
+
+    print(f"parser: {'orjson' if json_utils.orjson is not None else 'json'}")
+    run("kafka value (quote frame)", kafka_codecs(), number)
+    run("redis entry (storage tick)", redis_codecs(), number)
+
+
+if __name__ == "__main__":
+    main()
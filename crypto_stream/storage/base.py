@@ -0,0 +1,63 @@
+from abc import ABC, abstractmethod
+
+
+class TickCache(ABC):
+    """
+    Staging buffer between the recorder consumer and the DiskWriter.
+
+    Ticks are grouped under hourly cache keys
+    ``crypto_ticks:{exchange}:{data_type}:{symbol}:{YYYY-MM-DD}:{HH}``; the
+    writer asks for the keys with pending ticks and drains them. Backends
+    that can also answer the sampler's last-tick lookups implement
+    get_symbols() and get_last_tick_before() and are passed to
+    SampledDataManager as ``tick_source``.
+    """
+
+    cache_key_prefix = "crypto_ticks:"
+
+    def get_cache_key(self, exchange, data_type, symbol, date_hour):
+        return f"{self.cache_key_prefix}{exchange}:{data_type}:{symbol}:{date_hour}"
+
+    async def initialize(self):
+        """Async setup that cannot run in __init__; call once before use"""
+
+    async def close(self):
+        """Stop background work started by initialize()"""
+
+    @abstractmethod
+    async def add_tick(self, tick_data, storage_data):
+        """Cache one formatted tick (tick_data) and its flattened storage form"""
+
+    async def add_ticks(self, ticks):
+        """Add a batch of (tick_data, storage_data) pairs"""
+        for tick_data, storage_data in ticks:
+            await self.add_tick(tick_data, storage_data)
+        await self.flush_pending_if_due()
+
+    async def flush_pending(self):
+        """Make buffered ticks visible to readers"""
+
+    async def flush_pending_if_due(self):
+        """Called when the consumer is idle; flush if the buffer is old enough"""
+
+    @abstractmethod
+    async def get_keys_to_flush(self, exchange, data_type):
+        """Cache keys holding ticks not yet drained, oldest hour first"""
+
+    @abstractmethod
+    def drain(self, cache_keys, chunk_size=None):
+        """Async generator yielding {cache_key: [storage ticks]} until the keys are empty"""
+
+    async def ack(self, cache_keys):
+        """
+        Called once the ticks drained from ``cache_keys`` are on disk.
+        Backends that redeliver unacknowledged ticks (Redis Streams) confirm
+        them here; the others forget ticks as soon as they are drained.
+        """
+
+    async def get_and_clear_ticks(self, cache_key):
+        """Get all ticks for a key and remove them from the cache"""
+        ticks = []
+        async for chunk in self.drain([cache_key]):
+            ticks.extend(chunk[cache_key])
+        return ticks
@@ -0,0 +1,183 @@
+"""
+Sidecar index and stats of recorded jsonl files.
+
+Next to a tick file ``<date>.jsonl`` or sample file ``<date>_sampled*.jsonl``
+the writers keep ``<name>.idx.json``:
+
+    {"version": 1, "inode": ..., "start": 0, "size": 1234567, "rows": 8828,
+     "first": "2025-01-16T00:00:00.029Z", "last": "2025-01-16T23:59:59.870Z",
+     "bid_price": [99.0, 101.5], "ask_price": [99.1, 101.6],
+     "minutes": {"2025-01-16T00:00": [0, 10322], ...}}
+
+``minutes`` maps each minute to the byte span holding its rows, so the
+rows of a time range are in the spans of its minutes even when ticks
+arrive out of order (the spans then overlap). The index covers the bytes
+from ``start`` to ``size``: data written before the index existed, or after
+its last update (a crash in between), is read in full.
+
+The group commit writer updates the index under the file lock of the
+append it describes, once per file per write cycle.
+"""
+import json
+import os
+from pathlib import Path
+
+from crypto_stream.utils.json_utils import loads
+from crypto_stream.utils.tick_codec import iso_to_ns, ns_to_iso
+
+INDEX_VERSION = 1
+_NS_PER_MINUTE = 60 * 1_000_000_000
+_STAT_FIELDS = ("bid_price", "ask_price")
+
+
+def index_path(path):
+    path = Path(path)
+    return path.with_name(path.name + ".idx.json")
+
+
+def format_records(records, time_field="timestamp"):
+    """
+    JSON lines of ``records`` and a (length, time ns, bid, ask) row summary
+    per line, for GroupCommitWriter.append(..., rows=...)
+    """
+    lines = []
+    rows = []
+    for record in records:
+        # json.dumps escapes non-ASCII, so the str length is the byte length
+        line = json.dumps(record) + "\n"
+        lines.append(line)
+        rows.append((len(line), iso_to_ns(record.get(time_field)), record.get("bid_price"), record.get("ask_price")))
+    return "".join(lines), rows
+
+
+def load_file_index(path):
+    """Index of ``path`` if it exists and still describes the file, else None"""
+    try:
+        index = json.loads(index_path(path).read_text())
+        stat = os.stat(path)
+    except (FileNotFoundError, ValueError):
+        return None
+    if index.get("version") != INDEX_VERSION or index["inode"] != stat.st_ino or index["size"] > stat.st_size:
+        return None
+    return index
+
+
+def _new_index(inode, start):
+    return {
+        "version": INDEX_VERSION,
+        "inode": inode,
+        "start": start,
+        "size": start,
+        "rows": 0,
+        "first": None,
+        "last": None,
+        "bid_price": None,
+        "ask_price": None,
+        "minutes": {},
+    }
+
+
+def add_rows(index, offset, rows):
+    """Add the rows of a chunk written at byte ``offset`` to ``index``"""
+    first = iso_to_ns(index["first"])
+    last = iso_to_ns(index["last"])
+    minutes = index["minutes"]
+    position = offset
+    for length, time_ns, bid, ask in rows:
+        if time_ns:
+            minute = ns_to_iso(time_ns // _NS_PER_MINUTE * _NS_PER_MINUTE)[:16]
+            span = minutes.get(minute)
+            if span is None:
+                minutes[minute] = [position, position + length]
+            else:
+                span[0] = min(span[0], position)
+                span[1] = max(span[1], position + length)
+            first = time_ns if not first else min(first, time_ns)
+            last = max(last, time_ns)
+        for name, value in zip(_STAT_FIELDS, (bid, ask)):
+            if isinstance(value, (int, float)):
+                bounds = index[name]
+                index[name] = [value, value] if bounds is None else [min(bounds[0], value), max(bounds[1], value)]
+        position += length
+    index["rows"] += len(rows)
+    index["size"] = max(index["size"], position)
+    index["first"] = ns_to_iso(first)
+    index["last"] = ns_to_iso(last)
+    return index
+
+
+def update_file_index(path, fd, offset, rows):
+    """
+    Record ``rows`` appended at ``offset`` through ``fd``. Call with the
+    file lock held, so updates are in the same order as the data.
+    """
+    inode = os.fstat(fd).st_ino
+    index = load_file_index(path)
+    if index is None or index["inode"] != inode or index["size"] != offset:
+        # No index yet, the file was replaced, or appends were missed: index from here on
+        index = _new_index(inode, offset)
+    add_rows(index, offset, rows)
+    write_file_index(path, index)
+
+
+def write_file_index(path, index):
+    target = index_path(path)
+    tmp_path = target.with_name(target.name + ".tmp")
+    tmp_path.write_text(json.dumps(index, separators=(",", ":")))
+    os.replace(tmp_path, target)
+
+
+def index_file(path, rows):
+    """Index of a file written whole from ``rows``"""
+    return add_rows(_new_index(os.stat(path).st_ino, 0), 0, rows)
+
+
+def spans_for_range(index, start_ns, end_ns):
+    """
+    Merged byte spans of the indexed part of the file that hold every row
+    with ``start_ns <= time < end_ns``; empty if the index rules the file out
+    """
+    if not index["rows"] or iso_to_ns(index["last"]) < start_ns or iso_to_ns(index["first"]) >= end_ns:
+        return []
+    spans = sorted(
+        span
+        for minute, span in index["minutes"].items()
+        if start_ns - _NS_PER_MINUTE < iso_to_ns(minute + ":00.000Z") < end_ns
+    )
+    merged = []
+    for low, high in spans:
+        if merged and low <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], high)
+        else:
+            merged.append([low, high])
+    return merged
+
+
+def read_jsonl_range(path, start_ns, end_ns, time_field="timestamp"):
+    """
+    Records of a jsonl file with ``start_ns <= time_field < end_ns``, in
+    file order. With an index only the spans of the requested minutes (and
+    bytes the index does not cover) are read; without one, the whole file.
+    """
+    index = load_file_index(path)
+    with open(path, "rb") as f:
+        if index is None:
+            chunks = [f.read()]
+        else:
+            spans = [[0, index["start"]]] if index["start"] else []
+            spans += spans_for_range(index, start_ns, end_ns)
+            chunks = []
+            for low, high in spans:
+                f.seek(low)
+                chunks.append(f.read(high - low))
+            f.seek(index["size"])
+            chunks.append(f.read())
+    records = []
+    for chunk in chunks:
+        for line in chunk.split(b"\n"):
+            if not line.strip():
+                continue
+            record = loads(line)
+            if start_ns <= iso_to_ns(record.get(time_field)) < end_ns:
+                records.append(record)
+    return records
@@ -0,0 +1,354 @@
+"""
+Single writer thread for tick and sample files, with a durability policy.
+
+Appends from the DiskWriter and the sampler are queued to one thread.
+Every pass of the thread (a cycle) takes everything queued and writes it
+grouped per file. Cycles add up to a commit group, which ends after
+commit_interval seconds or commit_bytes written; then every file touched
+in the group is fdatasynced once. durability_options.policy decides when
+an append is acknowledged:
+
+    none      after the write; nothing is synced, fsync is left to the kernel
+    batch     after the sync at the end of its commit group
+    interval  after the write; the group's files are still synced at its end
+
+So the number of syncs is the number of distinct files per commit group,
+however many writes and cycles the group had. With "batch", callers that
+wait on their append see it only once it is on disk, up to commit_interval
+later.
+
+Files stay open between cycles in a FileHandlePool, and the writes and
+syncs of several files run concurrently on flush_workers threads.
+
+Appends that come with row summaries also update the file's sidecar index
+(storage/disk/file_index.py), under the same lock as the write.
+"""
+import asyncio
+import concurrent.futures
+import fcntl
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from crypto_stream.configs.config import get_config, subscribe
+from crypto_stream.storage.disk.file_index import update_file_index
+from crypto_stream.monitoring.monitors import DiskCommitMonitor
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("none", "batch", "interval")
+
+_STOP = object()
+_sync = getattr(os, "fdatasync", os.fsync)
+
+
+def _write_fd(fd, data, lock, sync, path=None, rows=None):
+    if lock or rows:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        offset = os.lseek(fd, 0, os.SEEK_END)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view) :]
+        if rows:
+            try:
+                update_file_index(path, fd, offset, rows)
+            except Exception as e:
+                # The index is derived data, readers fall back to reading the file
+                logger.error("Error updating the index of %s: %s", path, e)
+        if sync:
+            _sync(fd)
+    finally:
+        if lock or rows:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def _run_now(fn, *args):
+    """Completed future of fn(*args), to skip the pool for a single file"""
+    future = concurrent.futures.Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+class FileHandlePool:
+    """
+    Append-only descriptors kept open between commit cycles, keyed by path.
+
+    At most ``max_open`` stay open (least recently used closed first) and
+    none longer than ``idle_timeout`` seconds unused, so when the date
+    rolls over the previous day's files get closed. A handle whose path was
+    replaced or deleted (e.g. by the resampler) is reopened.
+    """
+
+    def __init__(self, max_open=256, idle_timeout=300):
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        # Path -> [fd, last used], least recently used first
+        self._open = OrderedDict()
+        self._created_dirs = set()
+        self.opens = 0
+
+    def get(self, path):
+        entry = self._open.get(path)
+        if entry is not None:
+            try:
+                current = os.fstat(entry[0]).st_ino == os.stat(path).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                entry[1] = time.monotonic()
+                self._open.move_to_end(path)
+                return entry[0]
+            self.discard(path)
+        if path.parent not in self._created_dirs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(path.parent)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._open[path] = [fd, time.monotonic()]
+        self.opens += 1
+        return fd
+
+    def peek(self, path):
+        entry = self._open.get(path)
+        return None if entry is None else entry[0]
+
+    def discard(self, path):
+        entry = self._open.pop(path, None)
+        if entry is not None:
+            os.close(entry[0])
+
+    def trim(self):
+        """Close handles over the limit and idle ones"""
+        now = time.monotonic()
+        for path, (fd, last_used) in list(self._open.items()):
+            if len(self._open) > self.max_open or now - last_used > self.idle_timeout:
+                self.discard(path)
+
+    def close_all(self):
+        for path in list(self._open):
+            self.discard(path)
+
+
+class GroupCommitWriter:
+    def __init__(self, policy=None, commit_interval=None, commit_bytes=None):
+        options = get_config().durability_options
+        self.policy = policy or options.policy
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown durability policy {self.policy!r}")
+        self.commit_interval = options.commit_interval if commit_interval is None else commit_interval
+        self.commit_bytes = options.commit_bytes if commit_bytes is None else commit_bytes
+        # Settings taken from the config follow config reloads
+        self._from_config = (policy is None, commit_interval is None, commit_bytes is None)
+        self._unsubscribe = subscribe(self._on_config_change)
+        writer_options = get_config().disk_writer_options
+        self.handles = FileHandlePool(writer_options.max_open_files, writer_options.idle_file_timeout)
+        self._io = concurrent.futures.ThreadPoolExecutor(
+            max_workers=writer_options.flush_workers, thread_name_prefix="group-commit-io"
+        )
+        self.monitor = DiskCommitMonitor()
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        # Current commit group: path -> futures acknowledged by its sync ("batch")
+        self._group = {}
+        self._group_start = None
+        self._group_bytes = 0
+
+    def _on_config_change(self, old, new):
+        if old.durability_options == new.durability_options:
+            return
+        options = new.durability_options
+        # Plain attribute swaps; the writer thread sees them from its next cycle
+        if self._from_config[0]:
+            self.policy = options.policy
+        if self._from_config[1]:
+            self.commit_interval = options.commit_interval
+        if self._from_config[2]:
+            self.commit_bytes = options.commit_bytes
+        logger.info("Durability options changed to %s", options)
+
+    def append(self, path, data, lock=False, rows=None):
+        """
+        Queue ``data`` (str or bytes) to be appended to ``path``; returns a
+        concurrent.futures.Future done once the policy considers it written.
+        ``lock`` takes an exclusive flock around the write, for files that
+        other processes append to. ``rows`` (file_index.format_records)
+        describes the lines of ``data`` for the sidecar index.
+        """
+        if self._thread is None:
+            self._start()
+        future = concurrent.futures.Future()
+        self._queue.put((Path(path), data, lock, rows, future))
+        return future
+
+    async def write(self, path, data, lock=False, rows=None):
+        """append() for coroutines"""
+        await asyncio.wrap_future(self.append(path, data, lock, rows))
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            timeout = None
+            if self._group:
+                timeout = max(0.0, self._group_start + self.commit_interval - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._commit()
+                continue
+            batch = [item]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in batch
+            self._cycle([item for item in batch if item is not _STOP])
+            if self._group and (
+                stop
+                or self._group_bytes >= self.commit_bytes
+                or time.monotonic() - self._group_start >= self.commit_interval
+            ):
+                self._commit()
+            if stop:
+                return
+
+    def _cycle(self, batch):
+        if not batch:
+            return
+        start = time.perf_counter()
+        # Path -> [data], [rows], futures and whether to lock, in queue order
+        files = {}
+        row_lists = {}
+        locked = set()
+        waiting = {}
+        for path, data, lock, rows, future in batch:
+            files.setdefault(path, []).append(data)
+            row_lists.setdefault(path, []).append(rows)
+            waiting.setdefault(path, []).append(future)
+            if lock:
+                locked.add(path)
+
+        # Handles are opened here, the writes of different files run on the pool
+        jobs = {}
+        failed = {}
+        written = 0
+        for path, chunks in files.items():
+            try:
+                fd = self.handles.get(path)
+            except Exception as e:
+                failed[path] = e
+                continue
+            data = b"".join(c if isinstance(c, bytes) else c.encode() for c in chunks)
+            written += len(data)
+            # The rows of the chunks written together; chunks without rows leave the index behind
+            rows = None
+            if all(row_lists[path]):
+                rows = [row for chunk_rows in row_lists[path] for row in chunk_rows]
+            args = (fd, data, path in locked, False, path, rows)
+            if len(files) == 1:
+                jobs[path] = _run_now(_write_fd, *args)
+            else:
+                jobs[path] = self._io.submit(_write_fd, *args)
+
+        for path, job in jobs.items():
+            try:
+                job.result()
+            except Exception as e:
+                failed[path] = e
+                # The file may have a partial write; reopen it next time
+                self.handles.discard(path)
+                continue
+            if self.policy != "none":
+                if not self._group:
+                    self._group_start = time.monotonic()
+                group_futures = self._group.setdefault(path, [])
+                if self.policy == "batch":
+                    # Acknowledged by the sync at the end of the group
+                    group_futures.extend(waiting[path])
+                    continue
+            for future in waiting[path]:
+                future.set_result(None)
+        for path, e in failed.items():
+            logger.error("Error writing %d records to %s: %s", len(files[path]), path, e)
+            for future in waiting[path]:
+                future.set_exception(e)
+        self._group_bytes += written
+        self.handles.trim()
+        self.monitor.track_commit(len(batch), len(files), 0, written, time.perf_counter() - start)
+
+    def _sync_path(self, path):
+        fd = self.handles.peek(path)
+        if fd is not None:
+            _sync(fd)
+            return
+        # Closed by trim() since the write; a new descriptor syncs the same file
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            _sync(fd)
+        finally:
+            os.close(fd)
+
+    def _commit(self):
+        """fdatasync every file of the commit group once, then acknowledge its appends"""
+        if not self._group:
+            return
+        start = time.perf_counter()
+        group, self._group = self._group, {}
+        self._group_bytes = 0
+        if len(group) == 1:
+            jobs = {path: _run_now(self._sync_path, path) for path in group}
+        else:
+            jobs = {path: self._io.submit(self._sync_path, path) for path in group}
+        synced = 0
+        for path, job in jobs.items():
+            try:
+                job.result()
+                synced += 1
+                for future in group[path]:
+                    future.set_result(None)
+            except Exception as e:
+                logger.error("Error syncing %s: %s", path, e)
+                for future in group[path]:
+                    future.set_exception(e)
+        self.monitor.track_commit(0, 0, synced, 0, time.perf_counter() - start)
+
+    def close(self):
+        """Write and commit everything queued, then stop the thread"""
+        self._unsubscribe()
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        self._io.shutdown()
+        self.handles.close_all()
+
+
+_writers = {}
+
+
+def get_group_commit_writer():
+    """Process-wide writer (per pid, like the Redis pools, so forks get their own thread)"""
+    pid = os.getpid()
+    if pid not in _writers:
+        _writers[pid] = GroupCommitWriter()
+    return _writers[pid]
+
+
+def close_group_commit_writer():
+    writer = _writers.pop(os.getpid(), None)
+    if writer is not None:
+        writer.close()
@@ -0,0 +1,184 @@
+"""
+Columnar tick files for DiskWriter (disk_writer_options.format "parquet").
+
+Every flush of an hourly cache key writes a part file, and compaction
+later merges the parts:
+
+    <exchange>/<type>/<symbol>/<date>/<HH>-<ns>.parquet   parts, then one per hour
+    <exchange>/<type>/<symbol>/<date>.parquet              the day, once it is over
+
+Times are timestamp[ns, UTC] columns, symbol/exchange/type are dictionary
+encoded and prices are float64. A merged file lists the files it was made
+from in its schema metadata, so if compaction stops between writing it
+and deleting its sources, the next run deletes the sources instead of
+merging them twice.
+"""
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from crypto_stream.utils.tick_codec import TIME_FIELDS, iso_to_ns
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - only needed for the parquet format
+    pa = pc = pq = None
+
+DICTIONARY_FIELDS = ("symbol", "exchange", "type")
+MERGED_FROM_KEY = b"crypto_stream.merged_from"
+_PART_NAME = re.compile(r"^(\d{2})-(\d+)\.parquet$")
+
+logger = logging.getLogger(__name__)
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("disk_writer_options.format 'parquet' needs pyarrow (pip install pyarrow)")
+
+
+def ticks_to_table(ticks):
+    """Arrow table of flattened storage ticks with typed columns"""
+    require_pyarrow()
+    table = pa.Table.from_pylist(
+        [{k: v for k, v in tick.items() if k not in TIME_FIELDS} for tick in ticks]
+    )
+    time_type = pa.timestamp("ns", tz="UTC")
+    for position, name in enumerate(TIME_FIELDS):
+        if name not in ticks[0]:
+            continue
+        values = pa.array([iso_to_ns(tick.get(name)) or None for tick in ticks], type=pa.int64()).cast(time_type)
+        table = table.add_column(position, name, values)
+    for name in DICTIONARY_FIELDS:
+        if name in table.column_names:
+            i = table.column_names.index(name)
+            table = table.set_column(i, name, pc.dictionary_encode(table.column(name)))
+    for name in table.column_names:
+        # Prices that happened to be ints in the feed would otherwise make int columns
+        if pa.types.is_integer(table.schema.field(name).type) and name.endswith(("_price", "_size")):
+            table = table.set_column(table.column_names.index(name), name, table.column(name).cast(pa.float64()))
+    return table
+
+
+def _concat(tables):
+    try:
+        return pa.concat_tables(tables, promote_options="permissive")
+    except TypeError:  # pyarrow < 14
+        return pa.concat_tables(tables, promote=True)
+
+
+def _merged_from(path):
+    metadata = pq.read_schema(path).metadata or {}
+    return set(json.loads(metadata.get(MERGED_FROM_KEY, b"[]")))
+
+
+class ParquetTickWriter:
+    def __init__(self, base_dir, compression="zstd"):
+        require_pyarrow()
+        self.base_dir = Path(base_dir)
+        self.compression = compression
+
+    def get_day_dir(self, exchange, data_type, symbol, date):
+        return self.base_dir / exchange / data_type / symbol / date
+
+    def _write_table(self, table, path, merged_from=None):
+        if merged_from:
+            metadata = dict(table.schema.metadata or {})
+            metadata[MERGED_FROM_KEY] = json.dumps(sorted(merged_from)).encode()
+            table = table.replace_schema_metadata(metadata)
+        tmp_path = path.with_name(path.name + ".tmp")
+        pq.write_table(table, tmp_path, compression=self.compression)
+        os.replace(tmp_path, path)
+
+    def write_ticks(self, exchange, data_type, symbol, date, hour, ticks):
+        """Write one flush of an hourly cache key as a new part file"""
+        if not ticks:
+            return None
+        day_dir = self.get_day_dir(exchange, data_type, symbol, date)
+        day_dir.mkdir(parents=True, exist_ok=True)
+        path = day_dir / f"{hour}-{time.time_ns()}.parquet"
+        logger.debug(f"Writing {len(ticks)} ticks to {path}")
+        self._write_table(ticks_to_table(ticks), path)
+        return path
+
+    def _merge(self, sources, target, merge_single=True):
+        """
+        Merge ``sources`` (and ``target`` if it exists) into ``target``,
+        then delete the sources. Sources already listed in another file's
+        metadata are leftovers of an interrupted merge and are only deleted.
+        """
+        merged = set()
+        for path in sources + ([target] if target.exists() else []):
+            merged |= _merged_from(path)
+        leftovers = [path for path in sources if path.name in merged]
+        sources = [path for path in sources if path.name not in merged]
+        for path in leftovers:
+            path.unlink()
+        if not sources or (len(sources) == 1 and not merge_single and not target.exists()):
+            return
+        tables = [pq.read_table(path) for path in ([target] if target.exists() else []) + sources]
+        table = _concat(tables)
+        if "timestamp" in table.column_names:
+            table = table.take(pc.sort_indices(table, [("timestamp", "ascending")]))
+        self._write_table(table, target, {path.name for path in sources})
+        for path in sources:
+            path.unlink()
+        logger.info(f"Compacted {len(sources)} files into {target}")
+
+    def compact(self, now=None):
+        """
+        Merge the parts of every finished hour into one file per hour, and
+        the hours of every finished day into ``<date>.parquet``. An hour or
+        day counts as finished one hour after it ends, to let late flushes in.
+        """
+        now = pd.Timestamp.now(tz="UTC") if now is None else now
+        settled = (now - pd.Timedelta(hours=1)).floor("h")
+        for day_dir in sorted(self.base_dir.glob("*/*/*/????-??-??")):
+            if not day_dir.is_dir():
+                continue
+            try:
+                files = sorted(day_dir.glob("*.parquet"))
+                day = pd.Timestamp(day_dir.name, tz="UTC")
+                if day + pd.Timedelta(days=1) <= settled:
+                    self._merge(files, day_dir.with_name(f"{day_dir.name}.parquet"))
+                    if not any(day_dir.iterdir()):
+                        day_dir.rmdir()
+                    continue
+                hours = {}
+                for path in files:
+                    match = _PART_NAME.match(path.name)
+                    if match:
+                        hours.setdefault(match.group(1), []).append(path)
+                for hour, parts in hours.items():
+                    if day + pd.Timedelta(hours=int(hour) + 1) <= settled and len(parts) > 1:
+                        self._merge(parts, day_dir / f"{hour}-{time.time_ns()}.parquet", merge_single=False)
+            except Exception as e:
+                logger.error(f"Error compacting {day_dir}: {e}")
+
+
+def read_parquet_ticks(base_dir, exchange, data_type, symbol, date, columns=None, filters=None):
+    """
+    DataFrame of one symbol and day, from the daily file and any parts not
+    compacted yet. ``filters`` (pyarrow.parquet filters) skip row groups by
+    their statistics.
+    """
+    require_pyarrow()
+    symbol_dir = Path(base_dir) / exchange / data_type / symbol
+    paths = [path for path in [symbol_dir / f"{date}.parquet"] + sorted((symbol_dir / date).glob("*.parquet")) if path.exists()]
+    # Skip sources of a merge that has not deleted them yet
+    merged = set()
+    for path in paths:
+        merged |= _merged_from(path)
+    tables = [pq.read_table(path, columns=columns, filters=filters) for path in paths if path.name not in merged]
+    if not tables:
+        return pd.DataFrame()
+    frame = _concat(tables).to_pandas()
+    if "timestamp" in frame.columns:
+        frame = frame.sort_values("timestamp", kind="stable", ignore_index=True)
+    return frame
@@ -0,0 +1,38 @@
+import asyncio
+
+from crypto_stream.storage.disk.file_index import format_records
+from crypto_stream.storage.disk.group_commit import get_group_commit_writer
+
+
+class SampleFileWriter:
+    """
+    Appends JSON records to files through the process-wide group commit
+    writer (storage/disk/group_commit.py).
+
+    write() only queues the record, so the caller (the sampler at a
+    boundary) never waits on the disk; the writer thread groups the records
+    per file and commits them with the tick files. The files' sidecar
+    indexes are keyed on sampling_timestamp.
+    """
+
+    def __init__(self, writer=None):
+        self.writer = writer or get_group_commit_writer()
+        self._pending = set()
+
+    def write(self, path, record):
+        """Queue ``record`` to be appended to ``path``"""
+        data, rows = format_records([record], "sampling_timestamp")
+        future = self.writer.append(path, data, rows=rows)
+        self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self._pending.discard(future)
+        if future.exception() is not None:
+            print(f"Error saving to disk: {future.exception()}")
+
+    async def close(self):
+        """Wait for the queued records to be written"""
+        pending = list(self._pending)
+        if pending:
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in pending), return_exceptions=True)
@@ -0,0 +1,197 @@
+"""
+Append-only binary tick logs (disk_writer_options.format "binary").
+
+One file per symbol and day, ``<exchange>/<type>/<symbol>/<date>.ticks``,
+holding fixed width quote records in the tick codec's version 1 layout
+(utils.tick_codec.QUOTE_V1_DTYPE, 66 bytes). Next to it, ``<date>.ticks.idx``
+is a sparse index with one entry per block of ``index_stride`` records:
+the block's first record, record count, min and max event time, and
+whether the block is sorted and starts after the previous block's max.
+
+Range reads memory map the log. When the matching blocks are ordered, the
+index finds the first and last block and a binary search inside each
+gives the bounds, so the result is a view of the mapped file. Out of order
+blocks fall back to a mask over the matching blocks.
+
+The index is derived data: a missing or stale index is rebuilt from the
+log by update_index().
+"""
+import fcntl
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from crypto_stream.utils.tick_codec import QUOTE_V1_DTYPE
+
+logger = logging.getLogger(__name__)
+
+RECORD_DTYPE = QUOTE_V1_DTYPE
+INDEX_DTYPE = np.dtype([("first", "<i8"), ("count", "<i8"), ("min_ns", "<i8"), ("max_ns", "<i8"), ("ordered", "u1")])
+_MIN_NS = np.iinfo("i8").min
+_MAX_NS = np.iinfo("i8").max
+
+
+def _to_ns(value, default):
+    if value is None:
+        return default
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize("UTC")
+    return timestamp.value
+
+
+class TickLog:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+
+    def __len__(self):
+        try:
+            return os.path.getsize(self.path) // RECORD_DTYPE.itemsize
+        except FileNotFoundError:
+            return 0
+
+    def repair(self):
+        """Drop a partial record left by an interrupted append, so new records stay aligned"""
+        try:
+            fd = os.open(self.path, os.O_WRONLY)
+        except FileNotFoundError:
+            return
+        try:
+            # The writers' lock, so an append in progress is not mistaken for a partial record
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            size = os.fstat(fd).st_size
+            if size % RECORD_DTYPE.itemsize:
+                logger.warning("Truncating partial record at the end of %s", self.path)
+                os.ftruncate(fd, size - size % RECORD_DTYPE.itemsize)
+        finally:
+            os.close(fd)
+
+    def records(self):
+        """Read-only memory map of the complete records"""
+        count = len(self)
+        if not count:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+
+    def index(self, count=None):
+        """Index entries covering at most ``count`` records (default: the whole log)"""
+        if not self.index_path.exists():
+            return np.empty(0, dtype=INDEX_DTYPE)
+        index = np.fromfile(self.index_path, dtype=INDEX_DTYPE, count=os.path.getsize(self.index_path) // INDEX_DTYPE.itemsize)
+        count = len(self) if count is None else count
+        return index[index["first"] + index["count"] <= count]
+
+    def update_index(self, stride):
+        """Append index entries for the complete blocks not indexed yet"""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.index_path, "ab+") as f:
+            # Several writer processes may share a log
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                records = self.records()
+                index = self.index(len(records))
+                if len(index) * INDEX_DTYPE.itemsize != os.fstat(f.fileno()).st_size:
+                    # Stale entries (log truncated by repair()): rewrite what is still valid
+                    f.truncate(0)
+                    f.write(index.tobytes())
+                start = int(index["first"][-1] + index["count"][-1]) if len(index) else 0
+                previous_max = int(index["max_ns"][-1]) if len(index) else _MIN_NS
+                entries = []
+                while start + stride <= len(records):
+                    event_ns = np.asarray(records["event_ns"][start : start + stride])
+                    ordered = bool(event_ns[0] >= previous_max and np.all(event_ns[1:] >= event_ns[:-1]))
+                    block_max = int(event_ns.max())
+                    entries.append((start, stride, int(event_ns.min()), block_max, ordered))
+                    previous_max = max(previous_max, block_max)
+                    start += stride
+                if entries:
+                    f.write(np.array(entries, dtype=INDEX_DTYPE).tobytes())
+                    f.flush()
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def read(self, start=None, end=None):
+        """
+        Records with ``start <= event time < end``, in event time order. A
+        view of the mapped log when the matching blocks are ordered,
+        otherwise a sorted copy.
+        """
+        start_ns, end_ns = _to_ns(start, _MIN_NS), _to_ns(end, _MAX_NS)
+        records = self.records()
+        index = self.index(len(records))
+        indexed = int(index["first"][-1] + index["count"][-1]) if len(index) else 0
+        tail = np.asarray(records["event_ns"][indexed:])
+
+        hits = np.flatnonzero((index["max_ns"] >= start_ns) & (index["min_ns"] < end_ns))
+        tail_hit = bool(np.any((tail >= start_ns) & (tail < end_ns)))
+        if not len(hits) and not tail_hit:
+            return records[0:0]
+
+        # The matched span is sorted if every block after the first (and the tail, when
+        # it matches) starts after everything before it and is sorted itself
+        tail_sorted = bool(np.all(tail[1:] >= tail[:-1]))
+        if len(hits):
+            span_end = len(index) if tail_hit else hits[-1] + 1
+            ordered = bool(np.all(index["ordered"][hits[0] + 1 : span_end]))
+            if tail_hit:
+                ordered = ordered and tail_sorted and tail[0] >= index["max_ns"].max()
+        else:
+            ordered = tail_sorted
+        if ordered:
+            if len(hits):
+                first = index[hits[0]]
+                low = self._search(records, int(first["first"]), int(first["first"] + first["count"]), start_ns)
+            else:
+                low = indexed + int(np.searchsorted(tail, start_ns, side="left"))
+            if tail_hit:
+                high = indexed + int(np.searchsorted(tail, end_ns, side="left"))
+            else:
+                last = index[hits[-1]]
+                high = self._search(records, int(last["first"]), int(last["first"] + last["count"]), end_ns)
+            if low is not None and high is not None:
+                return records[low:high]
+
+        # Out of order ticks: mask the candidate blocks and sort
+        parts = [records[int(index["first"][i]) : int(index["first"][i] + index["count"][i])] for i in hits]
+        if tail_hit:
+            parts.append(records[indexed:])
+        candidates = np.concatenate(parts) if parts else records[0:0]
+        selected = candidates[(candidates["event_ns"] >= start_ns) & (candidates["event_ns"] < end_ns)]
+        return selected[np.argsort(selected["event_ns"], kind="stable")]
+
+    def _search(self, records, low, high, ns):
+        """First position in records[low:high] with event time >= ns, or None if the block is not sorted"""
+        event_ns = np.asarray(records["event_ns"][low:high])
+        if not np.all(event_ns[1:] >= event_ns[:-1]):
+            return None
+        return low + int(np.searchsorted(event_ns, ns, side="left"))
+
+
+def tick_log_path(base_dir, exchange, data_type, symbol, date):
+    return Path(base_dir) / exchange / data_type / symbol / f"{date}.ticks"
+
+
+def read_tick_log(base_dir, exchange, data_type, symbol, start, end):
+    """
+    Records of ``symbol`` with ``start <= event time < end`` across the
+    daily logs (RECORD_DTYPE array). A single day is returned as a view of
+    the mapped file when its blocks are ordered.
+    """
+    start_ns, end_ns = _to_ns(start, _MIN_NS), _to_ns(end, _MAX_NS)
+    first_day = None if start is None else pd.Timestamp(start_ns, tz="UTC").strftime("%Y-%m-%d")
+    last_day = None if end is None else pd.Timestamp(end_ns - 1, tz="UTC").strftime("%Y-%m-%d")
+    parts = []
+    for path in sorted(tick_log_path(base_dir, exchange, data_type, symbol, "*").parent.glob("????-??-??.ticks")):
+        day = path.name[: -len(".ticks")]
+        if (first_day is not None and day < first_day) or (last_day is not None and day > last_day):
+            continue
+        part = TickLog(path).read(start_ns, end_ns)
+        if len(part):
+            parts.append(part)
+    if not parts:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return parts[0] if len(parts) == 1 else np.concatenate(parts)
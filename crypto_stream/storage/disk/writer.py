@@ -1,11 +1,13 @@
 import asyncio
-import fcntl
-import json
-import os
 from pathlib import Path
 
-from crypto_stream.configs.config import get_disk_writer_options
+from crypto_stream.configs.config import get_config
+from crypto_stream.storage.disk.file_index import format_records
+from crypto_stream.storage.disk.group_commit import get_group_commit_writer
+from crypto_stream.storage.disk.parquet_writer import ParquetTickWriter
+from crypto_stream.storage.disk.tick_log import RECORD_DTYPE, TickLog, tick_log_path
 from crypto_stream.utils.str_utils import parse_topic
+from crypto_stream.utils.tick_codec import FORMAT_BINARY, encode_tick
 
 
 class DiskWriter:
@@ -14,6 +16,16 @@ class DiskWriter:
         self.topic = topic
         self.exchange, self.data_type = parse_topic(topic)
         self.running = True
+        options = get_config().disk_writer_options
+        self.file_writer = get_group_commit_writer()
+        self.format = options.format
+        self.parquet = (
+            ParquetTickWriter(self.base_dir, options.parquet_compression) if self.format == "parquet" else None
+        )
+        self._parquet_slots = asyncio.Semaphore(options.flush_workers)
+        self.index_stride = options.tick_log_index_stride
+        # Tick logs checked for a partial record by this process
+        self._repaired = set()
 
     def get_path_from_cache_key(self, cache_key):
         """Convert Redis cache key to filesystem path"""
@@ -23,38 +35,103 @@ class DiskWriter:
         exchange, data_type, symbol, date, hour = parts
         return self.base_dir / exchange / data_type / symbol / f"{date}.jsonl"
 
-    def _write_ticks_to_disk(self, path, ticks):
-        """Write ticks to disk with file locking"""
-        print(f"Writing {len(ticks)} ticks to {path}")
-        with open(path, "a") as f:
-            # Get exclusive lock
-            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    def _format_ticks(self, ticks):
+        """JSON lines of ``ticks`` and their row summaries for the file's sidecar index"""
+        return format_records(ticks, "timestamp")
+
+    def _tick_log_writes(self, cache_key, ticks):
+        """(path, data, rows) of a flush in the binary format; non-quote ticks stay in JSON lines"""
+        exchange, data_type, symbol, date, hour = cache_key.split(":")[1:]
+        records, others = [], []
+        for tick in ticks:
+            value = encode_tick(tick, FORMAT_BINARY)
+            if isinstance(value, bytes):
+                records.append(value)
+            else:
+                others.append(tick)
+        writes = []
+        if records:
+            writes.append((tick_log_path(self.base_dir, exchange, data_type, symbol, date), b"".join(records), None))
+        if others:
+            writes.append((self.get_path_from_cache_key(cache_key), *self._format_ticks(others)))
+        return writes
+
+    def _repair_tick_logs(self, paths):
+        for path in paths:
+            if path not in self._repaired:
+                TickLog(path).repair()
+                self._repaired.add(path)
+
+    def _index_tick_logs(self, paths):
+        for path in paths:
             try:
-                for tick in ticks:
-                    f.write(json.dumps(tick) + "\n")
-                # Ensure data is written to disk
-                f.flush()
-                os.fsync(f.fileno())
-            finally:
-                # Release lock
-                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                TickLog(path).update_index(self.index_stride)
+            except Exception as e:
+                print(f"Error indexing {path}: {e}")
+
+    async def _wait_for_writes(self, cache, drained, writes, tick_logs):
+        """
+        Wait for the queued writes, acknowledge the drained keys to the cache,
+        then index the tick logs they appended to
+        """
+        try:
+            await asyncio.gather(*writes)
+        finally:
+            writes.clear()
+        keys = list(dict.fromkeys(drained))
+        drained.clear()
+        await cache.ack(keys)
+        if tick_logs:
+            await asyncio.to_thread(self._index_tick_logs, sorted(tick_logs))
+            tick_logs.clear()
+
+    async def _write_parquet(self, cache_key, ticks):
+        exchange, data_type, symbol, date, hour = cache_key.split(":")[1:]
+        async with self._parquet_slots:
+            await asyncio.to_thread(self.parquet.write_ticks, exchange, data_type, symbol, date, hour, ticks)
 
     async def flush_to_disk(self, cache):
         """Write cached data to disk"""
-        keys = cache.get_keys_to_flush(self.exchange, self.data_type)
+        keys = await cache.get_keys_to_flush(self.exchange, self.data_type)
         print(self.exchange, self.data_type)
         print(keys)
         print("***********************************************************")
-        for key in keys:
-            #    print(key, 'key for cong')
-            if type(key) != str:
-                key = key.decode()
-            ticks = cache.get_and_clear_ticks(key)
-            if ticks:
-                path = self.get_path_from_cache_key(key)
-                path.parent.mkdir(parents=True, exist_ok=True)
-                # Offload the blocking write operation to a separate thread
-                await asyncio.to_thread(self._write_ticks_to_disk, path, ticks)
+        keys = [key if type(key) == str else key.decode() for key in keys]
+        # Ticks arrive in bounded chunks popped from all keys at once. Their
+        # writes are queued without waiting, so consecutive chunks share a
+        # commit group and each file is synced once; only commit_bytes of
+        # writes are left outstanding before waiting for them
+        commit_bytes = get_config().durability_options.commit_bytes
+        writes = []
+        written = 0
+        tick_logs = set()
+        # Keys drained since the last wait; the cache may only forget them once written
+        drained = []
+        async for chunk in cache.drain(keys):
+            if self.parquet is not None:
+                # Part files are independent, write them concurrently
+                await asyncio.gather(
+                    *(self._write_parquet(key, ticks) for key, ticks in chunk.items())
+                )
+                await cache.ack(list(chunk))
+                continue
+            drained.extend(chunk)
+            if self.format == "binary":
+                files = [write for key, ticks in chunk.items() for write in self._tick_log_writes(key, ticks)]
+                chunk_logs = [path for path, data, rows in files if path.suffix == ".ticks"]
+                await asyncio.to_thread(self._repair_tick_logs, chunk_logs)
+                tick_logs.update(chunk_logs)
+            else:
+                files = [(self.get_path_from_cache_key(key), *self._format_ticks(ticks)) for key, ticks in chunk.items()]
+            # The lock keeps appends from other writer processes whole
+            for path, data, rows in files:
+                print(f"Writing {len(rows) if rows else len(data) // RECORD_DTYPE.itemsize} ticks to {path}")
+                writes.append(asyncio.wrap_future(self.file_writer.append(path, data, lock=True, rows=rows)))
+                written += len(data)
+            if written >= commit_bytes:
+                await self._wait_for_writes(cache, drained, writes, tick_logs)
+                written = 0
+        await self._wait_for_writes(cache, drained, writes, tick_logs)
         # print('***********************************************************')
 
     async def start_flush_loop(self, cache):
@@ -65,4 +142,16 @@ class DiskWriter:
                 await self.flush_to_disk(cache)
             except Exception as e:
                 print(f"Error flushing to disk: {e}")
-            await asyncio.sleep(get_disk_writer_options()["flush_interval"])
+            await asyncio.sleep(get_config().disk_writer_options.flush_interval)
+
+    async def start_compaction_loop(self):
+        """Periodically merge finished parquet parts (no-op for jsonl)"""
+        interval = get_config().disk_writer_options.compaction_interval
+        if self.parquet is None or not interval:
+            return
+        while self.running:
+            try:
+                await asyncio.to_thread(self.parquet.compact)
+            except Exception as e:
+                print(f"Error compacting parquet files: {e}")
+            await asyncio.sleep(interval)
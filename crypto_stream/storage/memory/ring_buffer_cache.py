@@ -0,0 +1,241 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from crypto_stream.configs.config import get_config
+from crypto_stream.storage.base import TickCache
+from crypto_stream.utils.tick_codec import (PRICE_FIELDS, QUOTE_DTYPE,
+                                            apply_price_flags, iso_to_ns,
+                                            is_storage_quote, ns_to_iso,
+                                            price_flags)
+
+_NS_PER_HOUR = 3600 * 1_000_000_000
+
+
+class QuoteRing:
+    """
+    Preallocated ring of quote records for one symbol.
+
+    ``head`` counts every record ever written and ``tail`` is the first one
+    not yet taken by the writer, so ``head - tail`` records are pending.
+    Records stay in the ring after being taken until they are overwritten,
+    which keeps recent history for last-tick lookups.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=QUOTE_DTYPE)
+        self.head = 0
+        self.tail = 0
+        self.last_event_ns = None
+
+    @property
+    def pending(self):
+        return self.head - self.tail
+
+    def append(self, record):
+        self.data[self.head % self.capacity] = record
+        self.head += 1
+
+    def _window(self, start, stop):
+        """Records [start, stop) in write order, as at most two views"""
+        if start >= stop:
+            return []
+        first, last = start % self.capacity, stop % self.capacity
+        if first < last:
+            return [self.data[first:last]]
+        return [self.data[first:], self.data[:last]]
+
+    def take(self):
+        """Copy of the pending records, marking them taken"""
+        parts = self._window(self.tail, self.head)
+        self.tail = self.head
+        return np.concatenate(parts) if parts else np.empty(0, dtype=QUOTE_DTYPE)
+
+    def last_before(self, boundary_ns):
+        """Most recently written record with event time before ``boundary_ns``, or None"""
+        start = max(0, self.head - self.capacity)
+        for part in reversed(self._window(start, self.head)):
+            hits = np.flatnonzero(part["event_ns"] < boundary_ns)
+            if len(hits):
+                return part[hits[-1]]
+        return None
+
+
+def record_to_tick(record, exchange, data_type, symbol):
+    """Storage dict (prepare_storage_quote_sampling_data layout) of a ring record"""
+    prices = apply_price_flags(
+        int(record["flags"]),
+        [float(record["bid_price"]), float(record["bid_size"]), float(record["ask_price"]), float(record["ask_size"])],
+    )
+    return {
+        "timestamp": ns_to_iso(int(record["event_ns"])),
+        "local_timestamp": ns_to_iso(int(record["local_ns"])),
+        "receive_timestamp": ns_to_iso(int(record["receive_ns"])),
+        "sampling_timestamp": ns_to_iso(int(record["sampling_ns"])),
+        "symbol": symbol,
+        "exchange": exchange,
+        "type": data_type,
+        **dict(zip(PRICE_FIELDS, prices)),
+    }
+
+
+class MemoryTickCache(TickCache):
+    """
+    In-process tick cache for single-node deployments.
+
+    Each (exchange, data_type, symbol) gets a QuoteRing of
+    memory_tick_cache_options.ring_capacity records, so adding a tick is a
+    row assignment with no network round trip. The writer drains pending
+    records grouped into the usual hourly cache keys; when a ring is about
+    to overwrite pending records they are moved aside first. Up to
+    max_spilled records per symbol are kept aside, beyond that the oldest
+    are dropped and counted in ``dropped_count``, so a stalled writer
+    cannot grow the process without bound. Ticks live only in this process:
+    use a Redis backend when other processes need to read them.
+    """
+
+    def __init__(self, topic, capacity=None, max_spilled=None):
+        options = get_config().memory_tick_cache_options
+        self.topic = topic
+        self.capacity = capacity or options.ring_capacity
+        self.max_spilled = max_spilled or options.max_spilled
+        self.rings = {}
+        # Records taken from a ring but not yet handed to the writer: symbol key -> [arrays]
+        self._spilled = {}
+        self.dropped_count = 0
+        self.out_of_order_count = 0
+        self.logger = logging.getLogger("MemoryTickCache")
+
+    async def add_tick(self, tick_data, storage_data):
+        if not is_storage_quote(storage_data):
+            self.logger.error(f"Memory tick cache only holds quote ticks, dropped: {storage_data}")
+            return
+        market_data = tick_data["market_data"]
+        symbol_key = (market_data["exchange"], market_data["type"], market_data["symbol"])
+        ring = self.rings.get(symbol_key)
+        if ring is None:
+            ring = self.rings[symbol_key] = QuoteRing(self.capacity)
+        elif ring.pending >= ring.capacity:
+            self._spill(symbol_key, [ring.take()])
+
+        prices = [storage_data[field] for field in PRICE_FIELDS]
+        flags = price_flags(prices)
+        event_ns = iso_to_ns(storage_data["timestamp"])
+        if ring.last_event_ns is not None and event_ns < ring.last_event_ns:
+            self.out_of_order_count += 1
+            self.logger.warning(
+                f"Out of order tick for {symbol_key[2]} at {storage_data['timestamp']}, "
+                f"total out of order count: {self.out_of_order_count}"
+            )
+        else:
+            ring.last_event_ns = event_ns
+        ring.append(
+            (
+                event_ns,
+                iso_to_ns(storage_data["local_timestamp"]),
+                iso_to_ns(storage_data["receive_timestamp"]),
+                iso_to_ns(storage_data["sampling_timestamp"]),
+                *prices,
+                flags,
+            )
+        )
+
+    def _spill(self, symbol_key, parts):
+        """Set records aside for the writer, dropping the oldest beyond max_spilled"""
+        spilled = self._spilled.setdefault(symbol_key, [])
+        spilled.extend(parts)
+        excess = sum(len(part) for part in spilled) - self.max_spilled
+        if excess <= 0:
+            return
+        self.dropped_count += excess
+        self.logger.warning(
+            f"Writer behind for {symbol_key[2]}, dropped the {excess} oldest ticks, "
+            f"total dropped: {self.dropped_count}"
+        )
+        while excess:
+            if len(spilled[0]) <= excess:
+                excess -= len(spilled.pop(0))
+            else:
+                spilled[0] = spilled[0][excess:]
+                excess = 0
+
+    def _pending_records(self, symbol_key):
+        """Take everything pending for a symbol, spilled records first"""
+        parts = self._spilled.pop(symbol_key, [])
+        ring = self.rings.get(symbol_key)
+        if ring is not None and ring.pending:
+            parts.append(ring.take())
+        return np.concatenate(parts) if parts else np.empty(0, dtype=QUOTE_DTYPE)
+
+    def _hour_key(self, symbol_key, hour):
+        date_hour = pd.Timestamp(int(hour) * _NS_PER_HOUR, tz="UTC").strftime("%Y-%m-%d:%H")
+        return self.get_cache_key(*symbol_key, date_hour)
+
+    async def get_keys_to_flush(self, exchange, data_type):
+        """Hourly keys with pending ticks, oldest hour first"""
+        keys = []
+        for symbol_key, ring in self.rings.items():
+            if symbol_key[:2] != (exchange, data_type):
+                continue
+            hours = set()
+            for part in self._spilled.get(symbol_key, []):
+                hours.update(np.unique(part["event_ns"] // _NS_PER_HOUR).tolist())
+            for part in ring._window(ring.tail, ring.head):
+                hours.update(np.unique(part["event_ns"] // _NS_PER_HOUR).tolist())
+            keys.extend((hour, self._hour_key(symbol_key, hour)) for hour in hours)
+        return [key for _, key in sorted(keys)]
+
+    async def drain(self, cache_keys, chunk_size=None):
+        """
+        Yield {cache_key: ticks} chunks for the requested keys, at most
+        ``chunk_size`` ticks per key each, one symbol at a time.
+
+        A symbol's pending records are taken at once; records of hours that
+        were not requested go back to the spill list for the next flush.
+        """
+        if chunk_size is None:
+            chunk_size = get_config().redis_options.redis_tick_cache.drain_chunk_size
+        requested = {}
+        for cache_key in cache_keys:
+            parts = cache_key.split(":")
+            requested.setdefault(tuple(parts[1:4]), set()).add(cache_key)
+        for symbol_key, keys in requested.items():
+            records = self._pending_records(symbol_key)
+            if not len(records):
+                continue
+            hours = records["event_ns"] // _NS_PER_HOUR
+            selected = {}
+            leftover = []
+            for hour in np.unique(hours):
+                in_hour = records[hours == hour]
+                cache_key = self._hour_key(symbol_key, hour)
+                if cache_key in keys:
+                    selected[cache_key] = in_hour
+                else:
+                    leftover.append(in_hour)
+            if leftover:
+                self._spill(symbol_key, leftover)
+            # Ticks are built per chunk, so only one chunk of dicts exists at a time
+            longest = max((len(in_hour) for in_hour in selected.values()), default=0)
+            for low in range(0, longest, chunk_size):
+                yield {
+                    cache_key: [record_to_tick(r, *symbol_key) for r in in_hour[low : low + chunk_size]]
+                    for cache_key, in_hour in selected.items()
+                    if low < len(in_hour)
+                }
+
+    async def get_symbols(self, exchange, data_type):
+        """(exchange, data_type, symbol) of every ring for this exchange and type"""
+        return {symbol_key for symbol_key in self.rings if symbol_key[:2] == (exchange, data_type)}
+
+    async def get_last_tick_before(self, exchange, data_type, symbol, minute):
+        """Last tick whose event time is strictly before ``minute``, or None"""
+        ring = self.rings.get((exchange, data_type, symbol))
+        if ring is None:
+            return None
+        record = ring.last_before(minute.value)
+        if record is None:
+            return None
+        return record_to_tick(record, exchange, data_type, symbol)
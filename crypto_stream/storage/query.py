@@ -0,0 +1,197 @@
+"""
+Read side of the sampler and tick cache for dashboards and strategies.
+
+Sample windows (``sampled:{exchange}:{type}:{symbol}[:interval]:window``)
+are returned as pandas DataFrames indexed by sampling time. With the
+binary codec every window entry is a fixed size record, so a whole window
+is decoded with one np.frombuffer (utils.tick_codec.decode_tick_array)
+instead of parsing each entry.
+
+Decoded windows are kept in an LRU. After start(), a pub/sub listener on
+``latest_samples:*`` drops a window from the LRU when its symbol publishes
+a new sample; without the listener nothing is cached. Dropped windows
+are reloaded on their next read, which is only correct if writers publish
+after appending to the window, as SampledDataManager.save_samples does.
+
+    query = SampleQuery()
+    await query.start()
+    df = await query.get_samples("binance", "quote", "BTCUSDT", start="2025-01-16T12:00Z")
+"""
+import asyncio
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from crypto_stream.configs.config import get_config
+from crypto_stream.storage.base import TickCache
+from crypto_stream.storage.redis.connection import get_redis_client
+from crypto_stream.storage.redis.stream_cache import RedisStreamTickCache
+from crypto_stream.utils.json_utils import loads
+from crypto_stream.utils.str_utils import interval_suffix
+from crypto_stream.utils.tick_codec import PRICE_FIELDS, decode_tick_array
+
+SAMPLE_CHANNEL_PATTERN = "latest_samples:*"
+
+
+def ticks_to_frame(records, index="event_ns"):
+    """
+    DataFrame of a QUOTE_DTYPE array, indexed by ``index`` as UTC times.
+    Missing prices and sizes (None in the tick) are NaN.
+    """
+    columns = {}
+    for name in ("event_ns", "local_ns", "receive_ns", "sampling_ns"):
+        times = records[name].astype("datetime64[ns]")
+        times[records[name] == 0] = np.datetime64("NaT")
+        columns[name[: -len("_ns")] + "_time"] = times
+    for i, name in enumerate(PRICE_FIELDS):
+        values = records[name].copy()
+        values[(records["flags"] & (1 << (4 + i))) != 0] = np.nan
+        columns[name] = values
+    frame = pd.DataFrame(columns)
+    for name in ("event_time", "local_time", "receive_time", "sampling_time"):
+        frame[name] = frame[name].dt.tz_localize("UTC")
+    return frame.set_index(index[: -len("_ns")] + "_time")
+
+
+class SampleQuery:
+    """Time range queries over sample windows and recent ticks"""
+
+    def __init__(self, redis_client=None, cache_size=256):
+        self.redis = redis_client or get_redis_client()
+        self.cache_size = cache_size
+        # Window key -> decoded DataFrame, least recently used first
+        self._windows = OrderedDict()
+        # Window key -> invalidation count, and a count for clearing everything, so a
+        # window loaded while an invalidation arrived is not cached
+        self._generations = {}
+        self._epoch = 0
+        self._listener = None
+        self._pubsub = None
+        self.hits = 0
+        self.misses = 0
+
+    def get_window_key(self, exchange, data_type, symbol, interval="1min"):
+        return f"sampled:{exchange}:{data_type}:{symbol}{interval_suffix(interval)}:window"
+
+    async def start(self):
+        """Subscribe to sample publishes so decoded windows can be cached"""
+        if self._listener is not None:
+            return
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.psubscribe(SAMPLE_CHANNEL_PATTERN)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._windows.clear()
+
+    async def _listen(self):
+        async for message in self._pubsub.listen():
+            if message["type"] != "pmessage":
+                continue
+            try:
+                self._invalidate(message["channel"], message["data"])
+            except Exception as e:
+                print(f"Error handling sample update: {e}")
+                self._epoch += 1
+                self._windows.clear()
+
+    def _invalidate(self, channel, data):
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        sample = loads(data)["data"]
+        # Symbol channels are latest_samples:{exchange}:{type}:{symbol}[:interval]; the
+        # exchange-wide copy of the same sample is skipped
+        symbol_channel = f"latest_samples:{sample['exchange']}:{sample['type']}:{sample['symbol']}"
+        if channel == symbol_channel or channel.startswith(symbol_channel + ":"):
+            window_key = f"sampled{channel[len('latest_samples'):]}:window"
+            self._generations[window_key] = self._generations.get(window_key, 0) + 1
+            self._windows.pop(window_key, None)
+
+    async def _load_window(self, window_key):
+        frame = self._windows.get(window_key)
+        if frame is not None:
+            self._windows.move_to_end(window_key)
+            self.hits += 1
+            return frame
+        self.misses += 1
+        generation = (self._epoch, self._generations.get(window_key, 0))
+        values = await self.redis.lrange(window_key, 0, -1)
+        frame = ticks_to_frame(decode_tick_array(values), index="sampling_ns")
+        # A sample published during the read may not be in ``values``
+        if self._listener is not None and generation == (self._epoch, self._generations.get(window_key, 0)):
+            self._windows[window_key] = frame
+            if len(self._windows) > self.cache_size:
+                self._windows.popitem(last=False)
+        return frame
+
+    async def get_samples(self, exchange, data_type, symbol, start=None, end=None, interval="1min"):
+        """
+        Samples with ``start <= sampling time < end`` as a DataFrame indexed
+        by sampling_time, with the sampled tick's times and prices as columns.
+        Only the last number_of_minute_samples_to_keep samples are in Redis.
+        """
+        frame = await self._load_window(self.get_window_key(exchange, data_type, symbol, interval))
+        return _time_slice(frame, start, end)
+
+    async def get_latest_sample(self, exchange, data_type, symbol, interval="1min"):
+        """Most recent sample as a Series, or None"""
+        frame = await self._load_window(self.get_window_key(exchange, data_type, symbol, interval))
+        if not len(frame):
+            return None
+        return frame.iloc[-1]
+
+    async def get_recent_ticks(self, exchange, data_type, symbol, start=None, end=None):
+        """
+        Ticks still in the Redis tick cache (not yet drained by the disk
+        writer) as a DataFrame indexed by event_time. Never cached: the tick
+        cache changes with every tick.
+        """
+        backend = get_config().redis_options.redis_tick_cache.backend
+        if backend == "streams":
+            stream_key = f"{RedisStreamTickCache.stream_key_prefix}{exchange}:{data_type}:{symbol}"
+            low = "-" if start is None else _utc(start).value // 1_000_000
+            high = "+" if end is None else _utc(end).value // 1_000_000
+            entries = await self.redis.xrange(stream_key, min=low, max=high)
+            values = [fields[b"d"] for _, fields in entries if fields]
+        elif backend == "lists":
+            now = pd.Timestamp.now(tz="UTC")
+            # The writer drains at least hourly, so the current and previous hour hold the cache
+            hours = pd.date_range(
+                (_utc(start) if start is not None else now - pd.Timedelta(hours=1)).floor("h"),
+                (_utc(end) if end is not None else now).floor("h"),
+                freq="h",
+            )
+            pipe = self.redis.pipeline(transaction=False)
+            for hour in hours:
+                pipe.lrange(
+                    f"{TickCache.cache_key_prefix}{exchange}:{data_type}:{symbol}:{hour.strftime('%Y-%m-%d:%H')}", 0, -1
+                )
+            values = [value for hour_values in await pipe.execute() for value in hour_values]
+        else:
+            raise ValueError(f"Recent ticks are not readable from another process with the {backend} backend")
+        frame = ticks_to_frame(decode_tick_array(values)).sort_index(kind="stable")
+        return _time_slice(frame, start, end)
+
+
+def _utc(value):
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize("UTC") if timestamp.tzinfo is None else timestamp.tz_convert("UTC")
+
+
+def _time_slice(frame, start, end):
+    if start is None and end is None:
+        return frame
+    mask = np.ones(len(frame), dtype=bool)
+    if start is not None:
+        mask &= frame.index >= _utc(start)
+    if end is not None:
+        mask &= frame.index < _utc(end)
+    return frame[mask]
@@ -0,0 +1,242 @@
+"""
+Streaming reads of recorded ticks and samples.
+
+The reader counterpart of DiskWriter and the sampler's files. Exchanges,
+types and symbols select directories and the time range selects days by
+file name, so nothing outside them is opened. Within a day each format
+reads only the requested range where it can:
+
+    <date>.jsonl      the minutes of the range, with a sidecar index (storage/disk/file_index.py)
+    <date>.ticks      the blocks of the range (storage/disk/tick_log.py)
+    <date>.parquet    row groups whose statistics overlap the range (storage/disk/parquet_writer.py)
+
+A day written in several formats (e.g. after the writer's format was
+changed, or the jsonl fallback of the binary format) is read from all of
+them. Every symbol and day is a job on a thread or process pool, with at
+most ``2 * workers`` days in memory, and comes out as DataFrame chunks of
+at most ``chunk_size`` rows sorted by time. Days are in date order, then
+exchange, type and symbol; times are datetime64[ns, UTC] columns.
+
+    for frame in iter_ticks(["binance", "bybit", "okex"], "quote", start="2025-01-01", end="2025-02-01"):
+        ...
+"""
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from crypto_stream.configs.config import get_config
+from crypto_stream.storage.disk.file_index import read_jsonl_range
+from crypto_stream.storage.disk.parquet_writer import read_parquet_ticks
+from crypto_stream.storage.disk.tick_log import TickLog
+from crypto_stream.utils.str_utils import RECORD_KINDS, sample_file_name
+from crypto_stream.utils.tick_codec import PRICE_FIELDS, TIME_FIELDS
+
+_DAY_NAME = re.compile(r"^(\d{4}-\d{2}-\d{2})(?:\.jsonl|\.ticks|\.parquet)?$")
+_MIN_NS = np.iinfo("i8").min
+_MAX_NS = np.iinfo("i8").max
+_NS_PER_DAY = 86400 * 1_000_000_000
+
+
+def _to_ns(value, default):
+    if value is None:
+        return default
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize("UTC")
+    return timestamp.value
+
+
+def _as_list(values):
+    if values is None or isinstance(values, str):
+        return None if values is None else [values]
+    return list(values)
+
+
+def _symbol_dirs(base_dir, exchanges, data_types, symbols):
+    """(exchange, type, symbol, directory) of the selected symbols that have data"""
+    found = []
+    if not Path(base_dir).is_dir():
+        return found
+    for exchange in exchanges or sorted(p.name for p in Path(base_dir).iterdir() if p.is_dir()):
+        exchange_dir = Path(base_dir) / exchange
+        if not exchange_dir.is_dir():
+            continue
+        for data_type in data_types or sorted(p.name for p in exchange_dir.iterdir() if p.is_dir()):
+            type_dir = exchange_dir / data_type
+            if not type_dir.is_dir():
+                continue
+            for symbol in symbols or sorted(p.name for p in type_dir.iterdir() if p.is_dir()):
+                if (type_dir / symbol).is_dir():
+                    found.append((exchange, data_type, symbol, type_dir / symbol))
+    return found
+
+
+def _in_range(date, start_ns, end_ns):
+    day_ns = pd.Timestamp(date, tz="UTC").value
+    return day_ns < end_ns and day_ns + _NS_PER_DAY > start_ns
+
+
+def _parse_times(frame):
+    for name in TIME_FIELDS + ("bar_start",):
+        if name in frame.columns and not pd.api.types.is_datetime64_any_dtype(frame[name]):
+            # Millisecond strings would otherwise parse to a coarser unit than the other formats
+            frame[name] = pd.to_datetime(frame[name], utc=True, format="ISO8601").astype("datetime64[ns, UTC]")
+    return frame
+
+
+def _tick_log_frame(records, exchange, data_type, symbol):
+    """Storage tick layout of tick log records"""
+    columns = {}
+    for field, name in zip(TIME_FIELDS, ("event_ns", "local_ns", "receive_ns", "sampling_ns")):
+        times = pd.to_datetime(np.asarray(records[name]), utc=True)
+        columns[field] = times.where(np.asarray(records[name]) != 0)
+    columns["symbol"] = symbol
+    columns["exchange"] = exchange
+    columns["type"] = data_type
+    flags = np.asarray(records["flags"])
+    for i, name in enumerate(PRICE_FIELDS):
+        values = np.array(records[name], dtype="f8")
+        values[(flags & (1 << (4 + i))) != 0] = np.nan
+        columns[name] = values
+    return pd.DataFrame(columns)
+
+
+def _finish(frames, time_field, columns):
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    frame = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    frame = frame.sort_values(time_field, kind="stable", ignore_index=True)
+    if columns is not None:
+        frame = frame[[name for name in columns if name in frame.columns]]
+    return frame
+
+
+def read_tick_day(base_dir, exchange, data_type, symbol, date, start_ns=_MIN_NS, end_ns=_MAX_NS, columns=None):
+    """Ticks of one symbol and day with ``start_ns <= timestamp < end_ns``, from every format on disk"""
+    symbol_dir = Path(base_dir) / exchange / data_type / symbol
+    frames = []
+    tick_log = symbol_dir / f"{date}.ticks"
+    if tick_log.exists():
+        frames.append(_tick_log_frame(TickLog(tick_log).read(start_ns, end_ns), exchange, data_type, symbol))
+    jsonl = symbol_dir / f"{date}.jsonl"
+    if jsonl.exists():
+        frames.append(_parse_times(pd.DataFrame(read_jsonl_range(jsonl, start_ns, end_ns))))
+    if (symbol_dir / f"{date}.parquet").exists() or (symbol_dir / date).is_dir():
+        filters = [
+            ("timestamp", ">=", pd.Timestamp(max(start_ns, 0), tz="UTC")),
+            ("timestamp", "<", pd.Timestamp(min(end_ns, pd.Timestamp.max.value), tz="UTC")),
+        ]
+        read_columns = None if columns is None else list(dict.fromkeys(["timestamp", *columns]))
+        frames.append(read_parquet_ticks(base_dir, exchange, data_type, symbol, date, read_columns, filters))
+    return _finish(frames, "timestamp", columns)
+
+
+def read_sample_day(path, start_ns=_MIN_NS, end_ns=_MAX_NS, columns=None):
+    """Samples (or bars) of one file with ``start_ns <= sampling_timestamp < end_ns``"""
+    frame = _parse_times(pd.DataFrame(read_jsonl_range(path, start_ns, end_ns, "sampling_timestamp")))
+    return _finish([frame], "sampling_timestamp", columns)
+
+
+def _stream(fn, jobs, chunk_size, workers, processes):
+    """Results of fn(*job) in job order as chunks, keeping at most 2 * workers jobs ahead"""
+    pool_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool_class(max_workers=workers) as pool:
+        pending = deque()
+        jobs = iter(jobs)
+        try:
+            while True:
+                while len(pending) < 2 * workers:
+                    job = next(jobs, None)
+                    if job is None:
+                        break
+                    pending.append(pool.submit(fn, *job))
+                if not pending:
+                    return
+                frame = pending.popleft().result()
+                for low in range(0, len(frame), chunk_size):
+                    yield frame.iloc[low : low + chunk_size]
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def iter_ticks(
+    exchanges=None,
+    data_types=None,
+    symbols=None,
+    start=None,
+    end=None,
+    base_dir=None,
+    columns=None,
+    chunk_size=100_000,
+    workers=4,
+    processes=False,
+):
+    """
+    Recorded ticks with ``start <= timestamp < end`` as DataFrame chunks.
+    Exchanges, types and symbols are names or lists of names, None for all;
+    ``processes`` reads on a process pool, which parses jsonl faster than
+    threads.
+    """
+    base_dir = base_dir or get_config().recording_options.recorder_consumer_dir
+    start_ns, end_ns = _to_ns(start, _MIN_NS), _to_ns(end, _MAX_NS)
+    jobs = []
+    for exchange, data_type, symbol, symbol_dir in _symbol_dirs(
+        base_dir, _as_list(exchanges), _as_list(data_types), _as_list(symbols)
+    ):
+        dates = {match.group(1) for match in map(_DAY_NAME.match, (p.name for p in symbol_dir.iterdir())) if match}
+        for date in dates:
+            if _in_range(date, start_ns, end_ns):
+                jobs.append((base_dir, exchange, data_type, symbol, date, start_ns, end_ns, columns))
+    jobs.sort(key=lambda job: (job[4], job[1], job[2], job[3]))
+    return _stream(read_tick_day, jobs, chunk_size, workers, processes)
+
+
+def iter_samples(
+    exchanges=None,
+    data_types=None,
+    symbols=None,
+    start=None,
+    end=None,
+    interval="1min",
+    kind="sampled",
+    base_dir=None,
+    columns=None,
+    chunk_size=100_000,
+    workers=4,
+    processes=False,
+):
+    """
+    Recorded samples (``kind`` "sampled") or quote bars ("bars") of
+    ``interval`` with ``start <= sampling_timestamp < end``, as DataFrame
+    chunks. Selection as in iter_ticks.
+    """
+    base_dir = Path(base_dir or get_config().recording_options.precise_sampler_dir) / RECORD_KINDS[kind][2]
+    start_ns, end_ns = _to_ns(start, _MIN_NS), _to_ns(end, _MAX_NS)
+    jobs = []
+    for exchange, data_type, symbol, symbol_dir in _symbol_dirs(
+        base_dir, _as_list(exchanges), _as_list(data_types), _as_list(symbols)
+    ):
+        for path in symbol_dir.glob("????-??-??_*.jsonl"):
+            date = path.name[:10]
+            if path.name == sample_file_name(date, interval, kind) and _in_range(date, start_ns, end_ns):
+                jobs.append((date, exchange, data_type, symbol, path))
+    jobs.sort()
+    return _stream(
+        read_sample_day, [(path, start_ns, end_ns, columns) for *_, path in jobs], chunk_size, workers, processes
+    )
+
+
+def read_ticks(*args, **kwargs):
+    """iter_ticks() as one DataFrame, for ranges that fit in memory"""
+    return _finish(list(iter_ticks(*args, **kwargs)), "timestamp", None)
+
+
+def read_samples(*args, **kwargs):
+    """iter_samples() as one DataFrame, for ranges that fit in memory"""
+    return _finish(list(iter_samples(*args, **kwargs)), "sampling_timestamp", None)
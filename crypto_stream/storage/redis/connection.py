@@ -0,0 +1,40 @@
+import os
+
+import redis.asyncio as aioredis
+
+from crypto_stream.configs.config import get_config
+
+_pools = {}
+
+
+def get_connection_pool(host=None, port=None, db=None):
+    """
+    Process-wide asyncio connection pool, one per (host, port, db).
+
+    Pools are keyed by pid as well, so a child created with fork() never
+    reuses sockets inherited from its parent.
+    """
+    options = get_config().redis_options.connection
+    host = host or options.host
+    port = port or options.port
+    db = options.db if db is None else db
+    key = (os.getpid(), host, port, db)
+    if key not in _pools:
+        _pools[key] = aioredis.ConnectionPool(
+            host=host,
+            port=port,
+            db=db,
+            max_connections=options.max_connections,
+            socket_timeout=options.socket_timeout,
+        )
+    return _pools[key]
+
+
+def get_redis_client(host=None, port=None, db=None):
+    """asyncio Redis client over the shared pool; cheap to create"""
+    return aioredis.Redis(connection_pool=get_connection_pool(host, port, db))
+
+
+async def close_connection_pools():
+    for key in [k for k in _pools if k[0] == os.getpid()]:
+        await _pools.pop(key).disconnect()
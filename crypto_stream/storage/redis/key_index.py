@@ -0,0 +1,91 @@
+import logging
+from datetime import datetime, timezone
+
+
+def key_time_score(key, fmt):
+    """Epoch seconds of the time bucket at the end of a key, e.g. 'YYYY-MM-DD:HH'"""
+    parts = len(fmt.split(":"))
+    time_part = ":".join(key.split(":")[-parts:])
+    return int(datetime.strptime(time_part, fmt).replace(tzinfo=timezone.utc).timestamp())
+
+
+class RedisKeyIndex:
+    """
+    Registry of live Redis keys, replacing KEYS pattern scans.
+
+    Each (namespace, exchange, data_type) has a sorted set
+    ``key_index:{namespace}:{exchange}:{data_type}`` whose members are the
+    indexed keys, scored by their time bucket (epoch seconds), so readers
+    fetch exactly the keys for a time range with ZRANGEBYSCORE. All index
+    keys are listed in ``key_index:registry`` for monitoring. ``rebuild``
+    re-populates an index with SCAN after a crash or a manual cleanup.
+    """
+
+    INDEX_PREFIX = "key_index:"
+    REGISTRY_KEY = "key_index:registry"
+
+    def __init__(self, redis_client, namespace):
+        self.redis = redis_client
+        self.namespace = namespace
+        self._registered = set()
+        self.logger = logging.getLogger("RedisKeyIndex")
+
+    def index_key(self, exchange, data_type):
+        return f"{self.INDEX_PREFIX}{self.namespace}:{exchange}:{data_type}"
+
+    def add(self, pipe, exchange, data_type, key, score):
+        """Queue indexing of ``key`` on ``pipe``"""
+        index_key = self.index_key(exchange, data_type)
+        pipe.zadd(index_key, {key: score})
+        if index_key not in self._registered:
+            pipe.sadd(self.REGISTRY_KEY, index_key)
+            self._registered.add(index_key)
+
+    def remove(self, pipe, exchange, data_type, *keys):
+        if keys:
+            pipe.zrem(self.index_key(exchange, data_type), *keys)
+
+    def prune(self, pipe, exchange, data_type, max_score):
+        """Queue removal of entries whose bucket is at or before ``max_score``"""
+        pipe.zremrangebyscore(self.index_key(exchange, data_type), "-inf", max_score)
+
+    async def get(self, exchange, data_type, min_score="-inf", max_score="+inf"):
+        """Indexed keys in the score range, oldest bucket first"""
+        keys = await self.redis.zrangebyscore(self.index_key(exchange, data_type), min_score, max_score)
+        return [k.decode() if isinstance(k, bytes) else k for k in keys]
+
+    async def counts(self):
+        """Number of indexed keys per index in this namespace"""
+        prefix = f"{self.INDEX_PREFIX}{self.namespace}:"
+        index_keys = [
+            k.decode() if isinstance(k, bytes) else k
+            for k in await self.redis.smembers(self.REGISTRY_KEY)
+        ]
+        index_keys = sorted(k for k in index_keys if k.startswith(prefix))
+        pipe = self.redis.pipeline(transaction=False)
+        for index_key in index_keys:
+            pipe.zcard(index_key)
+        return dict(zip(index_keys, await pipe.execute()))
+
+    async def rebuild(self, pattern, parse_key, batch_size=1000):
+        """
+        Recover the index with a non-blocking SCAN over ``pattern``.
+
+        ``parse_key(key)`` returns (exchange, data_type, score) or None to skip.
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        found = 0
+        async for key in self.redis.scan_iter(match=pattern, count=batch_size):
+            if isinstance(key, bytes):
+                key = key.decode()
+            parsed = parse_key(key)
+            if parsed is None:
+                continue
+            exchange, data_type, score = parsed
+            self.add(pipe, exchange, data_type, key, score)
+            found += 1
+            if found % batch_size == 0:
+                await pipe.execute()
+        await pipe.execute()
+        self.logger.info(f"Rebuilt {self.namespace} key index from SCAN: {found} keys")
+        return found
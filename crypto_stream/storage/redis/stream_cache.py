@@ -0,0 +1,220 @@
+import socket
+from collections import defaultdict
+
+import redis
+
+from crypto_stream.configs.config import get_config
+from crypto_stream.storage.redis.tick_cache import RedisTickCache
+from crypto_stream.utils.tick_codec import decode_tick, encode_tick
+
+
+class RedisStreamTickCache(RedisTickCache):
+    """
+    Tick cache backed by one Redis Stream per symbol (requires Redis >= 7).
+
+    Ticks are appended with XADD (MAXLEN ~ stream_maxlen) using their event
+    time in ms as the entry id, so the sampler can look up the last tick
+    before a boundary with a single XREVRANGE instead of keeping its own
+    per-minute copy. The disk writer reads through the ``disk_writer``
+    consumer group: several writer processes with different consumer names
+    share the load, and entries are XACKed once the writer has them on disk.
+
+    To keep the DiskWriter contract, get_keys_to_flush() stages what the
+    group read under the usual hourly ``crypto_ticks:...:date:hour`` keys,
+    drain() hands them out and ack() acknowledges them after the writes. An
+    entry drained but never acknowledged (crash, failed write) stays pending
+    in the group and is staged again after a restart.
+    """
+
+    key_index_namespace = "tick_streams"
+    stream_key_prefix = "tick_stream:"
+    writer_group = "disk_writer"
+
+    def __init__(self, topic, host=None, port=None, db=None):
+        self._stream_last_ms = {}
+        self._indexed_streams = set()
+        self._groups_ready = set()
+        self._recovered = False
+        # Hourly cache key -> (ticks, {stream_key: [entry ids]})
+        self._staged = {}
+        # Hourly cache key -> {stream_key: [entry ids]} drained but not yet on disk
+        self._drained = {}
+        # stream_key -> [entry ids] read after MAXLEN trimmed them, acked without staging
+        self._trimmed = defaultdict(list)
+        super().__init__(topic, host, port, db)
+        options = get_config().redis_options.redis_tick_cache
+        self.consumer_name = options.stream_consumer_name or f"{socket.gethostname()}:{topic}"
+
+    def get_stream_key(self, exchange, data_type, symbol):
+        return f"{self.stream_key_prefix}{exchange}:{data_type}:{symbol}"
+
+    async def _rebuild_key_index(self):
+        await self.key_index.rebuild(f"{self.stream_key_prefix}*", self._parse_stream_key)
+
+    def _parse_stream_key(self, stream_key):
+        parts = stream_key.split(":")
+        if len(parts) != 4:
+            return None
+        return parts[1], parts[2], 0
+
+    def _encode_tick(self, storage_data, timestamp):
+        return timestamp.value // 1_000_000, encode_tick(storage_data)
+
+    async def _last_ms(self, stream_key):
+        if stream_key not in self._stream_last_ms:
+            last = await self.redis.xrevrange(stream_key, count=1)
+            last_id = last[0][0].decode() if last else "0-0"
+            self._stream_last_ms[stream_key] = int(last_id.split("-")[0])
+        return self._stream_last_ms[stream_key]
+
+    async def _write_values(self, pipe, cache_key, values, expiry):
+        _, exchange, data_type, symbol = cache_key.split(":")[:4]
+        stream_key = self.get_stream_key(exchange, data_type, symbol)
+        maxlen = get_config().redis_options.redis_tick_cache.stream_maxlen
+        last_ms = await self._last_ms(stream_key)
+        for ms, value in values:
+            # Entry ids must increase, late ticks share the latest ms with a new sequence
+            ms = max(ms, last_ms)
+            pipe.xadd(stream_key, {"d": value}, id=f"{ms}-*", maxlen=maxlen, approximate=True)
+            last_ms = ms
+        self._stream_last_ms[stream_key] = last_ms
+        if stream_key not in self._indexed_streams:
+            self.key_index.add(pipe, exchange, data_type, stream_key, 0)
+            self._indexed_streams.add(stream_key)
+
+    async def _ensure_group(self, stream_keys, group):
+        for stream_key in stream_keys:
+            if (stream_key, group) in self._groups_ready:
+                continue
+            try:
+                await self.redis.xgroup_create(stream_key, group, id="0", mkstream=True)
+            except redis.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+            self._groups_ready.add((stream_key, group))
+
+    def _stage(self, response):
+        read = 0
+        for stream_key, entries in response or []:
+            if isinstance(stream_key, bytes):
+                stream_key = stream_key.decode()
+            _, exchange, data_type, symbol = stream_key.split(":")
+            for entry_id, fields in entries:
+                read += 1
+                if not fields:
+                    # Trimmed by MAXLEN before it was read; ack it so it leaves the pending list
+                    self._trimmed[stream_key].append(entry_id)
+                    continue
+                tick = decode_tick(fields[b"d"], exchange, data_type, symbol)
+                ts = tick["timestamp"]
+                cache_key = self.get_cache_key(exchange, data_type, symbol, f"{ts[:10]}:{ts[11:13]}")
+                ticks, ids = self._staged.setdefault(cache_key, ([], defaultdict(list)))
+                ticks.append(tick)
+                ids[stream_key].append(entry_id)
+        return read
+
+    async def _recover_pending(self, stream_keys, count):
+        """Stage every entry delivered to this consumer before a restart but never acked"""
+        # Pending entries are re-read from an id, so page through each stream's list
+        positions = {stream_key: "0" for stream_key in stream_keys}
+        while positions:
+            response = await self.redis.xreadgroup(self.writer_group, self.consumer_name, positions, count=count)
+            self._stage(response)
+            await self._ack_trimmed()
+            done = set(positions)
+            for stream_key, entries in response or []:
+                if isinstance(stream_key, bytes):
+                    stream_key = stream_key.decode()
+                if len(entries) >= count:
+                    last_id = entries[-1][0]
+                    positions[stream_key] = last_id.decode() if isinstance(last_id, bytes) else last_id
+                    done.discard(stream_key)
+            for stream_key in done:
+                del positions[stream_key]
+
+    async def get_keys_to_flush(self, exchange, data_type):
+        """Read new entries for the writer group and return the hourly keys they fall into"""
+        await self.flush_pending()
+        stream_keys = await self.key_index.get(exchange, data_type)
+        if stream_keys:
+            await self._ensure_group(stream_keys, self.writer_group)
+            count = get_config().redis_options.redis_tick_cache.stream_read_count
+            if not self._recovered:
+                await self._recover_pending(stream_keys, count)
+                self._recovered = True
+            for _ in range(100):
+                response = await self.redis.xreadgroup(
+                    self.writer_group, self.consumer_name, {k: ">" for k in stream_keys}, count=count
+                )
+                read = self._stage(response)
+                await self._ack_trimmed()
+                if read < count:
+                    break
+
+        prefix = f"{self.cache_key_prefix}{exchange}:{data_type}:"
+        return sorted(
+            (k for k in self._staged if k.startswith(prefix)),
+            key=lambda k: ":".join(k.split(":")[-2:]),
+        )
+
+    async def _ack_trimmed(self):
+        if not self._trimmed:
+            return
+        trimmed, self._trimmed = self._trimmed, defaultdict(list)
+        await self._xack(trimmed)
+
+    async def _xack(self, ids):
+        pipe = self.redis.pipeline(transaction=False)
+        for stream_key, entry_ids in ids.items():
+            pipe.xack(stream_key, self.writer_group, *entry_ids)
+        await pipe.execute()
+
+    async def _restore_orphaned_temp_keys(self):
+        pass  # streams are never renamed
+
+    async def drain(self, cache_keys, chunk_size=None):
+        """Yield the staged ticks of ``cache_keys`` as one chunk; ack() acknowledges them"""
+        chunk = {}
+        for cache_key in cache_keys:
+            staged = self._staged.pop(cache_key, None)
+            if staged is None:
+                continue
+            ticks, ids = staged
+            drained = self._drained.setdefault(cache_key, defaultdict(list))
+            for stream_key, entry_ids in ids.items():
+                drained[stream_key].extend(entry_ids)
+            chunk[cache_key] = ticks
+        if chunk:
+            yield chunk
+
+    async def ack(self, cache_keys):
+        """Acknowledge the entries drained from ``cache_keys`` in the writer group"""
+        ids = defaultdict(list)
+        for cache_key in cache_keys:
+            for stream_key, entry_ids in self._drained.pop(cache_key, {}).items():
+                ids[stream_key].extend(entry_ids)
+        if ids:
+            await self._xack(ids)
+
+    async def get_and_clear_ticks(self, cache_key):
+        """Return the staged ticks for an hourly key and acknowledge them in the group"""
+        ticks = await super().get_and_clear_ticks(cache_key)
+        await self.ack([cache_key])
+        return ticks
+
+    async def get_symbols(self, exchange, data_type):
+        """(exchange, data_type, symbol) of every stream in the key index"""
+        return {
+            tuple(stream_key.split(":")[1:4])
+            for stream_key in await self.key_index.get(exchange, data_type)
+        }
+
+    async def get_last_tick_before(self, exchange, data_type, symbol, minute):
+        """Last tick whose event time is strictly before ``minute``, or None"""
+        boundary_ms = minute.value // 1_000_000
+        entries = await self.redis.xrevrange(
+            self.get_stream_key(exchange, data_type, symbol), max=boundary_ms - 1, min="-", count=1
+        )
+        if not entries:
+            return None
+        return decode_tick(entries[0][1][b"d"], exchange, data_type, symbol)
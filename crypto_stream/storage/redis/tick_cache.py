@@ -1,46 +1,108 @@
-import json
+import asyncio
 import logging
 import time
+from collections import defaultdict
 
 import pandas as pd
-import redis
 
-from crypto_stream.configs.config import get_redis_options
-
-
-class RedisTickCache:
-    def __init__(self, topic, host="localhost", port=6379, db=0):
-        self.redis = redis.Redis(host=host, port=port, db=db)
-        self.cache_key_prefix = f"crypto_ticks:"
+from crypto_stream.configs.config import get_config
+from crypto_stream.storage.base import TickCache
+from crypto_stream.storage.redis.connection import get_redis_client
+from crypto_stream.storage.redis.key_index import RedisKeyIndex, key_time_score
+from crypto_stream.utils.str_utils import parse_topic
+from crypto_stream.utils.tick_codec import decode_tick, encode_tick
+
+# Pops up to ARGV[1] items from the head of every list in KEYS in one atomic
+# step and returns them as one array per key (LTRIM deletes emptied lists).
+DRAIN_SCRIPT = """
+local n = tonumber(ARGV[1])
+local out = {}
+for i, key in ipairs(KEYS) do
+    local items = redis.call('LRANGE', key, 0, n - 1)
+    if #items > 0 then
+        redis.call('LTRIM', key, #items, -1)
+    end
+    out[i] = items
+end
+return out
+"""
+
+# Moves a temp key of the old rename-based drain (KEYS[1]) back to the head
+# of its cache key (KEYS[2]) in one step, so concurrent restores cannot
+# both copy it; sets the expiry ARGV[1] and returns the number of items.
+RESTORE_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, -1)
+for i = #items, 1, -1 do
+    redis.call('LPUSH', KEYS[2], items[i])
+end
+if #items > 0 then
+    redis.call('EXPIRE', KEYS[2], tonumber(ARGV[1]))
+end
+redis.call('DEL', KEYS[1])
+return #items
+"""
+
+
+class RedisTickCache(TickCache):
+    key_index_namespace = "ticks"
+
+    def __init__(self, topic, host=None, port=None, db=None):
+        # asyncio client over the process-wide pool (see storage.redis.connection)
+        self.redis = get_redis_client(host, port, db)
         self.topic = topic
         self.out_of_order_count = 0
         # Create logger for this class
         self.logger = logging.getLogger("RedisTickCache")
+        # Write-behind buffer: cache_key -> serialized ticks not yet in Redis
+        self._pending = defaultdict(list)
+        self._pending_count = 0
+        self._last_pending_flush = time.monotonic()
+        self._flush_lock = asyncio.Lock()
+        # Latest event time seen per (exchange, data_type, symbol)
+        self._last_timestamps = {}
+        # Per (exchange, data_type) registry of live keys
+        self.key_index = RedisKeyIndex(self.redis, self.key_index_namespace)
+        self._drain_script = self.redis.register_script(DRAIN_SCRIPT)
+        self._restore_script = self.redis.register_script(RESTORE_SCRIPT)
+
+    async def initialize(self):
+        """Async setup that cannot run in __init__; call once before use"""
+        await self._restore_orphaned_temp_keys()
+        await self._rebuild_key_index()
+
+    async def _rebuild_key_index(self):
+        await self.key_index.rebuild(f"{self.cache_key_prefix}*", self._parse_cache_key)
+
+    def _parse_cache_key(self, cache_key):
+        """(exchange, data_type, hour score) of a cache key, for the key index"""
+        parts = cache_key.split(":")
+        if len(parts) != 6:
+            return None
+        try:
+            return parts[1], parts[2], key_time_score(cache_key, "%Y-%m-%d:%H")
+        except ValueError:
+            return None
 
-    def get_cache_key(self, exchange, data_type, symbol, date_hour):
-        return f"{self.cache_key_prefix}{exchange}:{data_type}:{symbol}:{date_hour}"
-
-    def get_keys_to_flush(self, exchange, data_type):
+    async def get_keys_to_flush(self, exchange, data_type):
         """Get all keys that need to be flushed to disk, sorted by time"""
-        # Get all matching keys
-        keys = self.redis.keys(f"{self.cache_key_prefix}*")
-        # First decode bytes to strings
-        keys = [k.decode() if isinstance(k, bytes) else k for k in keys]
+        # Make buffered ticks visible before the writer drains Redis
+        await self.flush_pending()
+        # Indexed keys come back ordered by hour; keep the ones still in Redis
+        # and drop index entries whose key expired or was drained. Holding the
+        # flush lock keeps a concurrent write from re-creating a key in between.
+        async with self._flush_lock:
+            keys = await self.key_index.get(exchange, data_type)
+            pipe = self.redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.exists(key)
+            exists = await pipe.execute()
+            sorted_keys = [key for key, found in zip(keys, exists) if found]
+            self.key_index.remove(pipe, exchange, data_type, *[key for key, found in zip(keys, exists) if not found])
+            await pipe.execute()
 
-        # Then filter by exchange and data_type
-        keys = [k for k in keys if f":{exchange}:" in k and f":{data_type}:" in k]
-
-        # Sort keys based on their timestamp component
         def get_key_time(key):
             # Key format is crypto_ticks:exchange:type:symbol:YYYY-MM-DD:HH
-            try:
-                time_part = key.split(":")[-2:]  # Get ['YYYY-MM-DD', 'HH']
-                return f"{time_part[0]}:{time_part[1]}"  # Combine to 'YYYY-MM-DD:HH'
-            except IndexError:
-                return "0"  # Default value for invalid keys
-
-        # Sort keys by their timestamps
-        sorted_keys = sorted(keys, key=get_key_time)
+            return ":".join(key.split(":")[-2:])
 
         self.logger.debug(
             f"Found {len(sorted_keys)} keys to flush, first few timestamps:"
@@ -50,7 +112,7 @@ class RedisTickCache:
 
         return sorted_keys
 
-    def add_tick(self, tick_data, storage_data):
+    async def add_tick(self, tick_data, storage_data):
         # Extract components for the key
         exchange = tick_data["market_data"]["exchange"]
         data_type = tick_data["market_data"]["type"]
@@ -59,56 +121,132 @@ class RedisTickCache:
         date_hour = timestamp.strftime("%Y-%m-%d:%H")
         # Create cache key
         cache_key = self.get_cache_key(exchange, data_type, symbol, date_hour)
-        # Debug: Check existing ticks
-        existing = self.redis.lrange(cache_key, 0, 5)  # Get first 5 ticks
-        if existing:
-            self.logger.debug(f"Last 5 ticks for {symbol} before new tick {timestamp}:")
-            for tick in existing:
-                tick_data = json.loads(tick)
-                self.logger.debug(f"Tick time: {tick_data['timestamp']}")
-
-        # Check order for monitoring
-        latest_tick = self.redis.lindex(cache_key, -1)
-        if latest_tick:
-            latest_tick = json.loads(latest_tick)
-            latest_time = pd.Timestamp(latest_tick["timestamp"])
-
-            if timestamp < latest_time:
-                self.out_of_order_count += 1
-                self.logger.warning(
-                    f"Out of order tick detected:\n"
-                    f"Symbol: {symbol}\n"
-                    f"New tick time: {timestamp}\n"
-                    f"Latest tick time: {latest_time}\n"
-                    f"Total out of order count: {self.out_of_order_count}"
-                )
-
+        # Check order for monitoring against in-process state
+        symbol_key = (exchange, data_type, symbol)
+        latest_time = self._last_timestamps.get(symbol_key)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                f"{symbol}: new tick {timestamp}, previous tick {latest_time}, "
+                f"{len(self._pending.get(cache_key, []))} pending"
+            )
+        if latest_time is not None and timestamp < latest_time:
+            self.out_of_order_count += 1
+            self.logger.warning(
+                f"Out of order tick detected:\n"
+                f"Symbol: {symbol}\n"
+                f"New tick time: {timestamp}\n"
+                f"Latest tick time: {latest_time}\n"
+                f"Total out of order count: {self.out_of_order_count}"
+            )
+        else:
+            self._last_timestamps[symbol_key] = timestamp
+
+        options = get_config().redis_options.redis_tick_cache
+        value = self._encode_tick(storage_data, timestamp)
+        if not options.write_behind:
+            # Under the flush lock like buffered writes, so get_keys_to_flush cannot
+            # drop the key from the index between our RPUSH and its EXISTS check
+            async with self._flush_lock:
+                pipe = self.redis.pipeline(transaction=False)
+                await self._write_values(pipe, cache_key, [value], options.redis_expiry)
+                await pipe.execute()
+            return
+
+        self._pending[cache_key].append(value)
+        self._pending_count += 1
+        if self._pending_count >= options.write_behind_max_ticks:
+            await self.flush_pending()
+
+    async def flush_pending(self):
+        """Push buffered ticks with one RPUSH and one EXPIRE per key, in a single pipeline"""
+        # Serialize flushes so batches reach Redis in the order they were buffered
+        async with self._flush_lock:
+            if not self._pending:
+                self._last_pending_flush = time.monotonic()
+                return
+            expiry = get_config().redis_options.redis_tick_cache.redis_expiry
+            # Swap the buffer out so ticks added while awaiting go to the next batch
+            pending, self._pending = self._pending, defaultdict(list)
+            pending_count, self._pending_count = self._pending_count, 0
+            pipe = self.redis.pipeline(transaction=False)
+            for cache_key, values in pending.items():
+                await self._write_values(pipe, cache_key, values, expiry)
+            try:
+                await pipe.execute()
+            except Exception:
+                # Keep the batch for the next flush, ahead of newer ticks
+                for cache_key, values in self._pending.items():
+                    pending[cache_key].extend(values)
+                self._pending = pending
+                self._pending_count += pending_count
+                raise
+            self._last_pending_flush = time.monotonic()
+
+    def _encode_tick(self, storage_data, timestamp):
+        """Value buffered for one tick"""
+        return encode_tick(storage_data)
+
+    async def _write_values(self, pipe, cache_key, values, expiry):
+        """Queue the commands storing ``values`` under ``cache_key`` on ``pipe``"""
         # Add to Redis list and set expiry
-        self.redis.rpush(cache_key, json.dumps(storage_data))
-        self.redis.expire(
-            cache_key, get_redis_options()["redis_tick_cache"]["redis_expiry"]
-        )
-
-    # def get_and_clear_ticks(self, cache_key):
-    #    """Get all ticks for a key and remove them from Redis"""
-    #    pipe = self.redis.pipeline()
-    #    pipe.lrange(cache_key, 0, -1)  # Get all items
-    #    pipe.delete(cache_key)         # Delete the key
-    #    results = pipe.execute()
-    #    return [json.loads(tick) for tick in results[0]]
-
-    def get_and_clear_ticks(self, cache_key):
-        """Get all ticks atomically using rename"""
-        temp_key = f"temp:{cache_key}:tmp{int(time.time() * 1000)}"
-
-        # Atomically rename the key to temp key
-        if not self.redis.rename(cache_key, temp_key):
-            return []  # Key doesn't exist
-
-        # Now we can take our time reading the temp key
-        try:
-            ticks = self.redis.lrange(temp_key, 0, -1)
-            return [json.loads(tick) for tick in ticks]
-        finally:
-            # Clean up temp key
-            self.redis.delete(temp_key)
+        pipe.rpush(cache_key, *values)
+        pipe.expire(cache_key, expiry)
+        self._index_cache_key(cache_key, pipe)
+
+    def _index_cache_key(self, cache_key, pipe):
+        exchange, data_type, score = self._parse_cache_key(cache_key)
+        self.key_index.add(pipe, exchange, data_type, cache_key, score)
+
+    async def flush_pending_if_due(self):
+        """Flush the write-behind buffer once it is older than write_behind_max_delay"""
+        max_delay = get_config().redis_options.redis_tick_cache.write_behind_max_delay
+        if self._pending and time.monotonic() - self._last_pending_flush >= max_delay:
+            await self.flush_pending()
+
+    async def drain(self, cache_keys, chunk_size=None):
+        """
+        Atomically pop ticks from many keys, yielding {cache_key: ticks} chunks.
+
+        Each round trip pops up to ``chunk_size`` ticks from every key still
+        holding data, so huge hourly lists are streamed out in bounded chunks
+        and the number of calls does not grow with the number of symbols.
+        """
+        if chunk_size is None:
+            chunk_size = get_config().redis_options.redis_tick_cache.drain_chunk_size
+        remaining = list(cache_keys)
+        while remaining:
+            results = await self._drain_script(keys=remaining, args=[chunk_size])
+            chunk = {}
+            still_full = []
+            for cache_key, items in zip(remaining, results):
+                if items:
+                    exchange, data_type, symbol = cache_key.split(":")[1:4]
+                    chunk[cache_key] = [decode_tick(tick, exchange, data_type, symbol) for tick in items]
+                if len(items) == chunk_size:
+                    still_full.append(cache_key)
+            if chunk:
+                yield chunk
+            remaining = still_full
+
+    async def _restore_orphaned_temp_keys(self):
+        """Put back ticks left in temp: keys by the old rename-based drain"""
+        # Only this topic's keys; the other recorder processes restore their own
+        exchange, data_type = parse_topic(self.topic)
+        restored = 0
+        expiry = get_config().redis_options.redis_tick_cache.redis_expiry
+        async for temp_key in self.redis.scan_iter(
+            match=f"temp:{self.cache_key_prefix}{exchange}:{data_type}:*", count=1000
+        ):
+            if isinstance(temp_key, bytes):
+                temp_key = temp_key.decode()
+            # temp:<cache_key>:tmp<ms>
+            cache_key = temp_key[len("temp:"):].rsplit(":", 1)[0]
+            # Older than anything pushed since, so they go to the head of the list
+            count = await self._restore_script(keys=[temp_key, cache_key], args=[expiry])
+            if count:
+                pipe = self.redis.pipeline(transaction=False)
+                self._index_cache_key(cache_key, pipe)
+                await pipe.execute()
+            restored += count
+        if restored:
+            self.logger.warning(f"Restored {restored} ticks from orphaned temp keys")
@@ -1,3 +1,6 @@
+import pandas as pd
+
+
 def parse_topic(topic: str) -> tuple[str, str]:
     """
     Parse exchange and data type from Kafka topic name
@@ -21,6 +24,28 @@ def parse_topic(topic: str) -> tuple[str, str]:
     return exchange, data_type
 
 
+def interval_suffix(interval):
+    """'' for the 1 minute samples (the original keys and files), ':<name>' otherwise"""
+    if pd.Timedelta(interval) == pd.Timedelta(minutes=1):
+        return ""
+    return f":{interval}"
+
+
+# Record kind -> (Redis key prefix, pub/sub channel prefix, directory and file tag)
+RECORD_KINDS = {
+    "sampled": ("sampled", "latest_samples", "sampled"),
+    "bars": ("bars", "latest_bars", "bars"),
+}
+
+
+def sample_file_name(sample_date, interval="1min", kind="sampled"):
+    """Name of the daily jsonl file of ``kind`` records for ``interval``"""
+    tag = RECORD_KINDS[kind][2]
+    if interval_suffix(interval):
+        return f"{sample_date}_{tag}_{interval}.jsonl"
+    return f"{sample_date}_{tag}.jsonl"
+
+
 if __name__ == "__main__":
     topics = [
         "crypto-ticks-binance-futures-quote",
@@ -0,0 +1,289 @@
+"""
+Versioned encoding of quote ticks for Kafka values and Redis entries.
+
+A value is either JSON (always starts with ``{``) or a packed binary record
+whose first byte is the codec version, so readers detect the format per
+value and old JSON data stays readable after switching codec_options.format.
+
+Binary quote record, version 1 (little endian, 66 bytes):
+
+    B  version
+    B  flags: bit i (0-3) price/size field i was an int,
+              bit 4+i it was None
+    4q event, local, receive and sampling time in ns since epoch (0 = None)
+    4d bid_price, bid_size, ask_price, ask_size
+
+Exchange, data type and symbol are not stored in the record: every hop
+already has them in the Kafka topic/key or the Redis key, so callers pass
+them to the decoder instead of paying for them on every tick.
+"""
+import struct
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from crypto_stream.configs.config import get_config
+from crypto_stream.utils.json_utils import dumps, loads
+
+FORMAT_JSON = "json"
+FORMAT_BINARY = "binary"
+
+QUOTE_V1 = 1
+_QUOTE_V1 = struct.Struct("<BB4q4d")
+
+TIME_FIELDS = ("timestamp", "local_timestamp", "receive_timestamp", "sampling_timestamp")
+PRICE_FIELDS = ("bid_price", "bid_size", "ask_price", "ask_size")
+# Key order of prepare_storage_quote_sampling_data, kept so decoded ticks serialize the same
+STORAGE_FIELDS = TIME_FIELDS + ("symbol", "exchange", "type") + PRICE_FIELDS
+_STORAGE_KEYS = frozenset(STORAGE_FIELDS)
+
+# Decoded columns of many ticks (decode_tick_array, the memory tick cache)
+QUOTE_DTYPE = np.dtype(
+    [
+        ("event_ns", "i8"),
+        ("local_ns", "i8"),
+        ("receive_ns", "i8"),
+        ("sampling_ns", "i8"),
+        ("bid_price", "f8"),
+        ("bid_size", "f8"),
+        ("ask_price", "f8"),
+        ("ask_size", "f8"),
+        ("flags", "u1"),
+    ]
+)
+# Layout of a packed version 1 record, for decoding many at once (np.frombuffer, np.memmap)
+QUOTE_V1_DTYPE = np.dtype(
+    [("version", "u1"), ("flags", "u1")]
+    + [(name, "<i8") for name in ("event_ns", "local_ns", "receive_ns", "sampling_ns")]
+    + [(name, "<f8") for name in PRICE_FIELDS]
+)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_JSON_START = ord("{")
+
+
+# Per-process caches of minute prefixes, the only costly part of converting timestamps
+_MINUTE_NS = {}
+_MINUTE_PREFIX = {}
+_CACHE_SIZE = 10000
+_NS_PER_MINUTE = 60 * 1_000_000_000
+
+
+def _minute_ns(prefix):
+    ns = _MINUTE_NS.get(prefix)
+    if ns is None:
+        if len(_MINUTE_NS) >= _CACHE_SIZE:
+            _MINUTE_NS.clear()
+        dt = datetime.fromisoformat(prefix).replace(tzinfo=timezone.utc)
+        ns = _MINUTE_NS[prefix] = (dt - _EPOCH) // timedelta(microseconds=1) * 1000
+    return ns
+
+
+def _minute_prefix(minute):
+    prefix = _MINUTE_PREFIX.get(minute)
+    if prefix is None:
+        if len(_MINUTE_PREFIX) >= _CACHE_SIZE:
+            _MINUTE_PREFIX.clear()
+        dt = _EPOCH + timedelta(minutes=minute)
+        prefix = _MINUTE_PREFIX[minute] = dt.strftime("%Y-%m-%dT%H:%M:")
+    return prefix
+
+
+def iso_to_ns(value):
+    """ISO 8601 UTC string (e.g. '2025-01-16T12:34:56.789Z') to ns since epoch, None -> 0"""
+    if value is None:
+        return 0
+    # Fast path for the tardis layout YYYY-MM-DDTHH:MM:SS.f...Z
+    if value[-1] == "Z" and value[19:20] == "." and len(value) <= 30:
+        try:
+            return (
+                (_MINUTE_NS.get(value[:16]) or _minute_ns(value[:16]))
+                + int(value[17:19]) * 1_000_000_000
+                + int(value[20:-1].ljust(9, "0"))
+            )
+        except ValueError:
+            pass
+    return pd.Timestamp(value).value
+
+
+def ns_to_iso(ns):
+    """Inverse of iso_to_ns: millisecond precision unless there are microseconds"""
+    if not ns:
+        return None
+    minute, rest = divmod(ns, _NS_PER_MINUTE)
+    seconds, rest = divmod(rest, 1_000_000_000)
+    micros = rest // 1000
+    if micros % 1000 == 0:
+        return f"{_minute_prefix(minute)}{seconds:02d}.{micros // 1000:03d}Z"
+    return f"{_minute_prefix(minute)}{seconds:02d}.{micros:06d}Z"
+
+
+def is_binary(value):
+    """True for a binary record, False for JSON text"""
+    return isinstance(value, (bytes, bytearray, memoryview)) and len(value) > 0 and value[0] != _JSON_START
+
+
+def price_flags(prices):
+    """Flags byte for four price/size values; None entries are replaced by 0.0 in place"""
+    flags = 0
+    for i, price in enumerate(prices):
+        if price is None:
+            flags |= 1 << (4 + i)
+            prices[i] = 0.0
+        elif type(price) is int:
+            flags |= 1 << i
+    return flags
+
+
+def apply_price_flags(flags, prices):
+    """Inverse of price_flags: restore ints and Nones in place"""
+    if flags:
+        for i in range(4):
+            if flags & (1 << (4 + i)):
+                prices[i] = None
+            elif flags & (1 << i):
+                prices[i] = int(prices[i])
+    return prices
+
+
+def _pack(times, prices):
+    flags = price_flags(prices)
+    return _QUOTE_V1.pack(
+        QUOTE_V1, flags, iso_to_ns(times[0]), iso_to_ns(times[1]), iso_to_ns(times[2]), iso_to_ns(times[3]), *prices
+    )
+
+
+def _unpack(value):
+    if value[0] != QUOTE_V1:
+        raise ValueError(f"Unknown tick codec version {value[0]}")
+    _, flags, event, local, receive, sampling, *prices = _QUOTE_V1.unpack(value)
+    apply_price_flags(flags, prices)
+    return [ns_to_iso(event), ns_to_iso(local), ns_to_iso(receive), ns_to_iso(sampling)], prices
+
+
+def _binary_enabled(fmt):
+    if fmt is None:
+        fmt = get_config().codec_options.format
+    return fmt == FORMAT_BINARY
+
+
+def is_storage_quote(storage_data):
+    """True if ``storage_data`` has exactly the quote storage layout with numeric prices"""
+    return storage_data.keys() == _STORAGE_KEYS and _encodable([storage_data[f] for f in PRICE_FIELDS])
+
+
+def _encodable(prices):
+    for value in prices:
+        if value is not None and type(value) is not float and type(value) is not int:
+            return False
+    return True
+
+
+def encode_tick(storage_data, fmt=None):
+    """
+    Value stored in Redis for a flattened quote tick.
+
+    Falls back to JSON for anything that is not exactly the storage quote
+    layout (prepare_storage_quote_sampling_data), so other data stays intact.
+    """
+    if _binary_enabled(fmt) and storage_data.keys() == _STORAGE_KEYS:
+        prices = [storage_data[f] for f in PRICE_FIELDS]
+        if _encodable(prices):
+            return _pack([storage_data[f] for f in TIME_FIELDS], prices)
+    return dumps(storage_data)
+
+
+def decode_tick(value, exchange, data_type, symbol):
+    """Flattened tick dict from a value written by encode_tick"""
+    if not is_binary(value):
+        return loads(value)
+    (timestamp, local, receive, sampling), (bid_price, bid_size, ask_price, ask_size) = _unpack(value)
+    return {
+        "timestamp": timestamp,
+        "local_timestamp": local,
+        "receive_timestamp": receive,
+        "sampling_timestamp": sampling,
+        "symbol": symbol,
+        "exchange": exchange,
+        "type": data_type,
+        "bid_price": bid_price,
+        "bid_size": bid_size,
+        "ask_price": ask_price,
+        "ask_size": ask_size,
+    }
+
+
+def decode_tick_array(values):
+    """
+    QUOTE_DTYPE array of values written by encode_tick, in order.
+
+    When every value is a version 1 record they are decoded with a single
+    np.frombuffer over the joined bytes; otherwise value by value.
+    """
+    out = np.empty(len(values), dtype=QUOTE_DTYPE)
+    if not len(values):
+        return out
+    joined = b"".join(values) if all(isinstance(v, bytes) for v in values) else b""
+    if len(joined) == len(values) * _QUOTE_V1.size:
+        # JSON starts with '{', so if every record boundary holds the version byte all values are binary
+        records = np.frombuffer(joined, dtype=QUOTE_V1_DTYPE)
+        if (records["version"] == QUOTE_V1).all():
+            for name in QUOTE_DTYPE.names:
+                out[name] = records[name]
+            return out
+    for i, value in enumerate(values):
+        if is_binary(value):
+            if value[0] != QUOTE_V1:
+                raise ValueError(f"Unknown tick codec version {value[0]}")
+            _, flags, *fields = _QUOTE_V1.unpack(value)
+            out[i] = (*fields, flags)
+        else:
+            tick = loads(value)
+            prices = [tick.get(f) for f in PRICE_FIELDS]
+            flags = price_flags(prices)
+            out[i] = (*(iso_to_ns(tick.get(f)) for f in TIME_FIELDS), *prices, flags)
+    return out
+
+
+def encode_quote_message(data, fmt=None):
+    """
+    Binary Kafka value for a normalized quote frame (``type`` already
+    remapped to "quote"), or None when it should be published as JSON.
+    """
+    if not _binary_enabled(fmt) or data.get("type") != "quote":
+        return None
+    bids = data.get("bids") or []
+    asks = data.get("asks") or []
+    if len(bids) > 1 or len(asks) > 1:
+        return None
+    bid = bids[0] if bids else {}
+    ask = asks[0] if asks else {}
+    prices = [bid.get("price"), bid.get("amount"), ask.get("price"), ask.get("amount")]
+    if not _encodable(prices):
+        return None
+    return _pack([data.get("timestamp"), data.get("localTimestamp"), None, None], prices)
+
+
+def decode_quote_message(value, exchange, data_type, symbol):
+    """Normalized frame dict (as tardis sends it) from a Kafka value, JSON or binary"""
+    if not is_binary(value):
+        return loads(value)
+    times, (bid_price, bid_size, ask_price, ask_size) = _unpack(value)
+    return {
+        "type": data_type,
+        "symbol": symbol,
+        "exchange": exchange,
+        "depth": 1,
+        "bids": [] if bid_price is None else [{"price": bid_price, "amount": bid_size}],
+        "asks": [] if ask_price is None else [{"price": ask_price, "amount": ask_size}],
+        "timestamp": times[0],
+        "localTimestamp": times[1],
+    }
+
+
+def symbol_from_message_key(key, exchange, data_type):
+    """Symbol part of a '{exchange}-{symbol}-{data_type}' Kafka key"""
+    if isinstance(key, bytes):
+        key = key.decode("utf-8")
+    return key[len(exchange) + 1 : -(len(data_type) + 1)]
@@ -0,0 +1,56 @@
+import dataclasses
+
+import pytest
+
+from crypto_stream.configs import config as config_module
+
+
+@pytest.fixture
+def configure(monkeypatch):
+    """Replace config sections for one test: configure(disk_writer_options={"format": "binary"})"""
+
+    def _configure(**sections):
+        config = config_module.get_config()
+        changes = {name: dataclasses.replace(getattr(config, name), **values) for name, values in sections.items()}
+        monkeypatch.setattr(config_module.config_manager, "_config", dataclasses.replace(config, **changes))
+
+    return _configure
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Point every get_redis_client() at one in-memory Redis 7 server; returns a client factory"""
+    import fakeredis
+
+    from crypto_stream.market_data.processing.samplers import precise_sampler
+    from crypto_stream.storage.redis import connection, tick_cache
+
+    server = fakeredis.FakeServer(version=7)
+
+    def client(*args, **kwargs):
+        return fakeredis.FakeAsyncRedis(server=server)
+
+    for module in (connection, tick_cache, precise_sampler):
+        monkeypatch.setattr(module, "get_redis_client", client)
+    return client
+
+
+@pytest.fixture
+def quote_tick():
+    """quote_tick(symbol, iso_time, bid) -> (tick_data, storage_data) as the recorder consumer builds them"""
+    from crypto_stream.utils.data_utils import format_quote_data, prepare_storage_quote_sampling_data
+
+    def _quote_tick(symbol, timestamp, bid=100.0, exchange="binance"):
+        raw = {
+            "symbol": symbol,
+            "exchange": exchange,
+            "type": "quote",
+            "bids": [{"price": bid, "amount": 1.0}],
+            "asks": [{"price": bid + 1, "amount": 2.0}],
+            "timestamp": timestamp,
+            "localTimestamp": timestamp,
+        }
+        tick_data = format_quote_data(raw)
+        return tick_data, prepare_storage_quote_sampling_data(tick_data)
+
+    return _quote_tick
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from crypto_stream.configs.config import CONFIG_FILE, ConfigError, ConfigManager, parse_config
+
+
+def test_bool_is_not_an_int():
+    with pytest.raises(ConfigError):
+        parse_config({"streamer_options": {"num_connections": True}})
+    with pytest.raises(ConfigError):
+        parse_config({"durability_options": {"commit_interval": False}})
+
+
+def test_broken_file_is_reported_once(tmp_path, caplog):
+    path = tmp_path / "config.yaml"
+    path.write_text(CONFIG_FILE.read_text())
+    manager = ConfigManager(path)
+    manager.get()
+    changes = []
+    manager.subscribe(lambda old, new: changes.append(new))
+
+    path.write_text("streamer_options: [")
+    # Explicit mtimes, in case the filesystem's are too coarse to tell the writes apart
+    os.utime(path, ns=(1, 1))
+    assert not manager.check_for_updates()
+    assert not manager.check_for_updates()
+    assert len([r for r in caplog.records if "reload failed" in r.getMessage()]) == 1
+
+    path.write_text(CONFIG_FILE.read_text().replace("commit_interval: 1.0", "commit_interval: 2.0"))
+    os.utime(path, ns=(2, 2))
+    assert manager.check_for_updates()
+    assert [config.durability_options.commit_interval for config in changes] == [2.0]
@@ -0,0 +1,76 @@
+import os
+
+from crypto_stream.storage.disk.file_index import (
+    format_records,
+    load_file_index,
+    read_jsonl_range,
+    spans_for_range,
+    update_file_index,
+)
+from crypto_stream.utils.tick_codec import iso_to_ns
+
+
+def _records(times):
+    return [{"timestamp": f"2025-01-16T12:{t}.000Z", "bid_price": 100.0 + i, "ask_price": 101.0} for i, t in enumerate(times)]
+
+
+def _append(path, records, index=True):
+    text, rows = format_records(records)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        offset = os.fstat(fd).st_size
+        os.write(fd, text.encode())
+        if index:
+            update_file_index(path, fd, offset, rows)
+    finally:
+        os.close(fd)
+    return [len(line) + 1 for line in text.splitlines()]
+
+
+def _ns(time):
+    return iso_to_ns(f"2025-01-16T12:{time}.000Z")
+
+
+def test_minute_spans_cover_late_rows(tmp_path):
+    path = tmp_path / "2025-01-16.jsonl"
+    lengths = _append(path, _records(["00:10", "00:50", "01:05"]))
+    # A late tick of minute 00 arrives after minute 01 started
+    lengths += _append(path, _records(["00:55", "02:00"]))
+    index = load_file_index(path)
+    ends = [sum(lengths[: i + 1]) for i in range(len(lengths))]
+    assert index["rows"] == 5
+    assert index["first"] == "2025-01-16T12:00:10.000Z"
+    assert index["last"] == "2025-01-16T12:02:00.000Z"
+    assert index["minutes"] == {
+        "2025-01-16T12:00": [0, ends[3]],
+        "2025-01-16T12:01": [ends[1], ends[2]],
+        "2025-01-16T12:02": [ends[3], ends[4]],
+    }
+    assert spans_for_range(index, _ns("01:00"), _ns("01:30")) == [[ends[1], ends[2]]]
+    # Overlapping spans of adjacent minutes are merged
+    assert spans_for_range(index, _ns("00:30"), _ns("01:30")) == [[0, ends[3]]]
+    assert spans_for_range(index, _ns("02:00"), _ns("03:00")) == [[ends[3], ends[4]]]
+    assert spans_for_range(index, _ns("05:00"), _ns("06:00")) == []
+
+
+def test_read_range_includes_unindexed_bytes(tmp_path):
+    path = tmp_path / "2025-01-16.jsonl"
+    # Written before the index existed, indexed, then appended after a crash before the index update
+    _append(path, _records(["00:10", "01:10"]), index=False)
+    _append(path, _records(["01:20", "02:10"]))
+    _append(path, _records(["01:30"]), index=False)
+    index = load_file_index(path)
+    assert index["start"] > 0 and index["rows"] == 2
+    records = read_jsonl_range(path, _ns("01:00"), _ns("02:00"))
+    assert [record["timestamp"][14:19] for record in records] == ["01:10", "01:20", "01:30"]
+
+
+def test_stale_index_falls_back_to_full_read(tmp_path):
+    path = tmp_path / "2025-01-16.jsonl"
+    _append(path, _records(["00:10", "01:10", "02:10"]))
+    # Rewritten shorter than the index says, e.g. restored from a copy
+    text, _ = format_records(_records(["01:15"]))
+    path.write_text(text)
+    assert load_file_index(path) is None
+    records = read_jsonl_range(path, _ns("01:00"), _ns("02:00"))
+    assert [record["timestamp"][14:19] for record in records] == ["01:15"]
@@ -0,0 +1,28 @@
+from crypto_stream.storage.disk import group_commit
+
+
+def test_batch_policy_syncs_each_file_once_per_commit_group(tmp_path, monkeypatch):
+    syncs = []
+    monkeypatch.setattr(group_commit, "_sync", syncs.append)
+    writer = group_commit.GroupCommitWriter("batch", commit_interval=60, commit_bytes=1 << 30)
+    try:
+        # Ten chunks waited for one by one would have been ten cycles with a sync per file each
+        futures = []
+        for chunk in range(10):
+            futures += [writer.append(tmp_path / f"s{i}.jsonl", f"{chunk}\n") for i in range(5)]
+    finally:
+        writer.close()
+    assert all(future.done() and future.exception() is None for future in futures)
+    assert len(syncs) == 5
+    assert (tmp_path / "s3.jsonl").read_text() == "".join(f"{chunk}\n" for chunk in range(10))
+
+
+def test_commit_bytes_ends_the_group(tmp_path, monkeypatch):
+    syncs = []
+    monkeypatch.setattr(group_commit, "_sync", syncs.append)
+    writer = group_commit.GroupCommitWriter("batch", commit_interval=60, commit_bytes=10)
+    try:
+        writer.append(tmp_path / "a.jsonl", "x" * 20 + "\n").result(timeout=5)
+    finally:
+        writer.close()
+    assert len(syncs) == 1
@@ -0,0 +1,52 @@
+import asyncio
+
+from crypto_stream.storage.redis.key_index import RedisKeyIndex, key_time_score
+from crypto_stream.storage.redis.tick_cache import RedisTickCache
+
+
+def _key(symbol, hour):
+    return f"crypto_ticks:binance:quote:{symbol}:2025-01-16:{hour:02d}"
+
+
+def test_key_time_score():
+    assert key_time_score(_key("BTCUSDT", 12), "%Y-%m-%d:%H") == 1737028800
+
+
+def test_keys_come_back_by_bucket_and_range(fake_redis):
+    async def main():
+        client = fake_redis()
+        index = RedisKeyIndex(client, "ticks")
+        pipe = client.pipeline(transaction=False)
+        for symbol, hour in (("ETHUSDT", 13), ("BTCUSDT", 12), ("BTCUSDT", 14)):
+            index.add(pipe, "binance", "quote", _key(symbol, hour), key_time_score(_key(symbol, hour), "%Y-%m-%d:%H"))
+        index.add(pipe, "bybit", "quote", "other", 0)
+        await pipe.execute()
+        assert await index.get("binance", "quote") == [_key("BTCUSDT", 12), _key("ETHUSDT", 13), _key("BTCUSDT", 14)]
+        thirteen = key_time_score(_key("", 13), "%Y-%m-%d:%H")
+        assert await index.get("binance", "quote", min_score=thirteen) == [_key("ETHUSDT", 13), _key("BTCUSDT", 14)]
+
+        index.remove(pipe, "binance", "quote", _key("ETHUSDT", 13))
+        index.prune(pipe, "binance", "quote", thirteen - 1)
+        await pipe.execute()
+        assert await index.get("binance", "quote") == [_key("BTCUSDT", 14)]
+        assert await index.counts() == {"key_index:ticks:binance:quote": 1, "key_index:ticks:bybit:quote": 1}
+
+    asyncio.run(main())
+
+
+def test_tick_cache_rebuilds_its_index_and_drops_missing_keys(fake_redis):
+    async def main():
+        client = fake_redis()
+        await client.rpush(_key("BTCUSDT", 12), b"{}")
+        await client.rpush(_key("ETHUSDT", 11), b"{}")
+        await client.rpush("crypto_ticks:not-a-cache-key", b"{}")
+        cache = RedisTickCache("crypto-ticks-binance-quote")
+        await cache.initialize()
+        assert await cache.key_index.get("binance", "quote") == [_key("ETHUSDT", 11), _key("BTCUSDT", 12)]
+
+        # A key that expired is dropped from the index when the writer asks for keys
+        await client.delete(_key("ETHUSDT", 11))
+        assert await cache.get_keys_to_flush("binance", "quote") == [_key("BTCUSDT", 12)]
+        assert await cache.key_index.get("binance", "quote") == [_key("BTCUSDT", 12)]
+
+    asyncio.run(main())
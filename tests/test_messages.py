@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from crypto_stream.market_data.streaming.messages import prepare_message
+from crypto_stream.utils.tick_codec import decode_quote_message, is_binary
+
+SNAPSHOT = (
+    '{"type":"book_snapshot","symbol":"BTCUSDT","exchange":"binance","name":"book_snapshot_1_0ms","depth":1,'
+    '"interval":0,"bids":[{"price":100.5,"amount":1.5}],"asks":[{"price":101.0,"amount":2.0}],'
+    '"timestamp":"2025-01-16T12:00:00.123Z","localTimestamp":"2025-01-16T12:00:00.125Z"}'
+)
+
+
+@pytest.fixture
+def json_codec(configure):
+    configure(codec_options={"format": "json"})
+
+
+def test_depth_one_snapshot_becomes_a_quote_with_only_the_type_patched(json_codec):
+    topic, key, value, data = prepare_message(SNAPSHOT)
+    assert (topic, key) == ("crypto-ticks-binance-quote", "binance-BTCUSDT-quote")
+    assert value == SNAPSHOT.replace('"type":"book_snapshot"', '"type":"quote"')
+    assert data["type"] == "quote"
+
+
+def test_deeper_snapshot_gets_a_level_type(json_codec):
+    raw = SNAPSHOT.replace('"depth":1', '"depth":5')
+    topic, key, value, data = prepare_message(raw.encode())
+    assert topic == "crypto-ticks-binance-book_snapshot_level_5"
+    assert json.loads(value)["type"] == "book_snapshot_level_5"
+
+
+def test_pretty_printed_frame_is_reserialized(json_codec):
+    raw = json.dumps(json.loads(SNAPSHOT), indent=1)
+    _, _, value, _ = prepare_message(raw)
+    assert json.loads(value) == dict(json.loads(SNAPSHOT), type="quote")
+
+
+def test_unchanged_type_keeps_the_raw_frame(json_codec):
+    raw = '{"type":"trade","symbol":"BTCUSDT","exchange":"binance","price":100.0}'
+    assert prepare_message(raw)[2] is raw
+    assert prepare_message('{"type":"trade","price":1}') is None
+
+
+def test_binary_codec_packs_quotes(configure):
+    configure(codec_options={"format": "binary"})
+    _, _, value, _ = prepare_message(SNAPSHOT)
+    assert is_binary(value)
+    decoded = decode_quote_message(value, "binance", "quote", "BTCUSDT")
+    assert decoded["bids"] == [{"price": 100.5, "amount": 1.5}]
+    assert decoded["localTimestamp"] == "2025-01-16T12:00:00.125Z"
@@ -0,0 +1,84 @@
+import pandas as pd
+import pyarrow.parquet as pq
+
+from crypto_stream.storage.disk.parquet_writer import ParquetTickWriter, read_parquet_ticks
+
+ARGS = ("binance", "quote", "BTCUSDT", "2025-01-16")
+
+
+def _ticks(hour, start, count):
+    ticks = []
+    for i in range(start, start + count):
+        ts = f"2025-01-16T{hour}:00:{i:02d}.000Z"
+        ticks.append(
+            {
+                "timestamp": ts,
+                "local_timestamp": ts,
+                "receive_timestamp": ts,
+                "sampling_timestamp": ts,
+                "symbol": "BTCUSDT",
+                "exchange": "binance",
+                "type": "quote",
+                "bid_price": 100 + i,  # ints in the feed still make float columns
+                "bid_size": 1.0,
+                "ask_price": 101.0 + i,
+                "ask_size": None,
+            }
+        )
+    return ticks
+
+
+def _bids(tmp_path):
+    return read_parquet_ticks(tmp_path, *ARGS)["bid_price"].tolist()
+
+
+def test_parts_are_typed_and_read_back_in_time_order(tmp_path):
+    writer = ParquetTickWriter(tmp_path)
+    writer.write_ticks(*ARGS, "12", _ticks("12", 10, 5))
+    writer.write_ticks(*ARGS, "12", _ticks("12", 0, 5))
+    parts = sorted((tmp_path / "binance/quote/BTCUSDT/2025-01-16").glob("12-*.parquet"))
+    assert len(parts) == 2
+    schema = pq.read_schema(parts[0])
+    assert str(schema.field("timestamp").type) == "timestamp[ns, tz=UTC]"
+    assert str(schema.field("bid_price").type) == "double"
+    assert str(schema.field("symbol").type).startswith("dictionary")
+    assert _bids(tmp_path) == [100.0 + i for i in [0, 1, 2, 3, 4, 10, 11, 12, 13, 14]]
+    frame = read_parquet_ticks(tmp_path, *ARGS, filters=[("timestamp", ">=", pd.Timestamp("2025-01-16T12:00:12Z"))])
+    assert frame["bid_price"].tolist() == [112.0, 113.0, 114.0]
+
+
+def test_compaction_merges_settled_hours_then_days(tmp_path):
+    writer = ParquetTickWriter(tmp_path)
+    day_dir = tmp_path / "binance/quote/BTCUSDT/2025-01-16"
+    for start in (0, 5, 10):
+        writer.write_ticks(*ARGS, "12", _ticks("12", start, 5))
+    writer.write_ticks(*ARGS, "13", _ticks("13", 0, 5))
+    writer.write_ticks(*ARGS, "13", _ticks("13", 5, 5))
+
+    # 14:30: hour 12 is settled, hour 13 takes late flushes until 15:00
+    writer.compact(pd.Timestamp("2025-01-16T14:30Z"))
+    assert len(list(day_dir.glob("12-*.parquet"))) == 1
+    assert len(list(day_dir.glob("13-*.parquet"))) == 2
+    assert len(_bids(tmp_path)) == 25
+
+    writer.compact(pd.Timestamp("2025-01-17T01:00Z"))
+    assert not day_dir.exists()
+    assert _bids(tmp_path) == [100.0 + i for i in range(15)] + [100.0 + i for i in range(10)]
+    assert read_parquet_ticks(tmp_path, *ARGS)["timestamp"].is_monotonic_increasing
+
+
+def test_leftovers_of_an_interrupted_merge_are_not_counted_twice(tmp_path):
+    writer = ParquetTickWriter(tmp_path)
+    day_dir = tmp_path / "binance/quote/BTCUSDT/2025-01-16"
+    parts = [writer.write_ticks(*ARGS, "12", _ticks("12", start, 5)) for start in (0, 5)]
+    # Merge as far as writing the target, then stop before deleting the sources
+    saved = {path: path.read_bytes() for path in parts}
+    writer.compact(pd.Timestamp("2025-01-16T14:00Z"))
+    for path, data in saved.items():
+        path.write_bytes(data)
+    assert len(list(day_dir.glob("*.parquet"))) == 3
+    assert len(_bids(tmp_path)) == 10
+
+    writer.compact(pd.Timestamp("2025-01-16T14:00Z"))
+    assert len(list(day_dir.glob("*.parquet"))) == 1
+    assert len(_bids(tmp_path)) == 10
@@ -0,0 +1,106 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from crypto_stream.market_data.processing.samplers.precise_sampler import SampledDataManager
+
+T0 = pd.Timestamp("2025-01-16T12:00:00Z")
+
+
+def _tick(ts, bid):
+    iso = ts.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+    return {"timestamp": iso, "symbol": "BTCUSDT", "exchange": "binance", "type": "quote", "bid_price": bid, "ask_price": bid + 1}
+
+
+def _tick_data(ts):
+    return {"timestamps": {"event_time": ts.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"}}
+
+
+@pytest.fixture
+def manager(configure):
+    configure(
+        sampled_data_manager_options={"sampling_intervals": ["1s", "1min"], "quote_bars": False, "max_tick_age": 100},
+    )
+    manager = SampledDataManager("crypto-ticks-binance-quote", redis_client=None)
+    saved = manager.saved = []
+
+    async def save_samples(records):
+        saved.extend((record[5], record[3]["sampling_timestamp"], record[3]["bid_price"]) for record in records)
+
+    manager.save_samples = save_samples
+    return manager
+
+
+async def _add(manager, offset, bid):
+    ts = T0 + pd.Timedelta(seconds=offset)
+    await manager.add_to_buffer("binance", "quote", "BTCUSDT", _tick_data(ts), _tick(ts, bid))
+
+
+def test_timer_batch_spanning_several_buckets_is_forward_filled(manager):
+    manager.sampling_trigger = "timer"
+    manager.last_sampled = {"1s": T0, "1min": T0}
+
+    async def run():
+        # A batch covering more buckets than the lateness depth arrives before the scheduler runs
+        for i, offset in enumerate([0.5, 1.5, 2.5, 3.5]):
+            await _add(manager, offset, 100 + i)
+        await manager.sample_due_boundaries(T0 + pd.Timedelta(seconds=4))
+
+    asyncio.run(run())
+    samples = [(time[17:19], bid) for interval, time, bid in manager.saved if interval == "1s"]
+    assert samples == [("01", 100), ("02", 101), ("03", 102), ("04", 103)]
+    assert manager.monitor.stats.skipped_minutes == 0
+
+
+def test_tick_trigger_late_tick_within_batch_is_used(manager):
+    manager.sampling_trigger = "tick"
+
+    async def run():
+        await _add(manager, 0.5, 100)
+        manager.saved.clear()
+        # Newer ticks push the state forward by several buckets before a late one arrives
+        manager.next_boundary = T0 + pd.Timedelta(seconds=10)
+        for i, offset in enumerate([1.5, 2.5, 3.5, 4.5]):
+            await _add(manager, offset, 101 + i)
+        await _add(manager, 1.7, 200)
+        await manager.sample_due_boundaries(T0 + pd.Timedelta(seconds=5))
+
+    asyncio.run(run())
+    samples = [(time[17:19], bid) for interval, time, bid in manager.saved if interval == "1s"]
+    assert samples == [("01", 100), ("02", 200), ("03", 102), ("04", 103), ("05", 104)]
+
+
+class _RecordingPipeline:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args[0] if args else None))
+
+    async def execute(self):
+        return []
+
+
+class _RecordingRedis:
+    def __init__(self):
+        self.calls = []
+
+    def pipeline(self, transaction=True):
+        return _RecordingPipeline(self.calls)
+
+
+def test_samples_are_published_after_their_window_is_written(configure, monkeypatch):
+    configure(sampled_data_manager_options={"sampling_intervals": ["1min"], "quote_bars": False})
+    redis = _RecordingRedis()
+    manager = SampledDataManager("crypto-ticks-binance-quote", redis_client=redis)
+    monkeypatch.setattr(manager, "save_sample_to_disk", lambda *args: None)
+    records = [
+        ("binance", "quote", symbol, _tick(T0, 100) | {"sampling_timestamp": "2025-01-16T12:00:00.000Z"}, T0, "1min", "sampled")
+        for symbol in ("BTCUSDT", "ETHUSDT")
+    ]
+    asyncio.run(manager.save_samples(records))
+    names = [name for name, _ in redis.calls]
+    # Every window append lands before the first invalidation a SampleQuery could react to
+    assert names.count("publish") == 4
+    assert max(i for i, name in enumerate(names) if name in ("rpush", "ltrim")) < names.index("publish")
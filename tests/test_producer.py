@@ -0,0 +1,106 @@
+import asyncio
+
+from crypto_stream.configs.config import ProducerOptions
+from crypto_stream.kafka_utils import producer as producer_module
+
+
+class FakeProducer:
+    """confluent_kafka.Producer stand-in: queues delivery callbacks until deliver() is called"""
+
+    def __init__(self, full=0, error=None):
+        self.full = full
+        self.error = error
+        self.callbacks = []
+        self.produced = []
+
+    def produce(self, topic, key=None, value=None, on_delivery=None):
+        if self.error is not None:
+            raise self.error
+        if self.full:
+            self.full -= 1
+            raise BufferError()
+        self.produced.append(value)
+        self.callbacks.append(on_delivery)
+
+    def deliver(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback(None, None)
+
+    def poll(self, timeout):
+        pass
+
+    def flush(self, timeout=None):
+        self.deliver()
+        return 0
+
+
+def _producer(monkeypatch, fake, max_in_flight=2):
+    monkeypatch.setattr(producer_module, "create_kafka_producer", lambda overrides=None: fake)
+    return producer_module.AsyncKafkaProducer(ProducerOptions(max_in_flight=max_in_flight))
+
+
+def test_produce_waits_at_the_in_flight_limit(monkeypatch):
+    fake = FakeProducer()
+    producer = _producer(monkeypatch, fake)
+
+    async def main():
+        await producer.start()
+        await producer.produce("t", "k", b"1")
+        await producer.produce("t", "k", b"2")
+        third = asyncio.create_task(producer.produce("t", "k", b"3"))
+        await asyncio.sleep(0.01)
+        assert not third.done()
+        fake.deliver()
+        await asyncio.wait_for(third, 1)
+        await producer.close()
+
+    asyncio.run(main())
+    assert fake.produced == [b"1", b"2", b"3"]
+    assert producer.delivered_count == 3
+
+
+def test_buffer_full_is_retried(monkeypatch):
+    fake = FakeProducer(full=3)
+    producer = _producer(monkeypatch, fake)
+
+    async def main():
+        await producer.start()
+        await producer.produce("t", "k", b"1")
+        await producer.close()
+
+    asyncio.run(main())
+    assert fake.produced == [b"1"]
+
+
+def test_permit_is_released_when_produce_fails_or_is_cancelled(monkeypatch):
+    fake = FakeProducer(full=1000)
+    producer = _producer(monkeypatch, fake)
+
+    async def main():
+        await producer.start()
+        waiting = asyncio.create_task(producer.produce("t", "k", b"1"))
+        await asyncio.sleep(0.03)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        fake.full, fake.error = 0, RuntimeError("broken")
+        try:
+            await producer.produce("t", "k", b"2")
+        except RuntimeError:
+            pass
+        permits = producer._in_flight._value
+        await producer.close()
+        return permits
+
+    assert asyncio.run(main()) == 2
+
+
+def test_send_to_kafka_does_not_flush_per_message(monkeypatch):
+    fake = FakeProducer()
+    flushes = []
+    fake.flush = lambda timeout=None: flushes.append(timeout)
+    monkeypatch.setattr(producer_module, "producer", fake)
+    producer_module.send_to_kafka("t", "k", b"1")
+    producer_module.send_to_kafka("t", "k", b"2")
+    assert fake.produced == [b"1", b"2"]
+    assert flushes == []
@@ -0,0 +1,81 @@
+import asyncio
+
+import pandas as pd
+
+from crypto_stream.market_data.processing.samplers.precise_sampler import SampledDataManager
+from crypto_stream.storage.query import SampleQuery
+
+
+def _sample(minute, bid):
+    iso = minute.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    return {
+        "timestamp": iso,
+        "local_timestamp": iso,
+        "receive_timestamp": iso,
+        "sampling_timestamp": iso,
+        "symbol": "BTCUSDT",
+        "exchange": "binance",
+        "type": "quote",
+        "bid_price": bid,
+        "bid_size": 1.0,
+        "ask_price": bid + 1,
+        "ask_size": 1.0,
+    }
+
+
+async def _wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("timed out")
+
+
+def test_window_is_cached_until_its_symbol_publishes(configure, fake_redis, monkeypatch):
+    configure(sampled_data_manager_options={"sampling_intervals": ["1min"], "quote_bars": False})
+
+    async def main():
+        manager = SampledDataManager("crypto-ticks-binance-quote", redis_client=fake_redis())
+        monkeypatch.setattr(manager, "save_sample_to_disk", lambda *args: None)
+        query = SampleQuery(redis_client=fake_redis())
+        await query.start()
+        try:
+            minute = pd.Timestamp("2025-01-16T12:01:00Z")
+            await manager.save_sample("binance", "quote", "BTCUSDT", _sample(minute, 100.0), minute)
+            await _wait_for(lambda: query._generations)
+            first = await query.get_samples("binance", "quote", "BTCUSDT")
+            assert first["bid_price"].tolist() == [100.0]
+            await query.get_samples("binance", "quote", "BTCUSDT")
+            assert (query.hits, query.misses) == (1, 1)
+
+            # A new sample drops the cached window; the next read sees it
+            generations = dict(query._generations)
+            minute += pd.Timedelta(minutes=1)
+            await manager.save_sample("binance", "quote", "BTCUSDT", _sample(minute, 101.0), minute)
+            await _wait_for(lambda: query._generations != generations)
+            second = await query.get_samples("binance", "quote", "BTCUSDT")
+            assert second["bid_price"].tolist() == [100.0, 101.0]
+            assert second.index[-1] == minute
+        finally:
+            await query.close()
+
+    asyncio.run(main())
+
+
+def test_window_loaded_during_an_invalidation_is_not_cached(fake_redis):
+    async def main():
+        query = SampleQuery(redis_client=fake_redis())
+        query._listener = object()  # as if started, without a subscription
+        window_key = query.get_window_key("binance", "quote", "BTCUSDT")
+        real_lrange = query.redis.lrange
+
+        async def lrange(*args):
+            values = await real_lrange(*args)
+            query._generations[window_key] = query._generations.get(window_key, 0) + 1
+            return values
+
+        query.redis.lrange = lrange
+        await query.get_samples("binance", "quote", "BTCUSDT")
+        assert window_key not in query._windows
+
+    asyncio.run(main())
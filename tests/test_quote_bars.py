@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from crypto_stream.market_data.processing.samplers.quote_bars import QuoteBarAggregator
+
+T0 = pd.Timestamp("2025-01-16T12:00:00Z").value
+SECOND = 1_000_000_000
+SYMBOL = ("binance", "quote", "BTCUSDT")
+
+
+def _record(bar):
+    return bar.to_record(*SYMBOL)
+
+
+def test_bars_forward_fill_and_time_weight():
+    bars = QuoteBarAggregator({"1s": pd.Timedelta("1s")})
+    bars.add(SYMBOL, T0, 100.0, 101.0)
+    bars.add(SYMBOL, T0 + SECOND // 2, 102.0, 103.0)
+    bars.add(SYMBOL, T0 + 3 * SECOND + SECOND // 4, 104.0, 105.0)
+    # Older than the open bar
+    bars.add(SYMBOL, T0 + 2 * SECOND, 1.0, 2.0)
+    assert bars.late_ticks == 1
+
+    records = [_record(bar) for bar in bars.close_until("1s", T0 + 4 * SECOND)[SYMBOL]]
+    assert [(r["bar_start"][11:19], r["sampling_timestamp"][11:19]) for r in records] == [
+        ("12:00:00", "12:00:01"),
+        ("12:00:01", "12:00:02"),
+        ("12:00:02", "12:00:03"),
+        ("12:00:03", "12:00:04"),
+    ]
+    first, empty, _, last = records
+    assert (first["open_mid"], first["high_mid"], first["close_mid"], first["tick_count"]) == (100.5, 102.5, 102.5, 2)
+    assert first["twap_mid"] == pytest.approx(101.5)
+    # No ticks: flat at the quote in force
+    assert (empty["open_mid"], empty["high_mid"], empty["low_mid"], empty["close_mid"]) == (102.5,) * 4
+    assert (empty["twap_mid"], empty["twap_spread"], empty["tick_count"]) == (102.5, 1.0, 0)
+    # The carried quote counts until the first tick of the bar
+    assert (last["open_mid"], last["close_mid"]) == (102.5, 104.5)
+    assert last["twap_mid"] == pytest.approx(102.5 * 0.25 + 104.5 * 0.75)
+
+
+def test_close_until_fills_bars_without_ticks_until_the_symbol_goes_stale():
+    bars = QuoteBarAggregator({"1s": pd.Timedelta("1s")})
+    bars.add(SYMBOL, T0, 100.0, 101.0)
+    assert [_record(b)["tick_count"] for b in bars.close_until("1s", T0 + SECOND)[SYMBOL]] == [1]
+    assert [_record(b)["close_mid"] for b in bars.close_until("1s", T0 + 3 * SECOND)[SYMBOL]] == [100.5, 100.5]
+    # Last tick older than the staleness limit: no more bars for the symbol
+    assert bars.close_until("1s", T0 + 4 * SECOND, stale_before_ns=T0 + SECOND) == {}
+    assert bars.close_until("1s", T0 + 5 * SECOND) == {}
+
+
+def test_missing_side_is_ignored_and_intervals_are_independent():
+    bars = QuoteBarAggregator({"1s": pd.Timedelta("1s"), "1min": pd.Timedelta("1min")})
+    bars.add(SYMBOL, T0, None, 101.0)
+    bars.add(SYMBOL, T0 + SECOND, 100.0, 101.0)
+    assert bars.close_until("1min", T0 + 60 * SECOND)[SYMBOL][0].count == 1
+    assert len(bars.close_until("1s", T0 + 60 * SECOND)[SYMBOL]) == 59
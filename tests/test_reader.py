@@ -0,0 +1,100 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from crypto_stream.storage.disk.parquet_writer import ParquetTickWriter
+from crypto_stream.storage.disk.tick_log import RECORD_DTYPE, tick_log_path
+from crypto_stream.storage.reader import iter_samples, iter_ticks, read_ticks
+from crypto_stream.utils.str_utils import sample_file_name
+
+
+def _tick(symbol, ts, bid):
+    return {
+        "timestamp": ts,
+        "local_timestamp": ts,
+        "receive_timestamp": ts,
+        "sampling_timestamp": ts,
+        "symbol": symbol,
+        "exchange": "binance",
+        "type": "quote",
+        "bid_price": bid,
+        "bid_size": 1.0,
+        "ask_price": bid + 1.0,
+        "ask_size": 1.0,
+    }
+
+
+def _write_jsonl(path, records):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+
+def _write_tick_log(base_dir, symbol, date, times, bids):
+    records = np.zeros(len(times), dtype=RECORD_DTYPE)
+    records["version"] = 1
+    for name in ("event_ns", "local_ns", "receive_ns", "sampling_ns"):
+        records[name] = [pd.Timestamp(ts).value for ts in times]
+    records["bid_price"] = bids
+    records["bid_size"] = 1.0
+    records["ask_price"] = np.asarray(bids) + 1.0
+    records["ask_size"] = 1.0
+    path = tick_log_path(base_dir, "binance", "quote", symbol, date)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(records.tobytes())
+
+
+def _recorded(tmp_path):
+    # 2025-01-16: BTCUSDT in jsonl and a tick log (a format change mid-day), ETHUSDT in parquet
+    _write_jsonl(
+        tmp_path / "binance/quote/BTCUSDT/2025-01-16.jsonl",
+        [_tick("BTCUSDT", "2025-01-16T12:00:00.000Z", 1.0), _tick("BTCUSDT", "2025-01-16T12:00:02.000Z", 3.0)],
+    )
+    _write_tick_log(tmp_path, "BTCUSDT", "2025-01-16", ["2025-01-16T12:00:01Z", "2025-01-16T12:00:03Z"], [2.0, 4.0])
+    ParquetTickWriter(tmp_path).write_ticks(
+        "binance", "quote", "ETHUSDT", "2025-01-16", "12", [_tick("ETHUSDT", "2025-01-16T12:00:00.500Z", 10.0)]
+    )
+    # 2025-01-17: BTCUSDT in jsonl
+    _write_jsonl(
+        tmp_path / "binance/quote/BTCUSDT/2025-01-17.jsonl",
+        [_tick("BTCUSDT", "2025-01-17T00:00:00.000Z", 5.0)],
+    )
+
+
+def test_days_in_order_across_formats(tmp_path):
+    _recorded(tmp_path)
+    frame = read_ticks(base_dir=tmp_path, workers=2)
+    assert frame["bid_price"].tolist() == [1.0, 10.0, 2.0, 3.0, 4.0, 5.0]
+    assert frame["symbol"].tolist() == ["BTCUSDT", "ETHUSDT"] + ["BTCUSDT"] * 4
+    for name in ("timestamp", "local_timestamp", "receive_timestamp", "sampling_timestamp"):
+        assert str(frame[name].dtype) == "datetime64[ns, UTC]"
+
+
+def test_range_columns_and_chunks(tmp_path):
+    _recorded(tmp_path)
+    chunks = list(
+        iter_ticks(
+            "binance",
+            "quote",
+            "BTCUSDT",
+            start="2025-01-16T12:00:01Z",
+            end="2025-01-17",
+            base_dir=tmp_path,
+            columns=["timestamp", "bid_price"],
+            chunk_size=2,
+        )
+    )
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert list(chunks[0].columns) == ["timestamp", "bid_price"]
+    assert pd.concat(chunks)["bid_price"].tolist() == [2.0, 3.0, 4.0]
+
+
+def test_samples_of_one_interval(tmp_path):
+    symbol_dir = tmp_path / "sampled/binance/quote/BTCUSDT"
+    for interval, bid in (("1min", 1.0), ("5min", 2.0)):
+        _write_jsonl(
+            symbol_dir / sample_file_name("2025-01-16", interval, "sampled"),
+            [_tick("BTCUSDT", "2025-01-16T12:00:00.000Z", bid)],
+        )
+    frames = list(iter_samples(interval="5min", base_dir=tmp_path))
+    assert pd.concat(frames)["bid_price"].tolist() == [2.0]
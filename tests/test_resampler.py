@@ -0,0 +1,56 @@
+import json
+
+import pandas as pd
+
+from crypto_stream.market_data.processing.samplers.resampler import resample_file
+
+
+def _tick(ts, bid):
+    return {
+        "timestamp": ts,
+        "local_timestamp": ts,
+        "receive_timestamp": ts,
+        "sampling_timestamp": ts,
+        "symbol": "BTCUSDT",
+        "exchange": "binance",
+        "type": "quote",
+        "bid_price": bid,
+        "bid_size": 1.0,
+        "ask_price": bid + 1,
+        "ask_size": 1.0,
+    }
+
+
+def _write_ticks(tmp_path, bid):
+    path = tmp_path / "ticks" / "binance" / "quote" / "BTCUSDT" / "2025-01-16.jsonl"
+    path.parent.mkdir(parents=True)
+    times = pd.date_range("2025-01-16T00:00:30Z", periods=1440, freq="min")
+    with open(path, "w") as f:
+        for ts in times:
+            f.write(json.dumps(_tick(ts.strftime("%Y-%m-%dT%H:%M:%S.000Z"), bid)) + "\n")
+    return path
+
+
+def _read_samples(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_partial_range_keeps_samples_outside_it(tmp_path):
+    out = tmp_path / "out"
+    path = _write_ticks(tmp_path, 100.0)
+    written = resample_file(path, ["1min"], out, max_tick_age=60)
+    (out_path,) = written
+    assert len(_read_samples(out_path)) == 1439
+
+    # Re-record the ticks with another price and backfill one hour only
+    path = _write_ticks(tmp_path / "again", 200.0)
+    resample_file(path, ["1min"], out, max_tick_age=60, start="2025-01-16T10:00", end="2025-01-16T11:00")
+
+    samples = _read_samples(out_path)
+    assert len(samples) == 1439
+    times = [sample["sampling_timestamp"] for sample in samples]
+    assert times == sorted(times)
+    for sample in samples:
+        inside = "2025-01-16T10:00" <= sample["sampling_timestamp"] < "2025-01-16T11:00"
+        assert sample["bid_price"] == (200.0 if inside else 100.0)
@@ -0,0 +1,50 @@
+import asyncio
+
+import pandas as pd
+
+from crypto_stream.storage.memory.ring_buffer_cache import MemoryTickCache
+
+
+def _add(cache, count, start="2025-01-16T12:00:00Z"):
+    for i, ts in enumerate(pd.date_range(start, periods=count, freq="s")):
+        iso = ts.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        storage = {
+            "timestamp": iso,
+            "local_timestamp": iso,
+            "receive_timestamp": iso,
+            "sampling_timestamp": iso,
+            "symbol": "BTCUSDT",
+            "exchange": "binance",
+            "type": "quote",
+            "bid_price": float(i),
+            "bid_size": 1.0,
+            "ask_price": i + 1.0,
+            "ask_size": 1.0,
+        }
+        tick = {"market_data": {"exchange": "binance", "type": "quote", "symbol": "BTCUSDT"}}
+        asyncio.run(cache.add_tick(tick, storage))
+
+
+def _drain(cache, chunk_size):
+    async def collect():
+        keys = await cache.get_keys_to_flush("binance", "quote")
+        return [chunk async for chunk in cache.drain(keys, chunk_size)]
+
+    return asyncio.run(collect())
+
+
+def test_drain_honors_chunk_size():
+    cache = MemoryTickCache("crypto-ticks-binance-quote", capacity=100)
+    _add(cache, 25)
+    chunks = _drain(cache, 10)
+    assert [len(ticks) for chunk in chunks for ticks in chunk.values()] == [10, 10, 5]
+    assert [tick["bid_price"] for chunk in chunks for ticks in chunk.values() for tick in ticks] == list(range(25))
+
+
+def test_spill_drops_oldest_beyond_max_spilled():
+    cache = MemoryTickCache("crypto-ticks-binance-quote", capacity=10, max_spilled=25)
+    _add(cache, 50)
+    ticks = [tick for chunk in _drain(cache, 1000) for ticks in chunk.values() for tick in ticks]
+    # 40 records were spilled in rings of 10, the 15 oldest of them dropped; 10 still in the ring
+    assert cache.dropped_count == 15
+    assert [tick["bid_price"] for tick in ticks] == list(range(15, 50))
@@ -0,0 +1,40 @@
+from crypto_stream.market_data.streaming.sharding import shard_stream_options
+
+
+def _option(exchange, count):
+    return {"exchange": exchange, "symbols": [f"{exchange}{i}" for i in range(count)], "dataTypes": ["quote"]}
+
+
+def _symbols(shards):
+    return sorted((o["exchange"], s) for shard in shards for o in shard for s in o["symbols"])
+
+
+def test_single_shard_keeps_everything_but_empty_options():
+    options = [_option("binance", 3), _option("bybit", 0)]
+    assert shard_stream_options(options, 1) == [[options[0]]]
+    assert shard_stream_options([], 4) == []
+
+
+def test_fewer_shards_than_exchanges_packs_whole_exchanges():
+    options = [_option("binance", 6), _option("bybit", 4), _option("okex", 3)]
+    shards = shard_stream_options(options, 2)
+    assert [[o["exchange"] for o in shard] for shard in shards] == [["binance"], ["bybit", "okex"]]
+    assert _symbols(shards) == _symbols([options])
+
+
+def test_spare_shards_go_to_the_largest_exchange_round_robin():
+    options = [_option("binance", 6), _option("bybit", 2)]
+    shards = shard_stream_options(options, 4)
+    assert [(shard[0]["exchange"], shard[0]["symbols"]) for shard in shards] == [
+        ("binance", ["binance0", "binance3"]),
+        ("binance", ["binance1", "binance4"]),
+        ("binance", ["binance2", "binance5"]),
+        ("bybit", ["bybit0", "bybit1"]),
+    ]
+    assert all(shard[0]["dataTypes"] == ["quote"] for shard in shards)
+
+
+def test_no_more_shards_than_symbols():
+    shards = shard_stream_options([_option("binance", 2)], 5)
+    assert len(shards) == 2
+    assert _symbols(shards) == [("binance", "binance0"), ("binance", "binance1")]
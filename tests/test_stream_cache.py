@@ -0,0 +1,107 @@
+import asyncio
+import dataclasses
+
+import pytest
+
+from crypto_stream.configs.config import get_config
+from crypto_stream.storage.disk.group_commit import GroupCommitWriter
+from crypto_stream.storage.disk.writer import DiskWriter
+from crypto_stream.storage.redis.stream_cache import RedisStreamTickCache
+
+TOPIC = "crypto-ticks-binance-quote"
+STREAM = "tick_stream:binance:quote:BTCUSDT"
+
+
+@pytest.fixture
+def streams(configure, fake_redis):
+    tick_cache = dataclasses.replace(
+        get_config().redis_options.redis_tick_cache, stream_read_count=10, stream_consumer_name="w1"
+    )
+    configure(redis_options={"redis_tick_cache": tick_cache})
+    return fake_redis
+
+
+async def _add(cache, quote_tick, count):
+    ticks = [quote_tick("BTCUSDT", f"2025-01-16T12:00:{i:02d}.000Z", 100 + i) for i in range(count)]
+    await cache.add_ticks(ticks)
+    await cache.flush_pending()
+
+
+async def _pending(client):
+    return (await client.xpending(STREAM, RedisStreamTickCache.writer_group))["pending"]
+
+
+def test_drained_entries_are_acked_only_by_ack(streams, quote_tick):
+    async def main():
+        cache = RedisStreamTickCache(TOPIC)
+        await cache.initialize()
+        await _add(cache, quote_tick, 25)
+        keys = await cache.get_keys_to_flush("binance", "quote")
+        chunks = [chunk async for chunk in cache.drain(keys)]
+        assert sum(len(ticks) for chunk in chunks for ticks in chunk.values()) == 25
+        # Handed to the writer but not on disk yet
+        assert await _pending(streams()) == 25
+        await cache.ack(keys)
+        assert await _pending(streams()) == 0
+
+    asyncio.run(main())
+
+
+def test_unacked_entries_are_recovered_after_a_restart(streams, quote_tick):
+    async def main():
+        cache = RedisStreamTickCache(TOPIC)
+        await cache.initialize()
+        await _add(cache, quote_tick, 25)
+        keys = await cache.get_keys_to_flush("binance", "quote")
+        [chunk async for chunk in cache.drain(keys)]
+        # Crash before the writes completed: a new process stages every pending page again
+        restarted = RedisStreamTickCache(TOPIC)
+        await restarted.initialize()
+        keys = await restarted.get_keys_to_flush("binance", "quote")
+        ticks = [tick for chunk in [c async for c in restarted.drain(keys)] for t in chunk.values() for tick in t]
+        assert [tick["bid_price"] for tick in ticks] == [100 + i for i in range(25)]
+
+    asyncio.run(main())
+
+
+def test_trimmed_pending_entries_are_acked(streams, quote_tick):
+    async def main():
+        client = streams()
+        cache = RedisStreamTickCache(TOPIC)
+        await cache.initialize()
+        await _add(cache, quote_tick, 5)
+        await cache.get_keys_to_flush("binance", "quote")
+        # Read but never written, then trimmed away before the restart
+        await client.xtrim(STREAM, maxlen=0)
+        restarted = RedisStreamTickCache(TOPIC)
+        await restarted.initialize()
+        assert await restarted.get_keys_to_flush("binance", "quote") == []
+        assert await _pending(client) == 0
+
+    asyncio.run(main())
+
+
+def test_flush_to_disk_acks_after_the_writes(streams, quote_tick, tmp_path):
+    async def main():
+        cache = RedisStreamTickCache(TOPIC)
+        await cache.initialize()
+        await _add(cache, quote_tick, 25)
+        writer = DiskWriter(tmp_path, TOPIC)
+        writer.file_writer = GroupCommitWriter("none")
+        acked_after = []
+        real_ack = cache.ack
+
+        async def ack(keys):
+            path = tmp_path / "binance" / "quote" / "BTCUSDT" / "2025-01-16.jsonl"
+            acked_after.append(sum(1 for _ in open(path)))
+            await real_ack(keys)
+
+        cache.ack = ack
+        try:
+            await writer.flush_to_disk(cache)
+        finally:
+            writer.file_writer.close()
+        assert acked_after == [25]
+        assert await _pending(streams()) == 0
+
+    asyncio.run(main())
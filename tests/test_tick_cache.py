@@ -0,0 +1,128 @@
+import asyncio
+import dataclasses
+import json
+
+import pytest
+
+from crypto_stream.configs.config import get_config
+from crypto_stream.storage.redis.tick_cache import RedisTickCache
+
+TOPIC = "crypto-ticks-binance-quote"
+KEY = "crypto_ticks:binance:quote:BTCUSDT:2025-01-16:12"
+
+
+async def _drained(cache, keys, chunk_size):
+    return [chunk async for chunk in cache.drain(keys, chunk_size)]
+
+
+def test_drain_pops_every_key_in_bounded_chunks(fake_redis, quote_tick):
+    async def main():
+        cache = RedisTickCache(TOPIC)
+        await cache.initialize()
+        ticks = [quote_tick("BTCUSDT", f"2025-01-16T12:00:{i:02d}.000Z", 100 + i) for i in range(25)]
+        ticks += [quote_tick("ETHUSDT", f"2025-01-16T12:00:{i:02d}.000Z", 200 + i) for i in range(5)]
+        await cache.add_ticks(ticks)
+        await cache.flush_pending()
+        keys = await cache.get_keys_to_flush("binance", "quote")
+        chunks = await _drained(cache, keys, 10)
+        assert [{key.split(":")[3]: len(t) for key, t in chunk.items()} for chunk in chunks] == [
+            {"BTCUSDT": 10, "ETHUSDT": 5},
+            {"BTCUSDT": 10},
+            {"BTCUSDT": 5},
+        ]
+        btc = [tick["bid_price"] for chunk in chunks for key, t in chunk.items() if "BTCUSDT" in key for tick in t]
+        assert btc == [100 + i for i in range(25)]
+        # Emptied lists are deleted, and dropped from the key index on the next flush
+        assert not await fake_redis().exists(*keys)
+        assert await cache.get_keys_to_flush("binance", "quote") == []
+
+    asyncio.run(main())
+
+
+def test_orphaned_temp_keys_are_restored_once(fake_redis, quote_tick):
+    async def main():
+        client = fake_redis()
+        cache_key = "crypto_ticks:binance:quote:BTCUSDT:2025-01-16:12"
+        await client.rpush(f"temp:{cache_key}:tmp1", b"a", b"b")
+        await client.rpush(cache_key, b"c")
+        other = "temp:crypto_ticks:bybit:quote:BTCUSDT:2025-01-16:12:tmp1"
+        await client.rpush(other, b"x")
+        # Two recorder processes of the same topic starting together
+        caches = [RedisTickCache(TOPIC), RedisTickCache(TOPIC)]
+        await asyncio.gather(*(cache._restore_orphaned_temp_keys() for cache in caches))
+        assert await client.lrange(cache_key, 0, -1) == [b"a", b"b", b"c"]
+        assert not await client.exists(f"temp:{cache_key}:tmp1")
+        # Another exchange's temp key is left to its own recorder
+        assert await client.lrange(other, 0, -1) == [b"x"]
+
+    asyncio.run(main())
+
+
+def _write_behind(configure, **values):
+    tick_cache = dataclasses.replace(get_config().redis_options.redis_tick_cache, **values)
+    configure(redis_options={"redis_tick_cache": tick_cache})
+
+
+async def _bids(client, key):
+    return [json.loads(value)["bid_price"] for value in await client.lrange(key, 0, -1)]
+
+
+def test_write_behind_buffers_until_max_ticks(configure, fake_redis, quote_tick):
+    _write_behind(configure, write_behind=True, write_behind_max_ticks=3, write_behind_max_delay=60)
+
+    async def main():
+        client = fake_redis()
+        cache = RedisTickCache(TOPIC)
+        for i in range(2):
+            await cache.add_tick(*quote_tick("BTCUSDT", f"2025-01-16T12:00:0{i}.000Z", 100 + i))
+        assert await _bids(client, KEY) == []
+        await cache.flush_pending_if_due()
+        assert await _bids(client, KEY) == []
+        await cache.add_tick(*quote_tick("BTCUSDT", "2025-01-16T12:00:02.000Z", 102))
+        assert await _bids(client, KEY) == [100, 101, 102]
+        assert await client.ttl(KEY) > 0
+        assert await cache.key_index.get("binance", "quote") == [KEY]
+
+    asyncio.run(main())
+
+
+def test_failed_flush_keeps_the_batch_ahead_of_newer_ticks(configure, fake_redis, quote_tick):
+    _write_behind(configure, write_behind=True, write_behind_max_ticks=1000)
+
+    async def main():
+        client = fake_redis()
+        cache = RedisTickCache(TOPIC)
+        await cache.add_tick(*quote_tick("BTCUSDT", "2025-01-16T12:00:00.000Z", 100))
+        real_pipeline = cache.redis.pipeline
+
+        def failing_pipeline(**kwargs):
+            pipe = real_pipeline(**kwargs)
+
+            async def execute():
+                # A tick arrives while the flush is in flight, then Redis fails
+                await cache.add_tick(*quote_tick("BTCUSDT", "2025-01-16T12:00:01.000Z", 101))
+                raise ConnectionError("redis down")
+
+            pipe.execute = execute
+            return pipe
+
+        cache.redis.pipeline = failing_pipeline
+        with pytest.raises(ConnectionError):
+            await cache.flush_pending()
+        cache.redis.pipeline = real_pipeline
+        assert cache._pending_count == 2
+        await cache.flush_pending()
+        assert await _bids(client, KEY) == [100, 101]
+
+    asyncio.run(main())
+
+
+def test_without_write_behind_ticks_are_written_at_once(configure, fake_redis, quote_tick):
+    _write_behind(configure, write_behind=False)
+
+    async def main():
+        cache = RedisTickCache(TOPIC)
+        await cache.add_tick(*quote_tick("BTCUSDT", "2025-01-16T12:00:00.000Z", 100))
+        assert await _bids(fake_redis(), KEY) == [100]
+
+    asyncio.run(main())
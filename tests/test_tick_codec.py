@@ -0,0 +1,93 @@
+import pytest
+
+from crypto_stream.utils.tick_codec import (
+    FORMAT_BINARY,
+    FORMAT_JSON,
+    decode_quote_message,
+    decode_tick,
+    decode_tick_array,
+    encode_quote_message,
+    encode_tick,
+    is_binary,
+    iso_to_ns,
+    ns_to_iso,
+)
+
+
+def _storage_tick(**prices):
+    tick = {
+        "timestamp": "2025-01-16T12:34:56.789Z",
+        "local_timestamp": "2025-01-16T12:34:56.789123Z",
+        "receive_timestamp": "2025-01-16T12:34:57.000Z",
+        "sampling_timestamp": None,
+        "symbol": "BTCUSDT",
+        "exchange": "binance",
+        "type": "quote",
+        "bid_price": 100.5,
+        "bid_size": 2,
+        "ask_price": 101.25,
+        "ask_size": None,
+    }
+    tick.update(prices)
+    return tick
+
+
+@pytest.mark.parametrize("fmt", [FORMAT_BINARY, FORMAT_JSON])
+def test_tick_round_trip_keeps_ints_nones_and_microseconds(fmt):
+    tick = _storage_tick()
+    value = encode_tick(tick, fmt)
+    assert is_binary(value) == (fmt == FORMAT_BINARY)
+    decoded = decode_tick(value, "binance", "quote", "BTCUSDT")
+    assert decoded == tick
+    assert list(decoded) == list(tick)
+    assert type(decoded["bid_size"]) is int
+
+
+def test_binary_record_is_fixed_size():
+    assert len(encode_tick(_storage_tick(), FORMAT_BINARY)) == 66
+
+
+def test_non_quote_layout_falls_back_to_json():
+    tick = _storage_tick(bid_price="100.5")
+    assert not is_binary(encode_tick(tick, FORMAT_BINARY))
+    extra = dict(_storage_tick(), note="x")
+    assert decode_tick(encode_tick(extra, FORMAT_BINARY), "binance", "quote", "BTCUSDT") == extra
+
+
+def test_decode_tick_array_mixes_formats():
+    ticks = [_storage_tick(bid_price=100.0 + i) for i in range(3)]
+    values = [encode_tick(ticks[0], FORMAT_JSON), encode_tick(ticks[1], FORMAT_BINARY), encode_tick(ticks[2], FORMAT_BINARY)]
+    records = decode_tick_array(values)
+    assert records["bid_price"].tolist() == [100.0, 101.0, 102.0]
+    assert records["local_ns"][0] == iso_to_ns("2025-01-16T12:34:56.789123Z")
+    assert records["sampling_ns"].tolist() == [0, 0, 0]
+    # All binary takes the single frombuffer path
+    binary = decode_tick_array([encode_tick(tick, FORMAT_BINARY) for tick in ticks])
+    assert binary.tolist() == records.tolist()
+
+
+def test_iso_ns_conversion():
+    assert ns_to_iso(iso_to_ns("2025-01-16T12:34:56.789Z")) == "2025-01-16T12:34:56.789Z"
+    assert ns_to_iso(iso_to_ns("2025-01-16T12:34:56.789123Z")) == "2025-01-16T12:34:56.789123Z"
+    assert iso_to_ns("2025-01-16T12:34:56Z") == iso_to_ns("2025-01-16T12:34:56.000Z")
+    assert iso_to_ns(None) == 0 and ns_to_iso(0) is None
+
+
+def test_quote_message_round_trip():
+    frame = {
+        "type": "quote",
+        "symbol": "BTCUSDT",
+        "exchange": "binance",
+        "bids": [{"price": 100.5, "amount": 3}],
+        "asks": [],
+        "timestamp": "2025-01-16T12:34:56.789Z",
+        "localTimestamp": "2025-01-16T12:34:56.790123Z",
+    }
+    value = encode_quote_message(frame, FORMAT_BINARY)
+    decoded = decode_quote_message(value, "binance", "quote", "BTCUSDT")
+    assert decoded["bids"] == [{"price": 100.5, "amount": 3}]
+    assert decoded["asks"] == []
+    assert (decoded["timestamp"], decoded["localTimestamp"]) == (frame["timestamp"], frame["localTimestamp"])
+    # Deeper books and the JSON format are published as JSON
+    assert encode_quote_message(dict(frame, bids=frame["bids"] * 2), FORMAT_BINARY) is None
+    assert encode_quote_message(frame, FORMAT_JSON) is None
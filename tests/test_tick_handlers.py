@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from crypto_stream.configs.config import TickHandlerOptions
+from crypto_stream.market_data.processing.data_process import TickHandlerRegistry
+
+
+async def _run(policy):
+    """Ticks 0-3 through one worker and a queue of 2, with the handler stuck on tick 0 while 1-3 arrive"""
+    registry = TickHandlerRegistry(TickHandlerOptions(queue_size=2, num_workers=1, overflow_policy=policy))
+    release = asyncio.Event()
+    seen = []
+
+    async def handler(data):
+        seen.append(data)
+        await release.wait()
+
+    registry.register("slow", handler)
+    await registry.start()
+    try:
+        await registry.submit(0)
+        await asyncio.sleep(0)  # the worker takes tick 0
+        await registry.submit(1)
+        await registry.submit(2)
+        third = asyncio.create_task(registry.submit(3))
+        await asyncio.sleep(0.01)
+        blocked = not third.done()
+        release.set()
+        await third
+        await registry._queue.join()
+    finally:
+        await registry.stop()
+    return seen, registry.dropped_count, blocked
+
+
+@pytest.mark.parametrize(
+    "policy, expected, dropped, blocked",
+    [
+        ("block", [0, 1, 2, 3], 0, True),
+        ("drop_newest", [0, 1, 2], 1, False),
+        ("drop_oldest", [0, 2, 3], 1, False),
+    ],
+)
+def test_overflow_policies(policy, expected, dropped, blocked):
+    assert asyncio.run(_run(policy)) == (expected, dropped, blocked)
+
+
+def test_failing_handler_does_not_stop_the_others():
+    async def main():
+        registry = TickHandlerRegistry(TickHandlerOptions(queue_size=10, num_workers=2))
+        seen = []
+        registry.register("bad", lambda data: 1 / 0)
+        registry.register("good", seen.append)
+        await registry.start()
+        for i in range(5):
+            await registry.submit(i)
+        await registry._queue.join()
+        await registry.stop()
+        return registry, seen
+
+    registry, seen = asyncio.run(main())
+    assert sorted(seen) == [0, 1, 2, 3, 4]
+    assert (registry.stats["bad"].calls, registry.stats["bad"].errors) == (5, 5)
+    assert registry.stats["good"].errors == 0
+
+
+def test_submit_without_handlers_is_a_no_op():
+    async def main():
+        registry = TickHandlerRegistry(TickHandlerOptions(queue_size=1, num_workers=1))
+        await registry.start()
+        for i in range(3):
+            await registry.submit(i)
+        size = registry._queue.qsize()
+        await registry.stop()
+        return size
+
+    assert asyncio.run(main()) == 0
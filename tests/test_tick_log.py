@@ -0,0 +1,70 @@
+import numpy as np
+
+from crypto_stream.storage.disk.tick_log import RECORD_DTYPE, TickLog, read_tick_log, tick_log_path
+
+BASE_NS = 1737028800 * 10**9  # 2025-01-16T12:00:00Z
+
+
+def _append(path, seconds):
+    records = np.zeros(len(seconds), dtype=RECORD_DTYPE)
+    records["version"] = 1
+    records["event_ns"] = [BASE_NS + s * 10**9 for s in seconds]
+    records["bid_price"] = seconds
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "ab") as f:
+        f.write(records.tobytes())
+
+
+def _seconds(records):
+    return ((np.asarray(records["event_ns"]) - BASE_NS) // 10**9).tolist()
+
+
+def _at(second):
+    return BASE_NS + second * 10**9
+
+
+def test_ordered_blocks_read_as_a_view(tmp_path):
+    path = tmp_path / "2025-01-16.ticks"
+    _append(path, range(25))
+    log = TickLog(path)
+    log.update_index(10)
+    assert log.index()["ordered"].tolist() == [1, 1]
+    result = log.read(_at(7), _at(22))
+    assert _seconds(result) == list(range(7, 22))
+    # Ordered blocks and tail: bounds by binary search, no copy
+    assert isinstance(result, np.memmap)
+    assert _seconds(log.read(_at(30), None)) == []
+
+
+def test_out_of_order_blocks_are_sorted(tmp_path):
+    path = tmp_path / "2025-01-16.ticks"
+    # The second block holds a late tick from before the first block's max
+    _append(path, list(range(10)) + [10, 11, 3, 12, 13, 14, 15, 16, 17, 18] + [19, 20])
+    log = TickLog(path)
+    log.update_index(10)
+    assert log.index()["ordered"].tolist() == [1, 0]
+    assert _seconds(log.read(_at(2), _at(13))) == [2, 3, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12]
+    # The late tick falls in a range otherwise inside the first block
+    assert _seconds(log.read(_at(1), _at(5))) == [1, 2, 3, 3, 4]
+    # A range past the out of order block still reads as a view
+    assert isinstance(log.read(_at(19), None), np.memmap)
+
+
+def test_repair_drops_a_partial_record(tmp_path):
+    path = tmp_path / "2025-01-16.ticks"
+    _append(path, range(5))
+    with open(path, "ab") as f:
+        f.write(b"\x01" * 20)
+    log = TickLog(path)
+    log.repair()
+    assert path.stat().st_size == 5 * RECORD_DTYPE.itemsize
+    # Appends after the repair stay aligned
+    _append(path, [5, 6])
+    assert _seconds(log.read()) == list(range(7))
+
+
+def test_read_tick_log_spans_days(tmp_path):
+    _append(tick_log_path(tmp_path, "binance", "quote", "BTCUSDT", "2025-01-16"), [0, 1, 2])
+    _append(tick_log_path(tmp_path, "binance", "quote", "BTCUSDT", "2025-01-17"), [86400, 86401])
+    result = read_tick_log(tmp_path, "binance", "quote", "BTCUSDT", _at(1), _at(86401))
+    assert _seconds(result) == [1, 2, 86400]